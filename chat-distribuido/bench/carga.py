@@ -0,0 +1,514 @@
+"""
+Teste de carga do servidor completo
+Sobe um Name Server e um ChatServer locais (processos separados, como em
+produção) e simula milhares de sessões de cliente distribuídas entre
+vários processos. Cada sessão se registra, entra em uma sala, faz
+polling no intervalo configurado e envia mensagens com tamanhos
+sorteados de uma distribuição.
+
+O resultado sai em JSON (vazão, percentis de latência de entrega e das
+chamadas, CPU/RSS do servidor e RPCs/s por método) para comparar
+commits.
+
+Uso:
+    python -m bench.carga [--sessoes 1000] [--processos 4] [--duracao 30]
+                          [--polling 1.0] [--envio 0.05] [--tamanho lognormal:80:0.8]
+                          [--salas 10] [--pyro THREADPOOL_SIZE=2000] [--saida carga.json]
+"""
+
+import argparse
+import heapq
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import Pyro4
+import Pyro4.errors
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.histograma import HistogramaLog
+from common.serializacao import configurar
+from config.settings import CHAT_SERVER_NAME, MAX_MESSAGE_LENGTH, SALA_PADRAO
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PERCENTIS = (50, 90, 95, 99)
+
+
+# ------------------------------------------------------------ tamanhos
+
+def criar_sorteio(especificacao):
+    """
+    Cria o sorteador de tamanhos de mensagem
+
+    Args:
+        especificacao: "fixo:N", "uniforme:MIN:MAX" ou
+            "lognormal:MEDIANA:SIGMA" (caracteres)
+
+    Returns:
+        callable: f(rnd) -> tamanho entre 1 e MAX_MESSAGE_LENGTH
+
+    Raises:
+        ValueError: Se a especificação for inválida
+    """
+    tipo, *valores = especificacao.split(":")
+    try:
+        valores = [float(v) for v in valores]
+    except ValueError:
+        raise ValueError(f"tamanho inválido: {especificacao}") from None
+
+    if tipo == "fixo" and len(valores) == 1:
+        sortear = lambda rnd: valores[0]
+    elif tipo == "uniforme" and len(valores) == 2:
+        sortear = lambda rnd: rnd.uniform(valores[0], valores[1])
+    elif tipo == "lognormal" and len(valores) == 2:
+        mu = math.log(valores[0])
+        sortear = lambda rnd: rnd.lognormvariate(mu, valores[1])
+    else:
+        raise ValueError(f"tamanho inválido: {especificacao}")
+
+    return lambda rnd: min(max(int(sortear(rnd)), 1), MAX_MESSAGE_LENGTH)
+
+
+def montar_conteudo(tamanho, rnd):
+    """
+    Conteúdo com o horário de envio no início (os receptores calculam
+    a latência de entrega a partir dele) completado até o tamanho
+    """
+    marca = f"{time.time():.6f} "
+    resto = max(tamanho - len(marca), 1)
+    palavras = []
+    while sum(len(p) + 1 for p in palavras) < resto:
+        palavras.append("x" * rnd.randint(2, 9))
+    return (marca + " ".join(palavras))[:max(tamanho, len(marca) + 1)]
+
+
+# ------------------------------------------------------------ processos de carga
+
+class Sessao:
+    """Um cliente simulado: proxy próprio e sequências lidas"""
+
+    def __init__(self, nome, sala, uri):
+        self.nome = nome
+        self.sala = sala
+        self.proxy = Pyro4.Proxy(uri)
+        self.ultimos = {}
+
+
+class Resultado:
+    """Contadores e histogramas de um processo de carga (só na janela medida)"""
+
+    def __init__(self):
+        self.contadores = dict.fromkeys(
+            ("enviadas", "recusadas", "polls", "entregas", "erros"), 0
+        )
+        self.entrega = HistogramaLog()   # envio -> recebida por outra sessão
+        self.envio = HistogramaLog()     # duração de enviar_mensagem
+        self.polling = HistogramaLog()   # duração de obter_mensagens
+        self.atraso = HistogramaLog()    # atraso do gerador em relação à agenda
+        self.lock = threading.Lock()
+
+    def exportar(self):
+        return {
+            "contadores": self.contadores,
+            **{nome: getattr(self, nome).exportar()
+               for nome in ("entrega", "envio", "polling", "atraso")},
+        }
+
+
+def executar_sessoes(sessoes, args, janela, resultado, semente):
+    """
+    Thread de carga: atende as próximas ações de um grupo de sessões
+
+    Cada sessão tem sua agenda (polling a cada args.polling segundos,
+    envios por processo de Poisson de taxa args.envio); a thread
+    executa sempre a ação mais próxima. Se a thread não dá conta, o
+    atraso em relação à agenda aparece em "atraso_gerador".
+    """
+    rnd = random.Random(semente)
+    sortear_tamanho = criar_sorteio(args.tamanho)
+    inicio, fim = janela
+    agenda = []
+
+    for i, sessao in enumerate(sessoes):
+        heapq.heappush(agenda, (inicio - args.aquecimento + rnd.uniform(0, args.polling), i, "poll"))
+        if args.envio:
+            heapq.heappush(agenda, (inicio - args.aquecimento + rnd.expovariate(args.envio), i, "envio"))
+
+    contadores = {chave: 0 for chave in resultado.contadores}
+    while agenda:
+        previsto, i, acao = heapq.heappop(agenda)
+        if previsto >= fim:
+            break
+
+        espera = previsto - time.time()
+        if espera > 0:
+            time.sleep(espera)
+        medir = previsto >= inicio
+        sessao = sessoes[i]
+
+        try:
+            antes = time.perf_counter()
+            if acao == "poll":
+                mensagens = sessao.proxy.obter_mensagens(sessao.nome, sessao.ultimos, 0)
+                agora = time.time()
+                duracao = time.perf_counter() - antes
+                for m in mensagens:
+                    sessao.ultimos[m["sala"]] = m["seq"]
+                    if medir and m["tipo"] == "normal" and m["remetente"] != sessao.nome:
+                        contadores["entregas"] += 1
+                        with resultado.lock:
+                            resultado.entrega.registrar(agora - float(m["conteudo"].split(" ", 1)[0]))
+                proximo = previsto + args.polling
+            else:
+                conteudo = montar_conteudo(sortear_tamanho(rnd), rnd)
+                sucesso, _ = sessao.proxy.enviar_mensagem(sessao.nome, conteudo, sessao.sala)
+                duracao = time.perf_counter() - antes
+                if medir:
+                    contadores["enviadas" if sucesso else "recusadas"] += 1
+                proximo = previsto + rnd.expovariate(args.envio)
+        except (Pyro4.errors.PyroError, OSError, ValueError):
+            if medir:
+                contadores["erros"] += 1
+            heapq.heappush(agenda, (previsto + args.polling, i, acao))
+            continue
+
+        if medir:
+            with resultado.lock:
+                (resultado.polling if acao == "poll" else resultado.envio).registrar(duracao)
+                resultado.atraso.registrar(time.time() - duracao - previsto)
+            if acao == "poll":
+                contadores["polls"] += 1
+        heapq.heappush(agenda, (proximo, i, acao))
+
+    with resultado.lock:
+        for chave, n in contadores.items():
+            resultado.contadores[chave] += n
+
+
+def processo_carga(indice, nomes, args, uri, prontos, largada, janela, saida):
+    """
+    Processo de carga: registra suas sessões, espera a largada e roda
+    args.threads threads de carga até o fim da janela
+
+    Args:
+        indice: Número do processo
+        nomes: Nomes das sessões deste processo
+        args: Argumentos da linha de comando
+        uri: URI do servidor
+        prontos: Fila onde avisa que registrou as sessões
+        largada: Event de início
+        janela: multiprocessing.Array [início, fim] da janela medida
+        saida: Fila do resultado
+    """
+    configurar()
+    sessoes = []
+    for nome in nomes:
+        numero = int(nome.rsplit("_", 1)[1])
+        sala = f"bench{numero % args.salas}" if args.salas else SALA_PADRAO
+        sessao = Sessao(nome, sala, uri)
+        sessao.proxy.registrar_usuario(nome)
+        if sala != SALA_PADRAO:
+            sessao.proxy.entrar_sala(nome, sala)
+        sessoes.append(sessao)
+
+    prontos.put(indice)
+    largada.wait()
+
+    resultado = Resultado()
+    grupos = [sessoes[t::args.threads] for t in range(args.threads)]
+    threads = [
+        threading.Thread(target=executar_sessoes,
+                         args=(grupo, args, tuple(janela), resultado, indice * 1000 + t))
+        for t, grupo in enumerate(grupos) if grupo
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Desconecta depois que o processo principal leu as métricas da janela
+    time.sleep(max(0.0, janela[1] + 1 - time.time()))
+    for sessao in sessoes:
+        try:
+            sessao.proxy.desconectar_usuario(sessao.nome)
+        except Exception:
+            pass
+        sessao.proxy._pyroRelease()
+
+    saida.put(resultado.exportar())
+
+
+# ------------------------------------------------------------ servidor
+
+def porta_livre():
+    """Porta TCP livre em 127.0.0.1"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def uso_processo(pid):
+    """
+    CPU e memória de um processo (Linux: /proc; senão psutil, se instalado)
+
+    Returns:
+        dict: {"cpu_segundos", "rss_bytes", "pico_rss_bytes"} ou None
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as arquivo:
+            campos = arquivo.read().rsplit(")", 1)[1].split()
+        cpu = (int(campos[11]) + int(campos[12])) / os.sysconf("SC_CLK_TCK")
+        memoria = {}
+        with open(f"/proc/{pid}/status") as arquivo:
+            for linha in arquivo:
+                chave, _, valor = linha.partition(":")
+                if chave in ("VmRSS", "VmHWM"):
+                    memoria[chave] = int(valor.split()[0]) * 1024
+        return {"cpu_segundos": cpu, "rss_bytes": memoria.get("VmRSS"),
+                "pico_rss_bytes": memoria.get("VmHWM")}
+    except (OSError, IndexError, ValueError):
+        pass
+
+    try:
+        import psutil
+    except ImportError:
+        return None
+    processo = psutil.Process(pid)
+    tempos = processo.cpu_times()
+    rss = processo.memory_info().rss
+    return {"cpu_segundos": tempos.user + tempos.system, "rss_bytes": rss, "pico_rss_bytes": None}
+
+
+def iniciar_servidores(args):
+    """
+    Sobe Name Server e ChatServer em uma porta livre
+
+    Returns:
+        tuple: (processo do NS, processo do servidor, proxy do NS, URI do servidor)
+    """
+    porta = porta_livre()
+    # Métricas ligadas: rpc_por_segundo vem de obter_metricas
+    ambiente = dict(os.environ, PYRO_NS_HOST="127.0.0.1", PYRO_NS_PORT=str(porta),
+                    PYRO_HOST="127.0.0.1", CHAT_METRICS_ENABLED="1")
+    Pyro4.config.NS_HOST, Pyro4.config.NS_PORT = "127.0.0.1", porta
+
+    # Servidor de threads precisa de uma thread por conexão (uma por sessão)
+    ajustes = dict(item.split("=", 1) for item in args.pyro)
+    if ajustes.get("SERVERTYPE", "thread") == "thread" and "THREADPOOL_SIZE" not in ajustes:
+        ajustes["THREADPOOL_SIZE"] = str(max(Pyro4.config.THREADPOOL_SIZE, args.sessoes + 16))
+    ambiente.update({f"PYRO_{chave.upper()}": valor for chave, valor in ajustes.items()})
+
+    silencio = subprocess.DEVNULL
+    ns = subprocess.Popen(
+        [sys.executable, "-m", "Pyro4.naming", "-n", "127.0.0.1", "-p", str(porta)],
+        cwd=RAIZ, env=ambiente, stdout=silencio, stderr=silencio,
+    )
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "server.start_server"],
+        cwd=RAIZ, env=ambiente, stdout=silencio, stderr=subprocess.PIPE if args.verboso else silencio,
+    )
+
+    limite = time.time() + 30
+    while True:
+        try:
+            proxy_ns = Pyro4.locateNS("127.0.0.1", porta)
+            return ns, servidor, proxy_ns, proxy_ns.lookup(CHAT_SERVER_NAME)
+        except Pyro4.errors.PyroError:
+            if servidor.poll() is not None or time.time() > limite:
+                ns.terminate()
+                servidor.terminate()
+                raise SystemExit("Servidor não subiu (use --verboso para ver o erro)")
+            time.sleep(0.2)
+
+
+# ------------------------------------------------------------ relatório
+
+def resumir(histograma):
+    """Percentis em ms de um histograma"""
+    resumo = {"amostras": histograma.total,
+              "media_ms": histograma.soma / histograma.total * 1000 if histograma.total else 0.0}
+    for p in PERCENTIS:
+        resumo[f"p{p}_ms"] = histograma.percentil(p) * 1000
+    return resumo
+
+
+def versao_git():
+    """Commit atual (para comparar relatórios), ou None"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def criar_parser():
+    """Argumentos da linha de comando (também usados por bench.daemon)"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessoes", type=int, default=1000)
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--threads", type=int, default=8, help="threads de carga por processo")
+    parser.add_argument("--duracao", type=float, default=30.0, help="segundos medidos")
+    parser.add_argument("--aquecimento", type=float, default=3.0, help="segundos não medidos")
+    parser.add_argument("--polling", type=float, default=1.0, help="segundos entre polls de cada sessão")
+    parser.add_argument("--envio", type=float, default=0.05, help="mensagens/s de cada sessão")
+    parser.add_argument("--tamanho", default="lognormal:80:0.8",
+                        help="fixo:N, uniforme:MIN:MAX ou lognormal:MEDIANA:SIGMA")
+    parser.add_argument("--salas", type=int, default=10, help="0 = todos na sala padrão")
+    parser.add_argument("--pyro", action="append", default=[], metavar="CHAVE=VALOR",
+                        help="configuração Pyro4 do servidor (ex.: SERVERTYPE=multiplex)")
+    parser.add_argument("--saida", help="arquivo do relatório JSON (padrão: só na tela)")
+    parser.add_argument("--verboso", action="store_true")
+    return parser
+
+
+def executar(args):
+    """
+    Roda um teste de carga completo
+
+    Args:
+        args: Namespace de criar_parser
+
+    Returns:
+        dict: Relatório (o mesmo gravado em JSON)
+    """
+    criar_sorteio(args.tamanho)  # valida antes de subir processos
+
+    configurar()
+    ns, servidor, proxy_ns, uri = iniciar_servidores(args)
+    uri = str(uri)
+    monitor = Pyro4.Proxy(uri)
+    processos = []
+
+    try:
+        por_processo = max(1, min(args.processos, args.sessoes))
+        prontos, saida = multiprocessing.Queue(), multiprocessing.Queue()
+        largada = multiprocessing.Event()
+        janela = multiprocessing.Array("d", 2)
+
+        for p in range(por_processo):
+            nomes = [f"b{p}_{i}" for i in range(p, args.sessoes, por_processo)]
+            processo = multiprocessing.Process(
+                target=processo_carga,
+                args=(p, nomes, args, uri, prontos, largada, janela, saida),
+                daemon=True,
+            )
+            processo.start()
+            processos.append(processo)
+
+        print(f"\n⏳ Registrando {args.sessoes} sessões em {por_processo} processos...")
+        for _ in processos:
+            prontos.get(timeout=max(120, args.sessoes / 10))
+
+        inicio = time.time() + args.aquecimento
+        janela[0], janela[1] = inicio, inicio + args.duracao
+        largada.set()
+        print(f"🏁 Carga: {args.aquecimento:.0f}s de aquecimento + {args.duracao:.0f}s medidos")
+
+        time.sleep(max(0.0, inicio - time.time()))
+        uso_inicio = uso_processo(servidor.pid)
+        metricas_inicio = monitor.obter_metricas().get("rpc")
+        time.sleep(max(0.0, janela[1] - time.time()))
+        uso_fim = uso_processo(servidor.pid)
+        metricas_fim = monitor.obter_metricas().get("rpc")
+
+        parciais = [saida.get(timeout=120) for _ in processos]
+    finally:
+        for processo in processos:
+            processo.join(timeout=10)
+        monitor._pyroRelease()
+        servidor.terminate()
+        ns.terminate()
+        servidor.wait()
+        ns.wait()
+
+    contadores = dict.fromkeys(parciais[0]["contadores"], 0)
+    histogramas = {}
+    for parcial in parciais:
+        for chave, n in parcial["contadores"].items():
+            contadores[chave] += n
+        for nome in ("entrega", "envio", "polling", "atraso"):
+            histogramas.setdefault(nome, HistogramaLog()).mesclar(HistogramaLog.importar(parcial[nome]))
+
+    # Servidor sem métricas: null no relatório, não um dicionário vazio
+    rpc = None
+    if metricas_inicio is not None and metricas_fim is not None:
+        rpc = {}
+        for metodo, fim in metricas_fim.items():
+            chamadas = fim["chamadas"] - metricas_inicio.get(metodo, {}).get("chamadas", 0)
+            if chamadas and metodo != "obter_metricas":
+                rpc[metodo] = chamadas / args.duracao
+
+    servidor_uso = None
+    if uso_inicio and uso_fim:
+        servidor_uso = {
+            "cpu_percentual": (uso_fim["cpu_segundos"] - uso_inicio["cpu_segundos"]) / args.duracao * 100,
+            "rss_mib": (uso_fim["rss_bytes"] or 0) / 2**20,
+            "pico_rss_mib": (uso_fim["pico_rss_bytes"] or 0) / 2**20,
+        }
+
+    relatorio = {
+        "commit": versao_git(),
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "ambiente": {"python": platform.python_version(), "pyro4": Pyro4.__version__,
+                     "cpus": os.cpu_count(), "serializador": Pyro4.config.SERIALIZER},
+        "configuracao": {chave: valor for chave, valor in vars(args).items()
+                         if chave not in ("saida", "verboso")},
+        "vazao": {
+            "mensagens_por_segundo": contadores["enviadas"] / args.duracao,
+            "entregas_por_segundo": contadores["entregas"] / args.duracao,
+            "polls_por_segundo": contadores["polls"] / args.duracao,
+        },
+        "contadores": contadores,
+        "latencia_entrega": resumir(histogramas["entrega"]),
+        "latencia_rpc": {"enviar_mensagem": resumir(histogramas["envio"]),
+                         "obter_mensagens": resumir(histogramas["polling"])},
+        "atraso_gerador": resumir(histogramas["atraso"]),
+        "servidor": servidor_uso,
+        "rpc_por_segundo": rpc,
+    }
+
+    entrega = relatorio["latencia_entrega"]
+    print(f"\n📨 {relatorio['vazao']['mensagens_por_segundo']:.1f} msg/s, "
+          f"{relatorio['vazao']['entregas_por_segundo']:.1f} entregas/s, "
+          f"{relatorio['vazao']['polls_por_segundo']:.1f} polls/s")
+    print(f"⏱️  Entrega p50 {entrega['p50_ms']:.1f} ms, p99 {entrega['p99_ms']:.1f} ms; "
+          f"atraso do gerador p99 {relatorio['atraso_gerador']['p99_ms']:.1f} ms")
+    if servidor_uso:
+        print(f"🖥️  Servidor: {servidor_uso['cpu_percentual']:.0f}% CPU, "
+              f"{servidor_uso['rss_mib']:.0f} MiB RSS")
+    if rpc is None:
+        print("⚠️  Servidor sem métricas (CHAT_METRICS_ENABLED): rpc_por_segundo ficou nulo")
+    if contadores["erros"] or contadores["recusadas"]:
+        print(f"⚠️  {contadores['erros']} erros, {contadores['recusadas']} envios recusados")
+
+    return relatorio
+
+
+def main():
+    """Ponto de entrada"""
+    args = criar_parser().parse_args()
+    relatorio = executar(args)
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto + "\n")
+        print(f"📄 Relatório: {args.saida}")
+    else:
+        print(texto)
+    print()
+
+
+if __name__ == "__main__":
+    main()
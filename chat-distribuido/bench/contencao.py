@@ -0,0 +1,104 @@
+"""
+Benchmark de contenção de locks do ChatServer
+Roda o servidor no próprio processo (sem Pyro4) e mede operações/s
+com número crescente de threads
+
+Uso:
+    python -m bench.contencao [--duracao 3] [--threads 1,2,4,8]
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.chat_server import ChatServer
+from server.rate_limit import LimitadorComposto, SemLimite
+
+
+def executar(servidor, usuarios, num_threads, duracao, taxa_envio):
+    """
+    Executa carga mista (polling, histórico, presença, envio)
+
+    Args:
+        servidor: Instância de ChatServer
+        usuarios: Nomes registrados
+        num_threads: Threads simultâneas
+        duracao: Segundos de execução
+        taxa_envio: Fração de operações que são envios
+
+    Returns:
+        int: Total de operações concluídas
+    """
+    contagens = [0] * num_threads
+    parar = threading.Event()
+
+    def trabalhador(indice):
+        rnd = random.Random(indice)
+        ultimo = 0
+        n = 0
+
+        while not parar.is_set():
+            usuario = usuarios[rnd.randrange(len(usuarios))]
+            r = rnd.random()
+
+            if r < taxa_envio:
+                servidor.enviar_mensagem(usuario, "mensagem de teste")
+            elif r < 0.85:
+                msgs = servidor.obter_mensagens(usuario, ultimo)
+                if msgs:
+                    ultimo = msgs[-1]["seq"]
+            elif r < 0.95:
+                servidor.obter_usuarios_online()
+            else:
+                servidor.obter_historico(20)
+
+            n += 1
+
+        contagens[indice] = n
+
+    threads = [
+        threading.Thread(target=trabalhador, args=(i,))
+        for i in range(num_threads)
+    ]
+    for t in threads:
+        t.start()
+
+    time.sleep(duracao)
+    parar.set()
+
+    for t in threads:
+        t.join()
+
+    return sum(contagens)
+
+
+def main():
+    """Ponto de entrada"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duracao", type=float, default=3.0)
+    parser.add_argument("--threads", default="1,2,4,8")
+    parser.add_argument("--usuarios", type=int, default=200)
+    parser.add_argument("--envio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    servidor = ChatServer()
+
+    # Sem rate limit: queremos medir os locks, não o limitador
+    servidor.rate_limiter = LimitadorComposto(SemLimite())
+    usuarios = [f"user{i}" for i in range(args.usuarios)]
+    for u in usuarios:
+        servidor.registrar_usuario(u)
+
+    print(f"\n{'threads':>8} {'ops/s':>12}")
+    for n in [int(x) for x in args.threads.split(",")]:
+        total = executar(servidor, usuarios, n, args.duracao, args.envio)
+        print(f"{n:>8} {total / args.duracao:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark dos tipos de daemon Pyro4 do servidor
+Roda bench.carga com o servidor "thread" (pool adaptativo, uma thread
+por conexão) e "multiplex" (select em uma thread) para cada número de
+conexões e compara
+
+Uso:
+    python -m bench.daemon [--conexoes 1000 5000] [--duracao 20] [--saida daemon.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import carga
+
+MODOS = ("thread", "multiplex")
+
+
+def main():
+    """Ponto de entrada"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--conexoes", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--duracao", type=float, default=20.0)
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--polling", type=float, default=1.0)
+    parser.add_argument("--envio", type=float, default=0.02)
+    parser.add_argument("--saida", help="arquivo JSON com todos os relatórios")
+    args = parser.parse_args()
+
+    relatorios = {}
+    for conexoes in args.conexoes:
+        for modo in MODOS:
+            print(f"\n===== {modo}, {conexoes} conexões =====")
+            carga_args = carga.criar_parser().parse_args([
+                "--sessoes", str(conexoes),
+                "--processos", str(args.processos),
+                "--duracao", str(args.duracao),
+                "--polling", str(args.polling),
+                "--envio", str(args.envio),
+                "--pyro", f"SERVERTYPE={modo}",
+            ])
+            relatorios[f"{modo}-{conexoes}"] = carga.executar(carga_args)
+
+    print(f"\n{'modo':<11}{'conexões':>9}{'msg/s':>8}{'polls/s':>9}{'poll p99':>10}"
+          f"{'entrega p99':>13}{'CPU':>6}{'RSS MiB':>9}{'erros':>7}")
+    for chave, r in relatorios.items():
+        modo, conexoes = chave.rsplit("-", 1)
+        servidor = r["servidor"] or {}
+        print(f"{modo:<11}{conexoes:>9}{r['vazao']['mensagens_por_segundo']:>8.1f}"
+              f"{r['vazao']['polls_por_segundo']:>9.0f}"
+              f"{r['latencia_rpc']['obter_mensagens']['p99_ms']:>8.1f}ms"
+              f"{r['latencia_entrega']['p99_ms']:>11.0f}ms"
+              f"{servidor.get('cpu_percentual', 0):>5.0f}%{servidor.get('rss_mib', 0):>9.0f}"
+              f"{r['contadores']['erros']:>7}")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorios, arquivo, indent=2, ensure_ascii=False)
+        print(f"\n📄 Relatórios: {args.saida}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
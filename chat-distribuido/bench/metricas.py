@@ -0,0 +1,89 @@
+"""
+Benchmark do custo da instrumentação de métricas
+Dois ChatServer no mesmo daemon Pyro4 (em outro processo, como em
+produção), um com MetricasRPC e outro sem; as chamadas se alternam em
+rodadas para que ruído afete os dois igual
+
+Uso:
+    python -m bench.metricas [--chamadas 5000] [--rodadas 5]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+import Pyro4
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.serializacao import configurar
+from server.chat_server import ChatServer
+from server.metricas import MetricasRPC
+
+
+def medir(chamada, quantidade):
+    """Microssegundos por chamada"""
+    inicio = time.perf_counter()
+    for _ in range(quantidade):
+        chamada()
+    return (time.perf_counter() - inicio) / quantidade * 1e6
+
+
+def servir(fila):
+    """Processo servidor: publica os dois ChatServer e envia as URIs"""
+    configurar()
+    daemon = Pyro4.Daemon()
+    uris = {}
+    for nome, metricas in (("sem métricas", None), ("com métricas", MetricasRPC())):
+        servidor = ChatServer(metricas=metricas)
+        servidor.registrar_usuario("bench")
+        for i in range(50):
+            servidor.enviar_mensagem("bench", f"mensagem {i}")
+        uris[nome] = str(daemon.register(servidor))
+    fila.put(uris)
+    daemon.requestLoop()
+
+
+def main():
+    """Ponto de entrada"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chamadas", type=int, default=5000)
+    parser.add_argument("--rodadas", type=int, default=5)
+    args = parser.parse_args()
+
+    configurar()
+    fila = multiprocessing.Queue()
+    processo = multiprocessing.Process(target=servir, args=(fila,), daemon=True)
+    processo.start()
+    proxies = {nome: Pyro4.Proxy(uri) for nome, uri in fila.get().items()}
+
+    cenarios = {
+        "ping": lambda p: p.ping,
+        "obter_mensagens": lambda p: lambda: p.obter_mensagens("bench", {}, 0),
+        "obter_historico": lambda p: lambda: p.obter_historico(20),
+        "enviar_mensagem": lambda p: lambda: p.enviar_mensagem("bench", "oi"),
+    }
+
+    print(f"\n{args.rodadas} rodadas de {args.chamadas} chamadas (melhor rodada)\n")
+    print(f"{'cenário':<20}{'sem (µs)':>10}{'com (µs)':>10}{'Δ (µs)':>9}{'custo':>9}")
+
+    for cenario, criar in cenarios.items():
+        melhores = {}
+        for _ in range(args.rodadas):
+            for nome, proxy in proxies.items():
+                tempo = medir(criar(proxy), args.chamadas)
+                melhores[nome] = min(melhores.get(nome, tempo), tempo)
+
+        sem, com = melhores["sem métricas"], melhores["com métricas"]
+        print(f"{cenario:<20}{sem:>10.1f}{com:>10.1f}{com - sem:>+9.1f}{(com - sem) / sem:>+9.1%}")
+
+    for proxy in proxies.values():
+        proxy._pyroRelease()
+    processo.terminate()
+    print()
+
+
+if __name__ == "__main__":
+    main()
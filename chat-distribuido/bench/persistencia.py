@@ -0,0 +1,142 @@
+"""
+Benchmark do log de mensagens
+Mede vazão de envio por nível de durabilidade e tempo de recuperação
+
+Por padrão os envios passam por um daemon Pyro4 local (custo realista
+por RPC); --local chama o ChatServer direto e mostra o custo bruto.
+
+Uso:
+    python -m bench.persistencia [--duracao 2] [--threads 4] [--recuperar 200000] [--local]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import Pyro4
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.models import Mensagem
+from server.chat_server import ChatServer
+from server.persistencia import LogMensagens, DURABILIDADES
+from server.rate_limit import LimitadorComposto, SemLimite
+
+
+def medir_envio(log, num_threads, duracao, local=False):
+    """
+    Mede mensagens/s aceitas pelo servidor
+
+    Args:
+        log: LogMensagens ou None
+        num_threads: Threads enviando ao mesmo tempo
+        duracao: Segundos de execução
+        local: Chama o servidor direto, sem Pyro4
+
+    Returns:
+        float: Mensagens por segundo
+    """
+    servidor = ChatServer(log)
+    servidor.rate_limiter = LimitadorComposto(SemLimite())
+    usuarios = [f"user{i}" for i in range(num_threads)]
+    for u in usuarios:
+        servidor.registrar_usuario(u)
+
+    daemon = None
+    if not local:
+        daemon = Pyro4.Daemon()
+        uri = daemon.register(servidor)
+        threading.Thread(target=daemon.requestLoop, daemon=True).start()
+
+    contagens = [0] * num_threads
+    parar = threading.Event()
+
+    def trabalhador(indice):
+        alvo = servidor if local else Pyro4.Proxy(uri)
+        n = 0
+        while not parar.is_set():
+            alvo.enviar_mensagem(usuarios[indice], "mensagem de teste " * 4)
+            n += 1
+        contagens[indice] = n
+
+    threads = [threading.Thread(target=trabalhador, args=(i,)) for i in range(num_threads)]
+    for t in threads:
+        t.start()
+    time.sleep(duracao)
+    parar.set()
+    for t in threads:
+        t.join()
+
+    if daemon:
+        daemon.shutdown()
+
+    return sum(contagens) / duracao
+
+
+def medir_recuperacao(diretorio, total, capacidades):
+    """
+    Grava total mensagens e mede o tempo de recuperação
+
+    Args:
+        diretorio: Pasta do log
+        total: Mensagens gravadas
+        capacidades: Tamanhos de histórico a recuperar
+
+    Returns:
+        dict: capacidade -> segundos
+    """
+    log = LogMensagens(diretorio, "os")
+    for seq in range(1, total + 1):
+        log.anexar(Mensagem("alice", "mensagem de teste " * 4, seq=seq))
+    log.fechar()
+
+    resultados = {}
+    for capacidade in capacidades:
+        inicio = time.perf_counter()
+        LogMensagens(diretorio, "os").recuperar(capacidade)
+        resultados[capacidade] = time.perf_counter() - inicio
+
+    return resultados
+
+
+def main():
+    """Ponto de entrada"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duracao", type=float, default=2.0)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--recuperar", type=int, default=200000)
+    parser.add_argument("--local", action="store_true")
+    args = parser.parse_args()
+
+    base = tempfile.mkdtemp(prefix="chatlog-")
+    try:
+        referencia = medir_envio(None, args.threads, args.duracao, args.local)
+        print(f"\n{'durabilidade':>14} {'msg/s':>10} {'custo':>8}")
+        print(f"{'sem log':>14} {referencia:>10.0f} {'-':>8}")
+
+        for durabilidade in DURABILIDADES:
+            log = LogMensagens(os.path.join(base, durabilidade), durabilidade)
+            vazao = medir_envio(log, args.threads, args.duracao, args.local)
+            log.fechar()
+            custo = 100 * (1 - vazao / referencia)
+            print(f"{durabilidade:>14} {vazao:>10.0f} {custo:>7.1f}%")
+
+        tempos = medir_recuperacao(
+            os.path.join(base, "recuperacao"),
+            args.recuperar,
+            [100, 10000, args.recuperar]
+        )
+        print(f"\nRecuperação ({args.recuperar} mensagens no log):")
+        for capacidade, segundos in tempos.items():
+            print(f"  últimas {capacidade:>8}: {segundos * 1000:8.1f} ms")
+
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark do índice invertido (pesquisar / /search)
+Indexa mensagens sintéticas e mede tempo de indexação, memória do
+índice e latência das consultas
+
+Uso:
+    python -m bench.pesquisa [--mensagens 1000000] [--consultas 200]
+"""
+
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.models import Mensagem
+from server.indices import IndiceTexto
+from config.settings import FULLTEXT_PREFIX_EXPANSIONS
+
+
+def gerar_vocabulario(tamanho, semente=42):
+    """
+    Gera palavras sintéticas (distribuição de uso parecida com Zipf)
+
+    Args:
+        tamanho: Número de palavras distintas
+        semente: Semente do gerador
+
+    Returns:
+        tuple: (palavras, pesos acumulados)
+    """
+    rnd = random.Random(semente)
+    letras = "abcdefghijlmnoprstuvz"
+    palavras = set()
+    while len(palavras) < tamanho:
+        palavras.add("".join(rnd.choice(letras) for _ in range(rnd.randint(3, 10))))
+    palavras = sorted(palavras)
+    rnd.shuffle(palavras)
+    pesos = list(itertools.accumulate(1 / (i + 1) for i in range(tamanho)))
+    return palavras, pesos
+
+
+def medir_memoria(indice):
+    """
+    Bytes ocupados pelo índice (posting lists, vocabulário, termos e
+    mensagens com termos repetidos)
+
+    Args:
+        indice: IndiceTexto
+
+    Returns:
+        int: Tamanho aproximado em bytes
+    """
+    total = sys.getsizeof(indice.postings) + sys.getsizeof(indice.vocabulario)
+    total += sum(sys.getsizeof(seqs) for seqs in indice.repetidos.values())
+    for termo, lista in indice.postings.items():
+        total += sys.getsizeof(termo) + sys.getsizeof(lista) + sys.getsizeof(lista.itens)
+    return total
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) de uma lista ordenada"""
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+def main():
+    """Ponto de entrada"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mensagens", type=int, default=1_000_000)
+    parser.add_argument("--vocabulario", type=int, default=50_000)
+    parser.add_argument("--palavras", type=int, default=8, help="palavras por mensagem")
+    parser.add_argument("--consultas", type=int, default=200)
+    args = parser.parse_args()
+
+    palavras, pesos = gerar_vocabulario(args.vocabulario)
+    rnd = random.Random(7)
+
+    # Mensagens são descartadas logo após indexadas, como se já
+    # estivessem no histórico: só o índice é medido
+    indice = IndiceTexto(FULLTEXT_PREFIX_EXPANSIONS)
+    inicio = time.perf_counter()
+
+    for seq in range(1, args.mensagens + 1):
+        texto = " ".join(rnd.choices(palavras, cum_weights=pesos, k=args.palavras))
+        indice.adicionar(Mensagem(f"user{seq % 100}", texto, seq=seq))
+
+    indexacao = time.perf_counter() - inicio
+    memoria = medir_memoria(indice)
+
+    print(f"\n{args.mensagens} mensagens, {len(indice.vocabulario)} termos")
+    print(f"indexação: {indexacao:.1f}s ({args.mensagens / indexacao:,.0f} msg/s)")
+    print(f"memória do índice: {memoria / 2**20:.1f} MiB "
+          f"({memoria / args.mensagens:.0f} bytes/mensagem)\n")
+
+    # Consultas: termo comum, termo raro, dois termos, prefixo
+    tipos = {
+        "termo comum": lambda: palavras[rnd.randint(0, 9)],
+        "termo raro": lambda: palavras[rnd.randint(1000, args.vocabulario - 1)],
+        "dois termos": lambda: " ".join(rnd.choices(palavras[:2000], k=2)),
+        "prefixo (3 letras)": lambda: rnd.choice(palavras)[:3],
+    }
+
+    print(f"{'consulta':<20}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}{'resultados':>12}")
+    for nome, gerar in tipos.items():
+        tempos = []
+        encontrados = 0
+        for _ in range(args.consultas):
+            consulta = gerar()
+            inicio = time.perf_counter()
+            resultado = indice.pesquisar(consulta, 20)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            encontrados += len(resultado)
+        tempos.sort()
+        print(f"{nome:<20}{percentil(tempos, 50):>10.2f}{percentil(tempos, 95):>10.2f}"
+              f"{percentil(tempos, 99):>10.2f}{encontrados / args.consultas:>12.1f}")
+
+    # Descarte: remove o primeiro décimo, como o histórico faria
+    rnd = random.Random(7)
+    descartar = args.mensagens // 10
+    inicio = time.perf_counter()
+    for seq in range(1, descartar + 1):
+        texto = " ".join(rnd.choices(palavras, cum_weights=pesos, k=args.palavras))
+        indice.remover(Mensagem(f"user{seq % 100}", texto, seq=seq))
+    remocao = time.perf_counter() - inicio
+
+    print(f"\ndescarte de {descartar} mensagens: {remocao:.1f}s "
+          f"({descartar / remocao:,.0f} msg/s), {len(indice)} restantes")
+    antigas = sum(1 for _, s in indice.pesquisar(palavras[0], 50) if s <= descartar)
+    print(f"resultados de mensagens descartadas: {antigas}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark dos serializadores RPC
+Mede bytes no fio e tempo de codificação/decodificação de um lote de
+mensagens como o devolvido por obter_mensagens/obter_historico
+
+Uso:
+    python -m bench.serializacao [--mensagens 1000] [--repeticoes 50]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import Pyro4.util
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.models import Mensagem
+from common.serializacao import SERIALIZADORES, disponivel
+
+
+def gerar_lote(quantidade):
+    """
+    Gera lote de mensagens já codificadas (como o servidor responde)
+
+    Args:
+        quantidade: Número de mensagens
+
+    Returns:
+        list: Dicionários de mensagem
+    """
+    lote = []
+    for i in range(quantidade):
+        msg = Mensagem(f"user{i % 50}", f"mensagem de teste número {i} " * 2, seq=i + 1)
+        lote.append(msg.congelar())
+    return lote
+
+
+def medir(nome, lote, repeticoes):
+    """
+    Mede um serializador
+
+    Args:
+        nome: Nome do serializador Pyro4
+        lote: Lista de dicionários
+        repeticoes: Vezes que o lote é codificado/decodificado
+
+    Returns:
+        tuple: (bytes, ms para codificar, ms para decodificar) por lote
+    """
+    serializador = Pyro4.util.get_serializer(nome)
+
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        dados = serializador.dumps(lote)
+    codificar = (time.perf_counter() - inicio) / repeticoes
+
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        serializador.loads(dados)
+    decodificar = (time.perf_counter() - inicio) / repeticoes
+
+    return len(dados), codificar * 1000, decodificar * 1000
+
+
+def main():
+    """Ponto de entrada"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mensagens", type=int, default=1000)
+    parser.add_argument("--repeticoes", type=int, default=50)
+    args = parser.parse_args()
+
+    lote = gerar_lote(args.mensagens)
+
+    print(f"\nLote de {args.mensagens} mensagens, média de {args.repeticoes} repetições\n")
+    print(f"{'serializador':<14}{'bytes':>10}{'codificar (ms)':>17}{'decodificar (ms)':>19}")
+
+    for nome in SERIALIZADORES:
+        if not disponivel(nome):
+            print(f"{nome:<14}{'indisponível (pacote não instalado)':>46}")
+            continue
+
+        tamanho, codificar, decodificar = medir(nome, lote, args.repeticoes)
+        print(f"{nome:<14}{tamanho:>10}{codificar:>17.2f}{decodificar:>19.2f}")
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Benchmark de sessões simultâneas no front end asyncio
+Um processo servidor (ChatServer + FrenteAsync) e um processo cliente
+com uma ConexaoAsync por sessão, todas em long-poll; um remetente envia
+mensagens e cada sessão mede a latência até recebê-las
+
+Uso:
+    python -m bench.sessoes_async [--sessoes 10000] [--mensagens 20] [--intervalo 0.5]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.carga import uso_processo, resumir, versao_git
+from client.transporte_async import ConexaoAsync
+from common.histograma import HistogramaLog
+from server.chat_server import ChatServer
+from server.frente_async import FrenteAsync
+from server.metricas import MetricasRPC
+
+
+def ampliar_limite_arquivos():
+    """Sobe o limite de descritores abertos até o máximo permitido"""
+    _, maximo = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (maximo, maximo))
+    return maximo
+
+
+def servir(fila):
+    """Processo servidor: front end asyncio em uma porta livre"""
+    sys.stdout = open(os.devnull, "w")  # sem o aviso de cada registro
+
+    async def rodar():
+        frente = FrenteAsync(ChatServer(metricas=MetricasRPC()), "127.0.0.1", 0)
+        await frente.iniciar()
+        fila.put(frente.porta)
+        await asyncio.Event().wait()
+
+    asyncio.run(rodar())
+
+
+def threads_processo(pid):
+    """Threads de um processo (Linux), ou None"""
+    try:
+        with open(f"/proc/{pid}/status") as arquivo:
+            for linha in arquivo:
+                if linha.startswith("Threads:"):
+                    return int(linha.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+async def sessao(nome, porta, estado, latencias, recebidas):
+    """
+    Uma sessão: conecta e registra; na largada fica em long-poll até
+    a parada
+
+    Todas registram antes de ouvir: cada registro é uma mensagem na
+    sala, que acordaria todas as sessões já em long-poll.
+
+    Args:
+        estado: {"registradas": [], "ouvindo": [], "largada": Event, "parada": Event}
+        latencias: HistogramaLog das mensagens do remetente
+        recebidas: Lista de um elemento com o total recebido
+    """
+    conexao = ConexaoAsync("127.0.0.1", porta)
+    await conexao.abrir()
+    parada = asyncio.ensure_future(estado["parada"].wait())
+    try:
+        sucesso, mensagem = await conexao.registrar_usuario(nome)
+        if not sucesso:
+            raise RuntimeError(mensagem)
+        estado["registradas"].append(nome)
+        await estado["largada"].wait()
+
+        # Começa da última mensagem, sem receber o histórico
+        ultimos = {m["sala"]: m["seq"] for m in await conexao.obter_historico(1)}
+        estado["ouvindo"].append(nome)
+
+        while True:
+            espera = asyncio.ensure_future(conexao.obter_mensagens(nome, ultimos, 20))
+            await asyncio.wait((espera, parada), return_when=asyncio.FIRST_COMPLETED)
+            if parada.done():
+                espera.cancel()
+                break
+
+            chegada = time.time()
+            for m in espera.result():
+                ultimos[m["sala"]] = m["seq"]
+                if m["remetente"] == "remetente":
+                    latencias.registrar(chegada - float(m["conteudo"].split()[0]))
+                    recebidas[0] += 1
+    finally:
+        parada.cancel()
+        await conexao.fechar()
+
+
+async def aguardar(lista, quantidade, tarefas):
+    """Espera a lista chegar à quantidade, repassando a falha de uma sessão"""
+    while len(lista) < quantidade:
+        await asyncio.sleep(0.01)
+        falhas = [t for t in tarefas if t.done() and t.exception()]
+        if falhas:
+            raise falhas[0].exception()
+
+
+async def executar(args, porta, pid_servidor):
+    """Abre as sessões, envia as mensagens e mede as entregas"""
+    estado = {"registradas": [], "ouvindo": [],
+              "largada": asyncio.Event(), "parada": asyncio.Event()}
+    latencias, recebidas = HistogramaLog(), [0]
+
+    inicio = time.perf_counter()
+    tarefas = []
+    for i in range(args.sessoes):
+        tarefas.append(asyncio.create_task(sessao(f"sessao{i}", porta, estado, latencias, recebidas)))
+        # Conexões em rajadas para não estourar o backlog do listen
+        if i % args.rajada == args.rajada - 1:
+            await aguardar(estado["registradas"], i + 1 - args.rajada, tarefas)
+    await aguardar(estado["registradas"], args.sessoes, tarefas)
+    abertura = time.perf_counter() - inicio
+
+    estado["largada"].set()
+    await aguardar(estado["ouvindo"], args.sessoes, tarefas)
+    print(f"{args.sessoes} sessões em long-poll ({abertura:.1f}s para abrir e registrar)")
+
+    await asyncio.sleep(1)
+    servidor_ocioso = uso_processo(pid_servidor)
+
+    async with ConexaoAsync("127.0.0.1", porta) as remetente:
+        await remetente.registrar_usuario("remetente")
+        await asyncio.sleep(1)  # a entrada do remetente acorda todas as sessões
+        recebidas[0] = 0
+        inicio_envio = time.perf_counter()
+        for i in range(args.mensagens):
+            sucesso, mensagem = await remetente.enviar_mensagem("remetente", f"{time.time():.6f} mensagem {i}")
+            if not sucesso:
+                print(f"⚠️  {mensagem}")
+            await asyncio.sleep(args.intervalo)
+
+        esperadas = args.sessoes * args.mensagens
+        limite = time.perf_counter() + args.espera
+        while recebidas[0] < esperadas and time.perf_counter() < limite:
+            await asyncio.sleep(0.1)
+        envio = time.perf_counter() - inicio_envio
+
+    servidor_final = uso_processo(pid_servidor)
+    cliente = uso_processo(os.getpid())
+    relatorio = {
+        "sessoes": args.sessoes,
+        "mensagens": args.mensagens,
+        "abertura_segundos": abertura,
+        "entregas_esperadas": esperadas,
+        "entregas": recebidas[0],
+        "entregas_por_segundo": recebidas[0] / envio,
+        "latencia": resumir(latencias),
+        "servidor": {
+            "threads": threads_processo(pid_servidor),
+            "ocioso": servidor_ocioso,
+            "final": servidor_final,
+        },
+        "cliente": cliente,
+        "commit": versao_git(),
+    }
+
+    estado["parada"].set()
+    await asyncio.gather(*tarefas, return_exceptions=True)
+    return relatorio
+
+
+def main():
+    """Ponto de entrada"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessoes", type=int, default=10000)
+    parser.add_argument("--mensagens", type=int, default=20, help="até 30 (rate limit do remetente)")
+    parser.add_argument("--intervalo", type=float, default=0.5, help="segundos entre mensagens")
+    parser.add_argument("--rajada", type=int, default=500, help="conexões abertas por vez")
+    parser.add_argument("--espera", type=float, default=30.0, help="segundos esperando as entregas")
+    parser.add_argument("--saida", help="arquivo JSON do relatório")
+    args = parser.parse_args()
+
+    limite = ampliar_limite_arquivos()
+    if limite < args.sessoes + 100:
+        print(f"⚠️  Limite de arquivos abertos ({limite}) menor que as sessões")
+
+    fila = multiprocessing.Queue()
+    processo = multiprocessing.Process(target=servir, args=(fila,), daemon=True)
+    processo.start()
+    try:
+        relatorio = asyncio.run(executar(args, fila.get(), processo.pid))
+    finally:
+        processo.terminate()
+
+    latencia = relatorio["latencia"]
+    print(f"\nentregas: {relatorio['entregas']}/{relatorio['entregas_esperadas']} "
+          f"({relatorio['entregas_por_segundo']:.0f}/s)")
+    print(f"latência: p50 {latencia['p50_ms']:.1f} ms, p95 {latencia['p95_ms']:.1f} ms, "
+          f"p99 {latencia['p99_ms']:.1f} ms")
+    for lado in ("servidor", "cliente"):
+        uso = relatorio[lado]["final"] if lado == "servidor" else relatorio[lado]
+        if uso:
+            print(f"{lado}: {uso['rss_bytes'] / 2**20:.0f} MiB, {uso['cpu_segundos']:.1f}s de CPU")
+    print(f"threads do servidor: {relatorio['servidor']['threads']}")
+
+    if args.saida:
+        with open(args.saida, "w") as arquivo:
+            json.dump(relatorio, arquivo, indent=2)
+        print(f"\n📄 Relatório: {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
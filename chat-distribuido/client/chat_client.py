@@ -6,6 +6,7 @@ Interface de linha de comando
 import Pyro4
 import sys
 import os
+import queue
 import time
 import threading
 from datetime import datetime
@@ -13,50 +14,142 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from common.models import Mensagem
+from client.roteador import RoteadorShards
+from client.conexao import GerenciadorConexao, espera_reconexao
+from client.envio import FilaEnvio
+from common.serializacao import configurar
+from common.compressao import descompactar_lote
+from common.rastreio import AgregadorLatencia, ETAPAS, novo_rastreio
 from config.settings import (
-    WELCOME_MESSAGE, HELP_MESSAGE, Colors,
+    WELCOME_MESSAGE, HELP_MESSAGE, Colors, SALA_PADRAO,
+    MAX_RECONNECT_ATTEMPTS,
+    POLLING_INTERVAL, LONG_POLL_TIMEOUT, PUSH_ENABLED, PUSH_CALLBACK_HOST, PUSH_CHECK_INTERVAL,
+    BATCH_COMPRESSION, TRACE_ENABLED, TRACE_REPORT_INTERVAL,
+    CLIENT_TRANSPORT,
     validar_username, validar_mensagem
 )
 
 
+class ReceptorPush:
+    """Objeto de callback que recebe mensagens enviadas pelo servidor"""
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    @Pyro4.expose
+    @Pyro4.callback
+    def receber(self, mensagens):
+        """
+        Recebe lote de mensagens do servidor
+
+        Args:
+            mensagens: Lista de dicionários com mensagens
+        """
+        self.cliente.processar_lote(mensagens)
+
+
 class ChatClient:
     """Cliente do chat"""
     
-    def __init__(self):
-        """Inicializa cliente"""
-        self.servidor = None
+    def __init__(self, push=PUSH_ENABLED, rastreio=TRACE_ENABLED, transporte=CLIENT_TRANSPORT):
+        """
+        Inicializa cliente
+
+        Args:
+            push: Recebe mensagens por callback em vez de polling
+            rastreio: Rastreia a latência das mensagens enviadas e
+                recebidas (ver common.rastreio)
+            transporte: "pyro" ou "async" (front end asyncio, sem push)
+        """
+        self.conexao = GerenciadorConexao(transporte)
+        self.transporte = transporte
         self.nome_usuario = None
         self.rodando = False
-        self.ultima_msg_id = 0
+        self.ultimos_ids = {}  # sala -> última sequência recebida
+        self.sala_atual = SALA_PADRAO
         self.conectado = False
+        self.lock_recebimento = threading.Lock()
+        self.fila_envio = None  # FilaEnvio, criada no primeiro envio
+
+        # Push
+        self.push_desejado = push
+        self.modo_push = False
+        self.daemon_callback = None
+
+        # Rastreio: agregados da sessão (/latency) e os ainda não reportados
+        self.latencias = AgregadorLatencia() if rastreio else None
+        self.latencias_pendentes = AgregadorLatencia()
+        self.proximo_reporte = time.time() + TRACE_REPORT_INTERVAL
     
+    @property
+    def servidor(self):
+        """Conexão da thread atual (ver GerenciadorConexao.proxy)"""
+        return self.conexao.proxy()
+
     def conectar(self):
-        """Conecta ao servidor via Name Server"""
+        """Conecta ao servidor (URI em cache ou Name Server)"""
         tentativas = 3
-        
-        for i in range(tentativas):
-            try:
-                print(f"🔍 Tentativa {i+1}/{tentativas}...")
-                ns = Pyro4.locateNS()
-                uri = ns.lookup("chat.server")
-                self.servidor = Pyro4.Proxy(uri)
-                
-                if self.servidor.ping():
-                    print(f"{Colors.OKGREEN}✅ Conectado!{Colors.ENDC}\n")
-                    self.conectado = True
-                    return True
-                    
-            except Exception as e:
-                print(f"{Colors.WARNING}⚠️  Falhou: {e}{Colors.ENDC}")
-                if i < tentativas - 1:
-                    print("⏳ Aguardando...\n")
-                    time.sleep(2)
+
+        def falhou(tentativa, erro, espera):
+            print(f"{Colors.WARNING}⚠️  Tentativa {tentativa + 1}/{tentativas} falhou: {erro}{Colors.ENDC}")
+            if espera:
+                print(f"⏳ Nova tentativa em {espera:.1f}s...\n")
+
+        print("🔍 Conectando...")
+        if self.conexao.tentar_conectar(tentativas, falhou) is not None:
+            formato = "asyncio/json" if self.transporte == "async" else Pyro4.config.SERIALIZER
+            print(f"{Colors.OKGREEN}✅ Conectado! ({formato}, via {self.conexao.origem}){Colors.ENDC}\n")
+            self.conectado = True
+            return True
         
         print(f"\n{Colors.FAIL}❌ Não conectou{Colors.ENDC}")
         print("\n💡 Verifique:")
         print("   1. Name Server rodando")
         print("   2. Servidor rodando")
         return False
+
+    def reconectar(self):
+        """
+        Resolve o servidor de novo e retoma a sessão (failover)
+
+        Tenta a URI em cache e depois o Name Server, com backoff
+        exponencial entre as tentativas (a primeira é imediata). Se o
+        servidor caiu e a réplica assumiu o nome dele, a sessão e as
+        salas já estão lá; a leitura continua das sequências em
+        ultimos_ids, sem repetir nem pular mensagens que a réplica tem.
+        As outras threads passam para a nova conexão na próxima chamada.
+
+        Returns:
+            bool: True se reconectou
+        """
+        print(f"\r{Colors.WARNING}🔄 Servidor indisponível, reconectando...{Colors.ENDC}")
+
+        for tentativa in range(MAX_RECONNECT_ATTEMPTS):
+            try:
+                servidor = self.conexao.conectar()
+
+                if self.nome_usuario not in servidor.obter_usuarios_online():
+                    servidor.registrar_usuario(self.nome_usuario)
+                    for sala in self.ultimos_ids:
+                        if sala != SALA_PADRAO:
+                            servidor.entrar_sala(self.nome_usuario, sala)
+
+                if isinstance(servidor, RoteadorShards):
+                    servidor.usuario = self.nome_usuario
+                    servidor.salas.update(self.ultimos_ids)
+
+            except Exception:
+                time.sleep(espera_reconexao(tentativa))
+                continue
+
+            print(f"\r{Colors.OKGREEN}✅ Reconectado (via {self.conexao.origem}){Colors.ENDC}")
+
+            if self.modo_push:
+                self.desativar_push()
+                self.ativar_push()
+            return True
+
+        return False
     
     def registrar(self):
         """Registra usuário no servidor"""
@@ -100,47 +193,193 @@ class ChatClient:
         print(f"\n{Colors.FAIL}❌ Máximo de tentativas{Colors.ENDC}")
         return False
     
+    def ativar_push(self):
+        """
+        Inicia daemon de callback e inscreve no servidor
+
+        Returns:
+            bool: True se o push foi ativado
+        """
+        if self.transporte == "async":
+            print(f"{Colors.WARNING}⚠️  Push indisponível no transporte asyncio (usando long-poll){Colors.ENDC}")
+            return False
+
+        try:
+            self.daemon_callback = Pyro4.Daemon(host=PUSH_CALLBACK_HOST)
+            uri = self.daemon_callback.register(ReceptorPush(self))
+
+            threading.Thread(
+                target=self.daemon_callback.requestLoop,
+                daemon=True
+            ).start()
+
+            with self.lock_recebimento:
+                sucesso, mensagem = self.servidor.inscrever_push(
+                    self.nome_usuario,
+                    str(uri),
+                    self.ultimos_ids
+                )
+
+            if not sucesso:
+                print(f"{Colors.WARNING}{mensagem}{Colors.ENDC}")
+                self.desativar_push()
+                return False
+
+            self.modo_push = True
+            return True
+
+        except Exception as e:
+            print(f"{Colors.WARNING}⚠️  Push indisponível: {e}{Colors.ENDC}")
+            self.desativar_push()
+            return False
+
+    def desativar_push(self):
+        """Encerra daemon de callback (volta ao polling)"""
+        self.modo_push = False
+
+        if self.daemon_callback:
+            self.daemon_callback.shutdown()
+            self.daemon_callback = None
+
+    def processar_lote(self, mensagens):
+        """
+        Exibe lote de mensagens e avança a sequência de cada sala
+
+        Mensagens com sequência já vista são ignoradas, então lotes
+        repetidos (push + polling) não duplicam a exibição. Uma lacuna
+        reposiciona a sequência (histórico excedido ou servidor reiniciado).
+
+        Args:
+            mensagens: Lista de dicionários com mensagens (ou lote
+                comprimido)
+        """
+        recebido = time.time()
+        mensagens = descompactar_lote(mensagens)
+
+        with self.lock_recebimento:
+            for msg_dict in mensagens:
+                sala = msg_dict.get("sala", SALA_PADRAO)
+                seq = msg_dict.get("seq")
+                ultimo = self.ultimos_ids.get(sala, 0)
+
+                if seq is None:
+                    self.ultimos_ids[sala] = ultimo + 1
+                elif msg_dict.get("tipo") == "lacuna":
+                    self.ultimos_ids[sala] = seq
+                elif seq <= ultimo:
+                    continue
+                else:
+                    self.ultimos_ids[sala] = seq
+
+                self.exibir_mensagem(Mensagem.from_dict(msg_dict))
+
+                rastreio = msg_dict.get("rastreio")
+                if rastreio and self.latencias is not None:
+                    exibido = time.time()
+                    if self.latencias.registrar_entrega(rastreio, recebido, exibido):
+                        self.latencias_pendentes.registrar_entrega(rastreio, recebido, exibido)
+
+    def reportar_latencia(self, servidor):
+        """
+        Envia ao servidor os agregados de latência desde o último reporte
+        (no máximo a cada TRACE_REPORT_INTERVAL)
+
+        Args:
+            servidor: Proxy da thread que chama
+        """
+        if self.latencias is None or time.time() < self.proximo_reporte:
+            return
+        self.proximo_reporte = time.time() + TRACE_REPORT_INTERVAL
+
+        agregados = self.latencias_pendentes.exportar(limpar=True)
+        if not agregados:
+            return
+
+        try:
+            servidor.reportar_latencia(self.nome_usuario, agregados)
+        except Exception:
+            # Tenta de novo no próximo reporte
+            self.latencias_pendentes.mesclar(agregados)
+
     def receber_mensagens(self):
-        """Thread que recebe mensagens"""
+        """Thread que recebe mensagens (polling ou verificação do push)"""
         erros = 0
         max_erros = 5
         
         while self.rodando:
+            # Proxy próprio (por thread): o long-poll não bloqueia os envios
+            servidor = self.conexao.proxy()
             try:
-                mensagens = self.servidor.obter_mensagens(
+                if self.modo_push:
+                    time.sleep(PUSH_CHECK_INTERVAL)
+
+                    if self.rodando and not servidor.push_ativo(self.nome_usuario):
+                        print(f"\r{Colors.WARNING}⚠️  Push interrompido, usando polling{Colors.ENDC}")
+                        self.desativar_push()
+
+                    self.reportar_latencia(servidor)
+                    erros = 0
+                    continue
+
+                inicio = time.monotonic()
+                mensagens = servidor.obter_mensagens(
                     self.nome_usuario, 
-                    self.ultima_msg_id
+                    self.ultimos_ids,
+                    LONG_POLL_TIMEOUT,
+                    BATCH_COMPRESSION
                 )
                 
                 if mensagens:
-                    for msg_dict in mensagens:
-                        msg = Mensagem.from_dict(msg_dict)
-                        self.exibir_mensagem(msg)
-                    
-                    self.ultima_msg_id += len(mensagens)
-                
+                    self.processar_lote(mensagens)
+
+                self.reportar_latencia(servidor)
                 erros = 0
-                time.sleep(0.5)
+                # Resposta vazia imediata: servidor sem long-poll (multiplex)
+                if not LONG_POLL_TIMEOUT or (
+                    not mensagens and time.monotonic() - inicio < POLLING_INTERVAL
+                ):
+                    time.sleep(POLLING_INTERVAL)
                 
             except Exception as e:
                 erros += 1
                 
-                if erros >= max_erros:
+                # Falha de comunicação reconecta na hora; no push a
+                # verificação já é espaçada: uma falha basta
+                if (isinstance(e, (Pyro4.errors.CommunicationError, ConnectionError))
+                        or erros >= max_erros or self.modo_push):
+                    if self.rodando and self.reconectar():
+                        erros = 0
+                        continue
+
                     if self.rodando:
                         print(f"\n{Colors.FAIL}❌ Conexão perdida{Colors.ENDC}")
                         self.rodando = False
                     break
                 
                 time.sleep(1)
+
+        self.conexao.liberar()
     
+    def prompt(self):
+        """Texto do prompt (mostra a sala atual fora da padrão)"""
+        if self.sala_atual == SALA_PADRAO:
+            return f"{Colors.BOLD}{self.nome_usuario}>{Colors.ENDC} "
+        return f"{Colors.BOLD}{self.nome_usuario}#{self.sala_atual}>{Colors.ENDC} "
+
     def exibir_mensagem(self, msg):
         """Exibe mensagem formatada"""
         hora = msg.timestamp.strftime("%H:%M:%S")
+        if msg.sala != self.sala_atual:
+            hora = f"{hora} #{msg.sala}"
         
         if msg.tipo == "sistema":
             cor = Colors.OKCYAN
             texto = f"[{hora}] {msg.conteudo}"
             
+        elif msg.tipo == "lacuna":
+            cor = Colors.WARNING
+            texto = f"[{hora}] {msg.conteudo}"
+            
         elif msg.tipo == "erro":
             cor = Colors.FAIL
             texto = f"[{hora}] ⚠️  {msg.conteudo}"
@@ -154,26 +393,48 @@ class ChatClient:
             texto = f"[{hora}] {msg.remetente}: {msg.conteudo}"
         
         print(f"\r{cor}{texto}{Colors.ENDC}")
-        print(f"{Colors.BOLD}{self.nome_usuario}>{Colors.ENDC} ", end="", flush=True)
+        print(self.prompt(), end="", flush=True)
     
     def enviar_mensagem(self, conteudo):
-        """Envia mensagem"""
+        """
+        Envia mensagem sem esperar o servidor
+
+        A mensagem vai para a fila de envio (ver client.envio) e o prompt
+        volta na hora; recusas do servidor aparecem quando a resposta
+        chega (_envio_concluido).
+
+        Returns:
+            Future: Confirmação do servidor (None se não enfileirou)
+        """
         valido, msg = validar_mensagem(conteudo)
         if not valido:
             print(f"{Colors.FAIL}❌ {msg}{Colors.ENDC}")
-            return
+            return None
         
+        argumentos = [self.nome_usuario, conteudo, self.sala_atual]
+        if self.latencias is not None:
+            argumentos.append(novo_rastreio())
+
+        if self.fila_envio is None:
+            self.fila_envio = FilaEnvio(self.conexao, self._envio_concluido)
+            self.fila_envio.start()
+
         try:
-            sucesso, mensagem = self.servidor.enviar_mensagem(
-                self.nome_usuario,
-                conteudo
-            )
-            
-            if not sucesso:
-                print(f"{Colors.FAIL}{mensagem}{Colors.ENDC}")
-                
+            return self.fila_envio.enviar(*argumentos)
+        except queue.Full:
+            print(f"{Colors.FAIL}❌ Muitas mensagens aguardando envio, tente de novo{Colors.ENDC}")
+            return None
+
+    def _envio_concluido(self, futuro):
+        """Mostra a recusa ou o erro de um envio (na thread de envio)"""
+        try:
+            sucesso, mensagem = futuro.result()
         except Exception as e:
-            print(f"{Colors.FAIL}❌ Erro: {e}{Colors.ENDC}")
+            sucesso, mensagem = False, f"❌ Erro: {e}"
+
+        if not sucesso:
+            print(f"\r{Colors.FAIL}{mensagem}{Colors.ENDC}")
+            print(self.prompt(), end="", flush=True)
     
     def listar_usuarios(self):
         """Lista usuários online"""
@@ -195,21 +456,80 @@ class ChatClient:
         except Exception as e:
             print(f"{Colors.FAIL}❌ Erro: {e}{Colors.ENDC}")
     
+    def entrar_sala(self, sala):
+        """Entra na sala e passa a enviar para ela"""
+        if not sala:
+            print(f"{Colors.WARNING}💡 Use /join SALA{Colors.ENDC}")
+            return
+
+        try:
+            sucesso, mensagem = self.servidor.entrar_sala(self.nome_usuario, sala)
+
+            if sucesso:
+                self.sala_atual = sala
+                print(f"{Colors.OKGREEN}{mensagem}{Colors.ENDC}")
+            else:
+                print(f"{Colors.FAIL}{mensagem}{Colors.ENDC}")
+
+        except Exception as e:
+            print(f"{Colors.FAIL}❌ Erro: {e}{Colors.ENDC}")
+
+    def sair_sala(self, sala):
+        """Sai da sala (volta para a padrão se era a atual)"""
+        sala = sala or self.sala_atual
+
+        try:
+            sucesso, mensagem = self.servidor.sair_sala(self.nome_usuario, sala)
+
+            if sucesso:
+                if sala == self.sala_atual:
+                    self.sala_atual = SALA_PADRAO
+                print(f"{Colors.OKGREEN}{mensagem}{Colors.ENDC}")
+            else:
+                print(f"{Colors.FAIL}{mensagem}{Colors.ENDC}")
+
+        except Exception as e:
+            print(f"{Colors.FAIL}❌ Erro: {e}{Colors.ENDC}")
+
+    def listar_salas(self):
+        """Lista salas do servidor"""
+        try:
+            salas = self.servidor.listar_salas(self.nome_usuario)
+
+            print(f"\n{Colors.HEADER}{'='*50}{Colors.ENDC}")
+            print(f"{Colors.BOLD}🏠 SALAS ({len(salas)}){Colors.ENDC}")
+            print(f"{Colors.HEADER}{'='*50}{Colors.ENDC}\n")
+
+            for sala in salas:
+                linha = f"#{sala['nome']} ({sala['membros']} membros)"
+                if sala['nome'] == self.sala_atual:
+                    print(f"{Colors.OKGREEN}  👉 {linha}{Colors.ENDC}")
+                elif sala['participa']:
+                    print(f"{Colors.OKBLUE}  ✓  {linha}{Colors.ENDC}")
+                else:
+                    print(f"     {linha}")
+
+            print()
+
+        except Exception as e:
+            print(f"{Colors.FAIL}❌ Erro: {e}{Colors.ENDC}")
+
     def mostrar_historico(self):
-        """Mostra histórico"""
+        """Mostra histórico da sala atual"""
         try:
-            mensagens = self.servidor.obter_historico(limite=20)
+            mensagens = Mensagem.from_lote(
+                self.servidor.obter_historico(20, self.sala_atual, BATCH_COMPRESSION)
+            )
             
             print(f"\n{Colors.HEADER}{'='*50}{Colors.ENDC}")
-            print(f"{Colors.BOLD}📜 HISTÓRICO{Colors.ENDC}")
+            print(f"{Colors.BOLD}📜 HISTÓRICO #{self.sala_atual}{Colors.ENDC}")
             print(f"{Colors.HEADER}{'='*50}{Colors.ENDC}\n")
             
             if not mensagens:
                 print(f"{Colors.WARNING}  Vazio{Colors.ENDC}\n")
                 return
             
-            for msg_dict in mensagens:
-                msg = Mensagem.from_dict(msg_dict)
+            for msg in mensagens:
                 hora = msg.timestamp.strftime("%H:%M:%S")
                 
                 if msg.tipo == "sistema":
@@ -222,6 +542,34 @@ class ChatClient:
         except Exception as e:
             print(f"{Colors.FAIL}❌ Erro: {e}{Colors.ENDC}")
     
+    def pesquisar(self, termos):
+        """Pesquisa mensagens da sala atual e mostra por relevância"""
+        if not termos:
+            print(f"{Colors.WARNING}💡 Use /search TERMOS{Colors.ENDC}")
+            return
+
+        try:
+            mensagens = Mensagem.from_lote(
+                self.servidor.pesquisar(termos, 20, self.sala_atual, BATCH_COMPRESSION)
+            )
+
+            print(f"\n{Colors.HEADER}{'='*50}{Colors.ENDC}")
+            print(f"{Colors.BOLD}🔎 PESQUISA #{self.sala_atual}: {termos}{Colors.ENDC}")
+            print(f"{Colors.HEADER}{'='*50}{Colors.ENDC}\n")
+
+            if not mensagens:
+                print(f"{Colors.WARNING}  Nada encontrado{Colors.ENDC}\n")
+                return
+
+            for msg in mensagens:
+                data = msg.timestamp.strftime("%d/%m %H:%M:%S")
+                print(f"  [{data}] {msg.remetente}: {msg.conteudo}")
+
+            print()
+
+        except Exception as e:
+            print(f"{Colors.FAIL}❌ Erro: {e}{Colors.ENDC}")
+
     def mostrar_estatisticas(self):
         """Mostra estatísticas"""
         try:
@@ -234,15 +582,50 @@ class ChatClient:
             print(f"  👥 Online: {stats['usuarios_online']}")
             print(f"  💬 Mensagens: {stats['total_mensagens']}")
             print(f"  📈 Pico: {stats['pico_usuarios']}")
+            if 'shards' in stats:
+                print(f"  🧩 Shards: {stats['shards']}")
             print(f"  ⏱️  Uptime: {stats['uptime_formatado']}")
             print()
             
         except Exception as e:
             print(f"{Colors.FAIL}❌ Erro: {e}{Colors.ENDC}")
     
+    def mostrar_latencia(self):
+        """Mostra a latência por etapa: deste cliente e de todos (servidor)"""
+        if self.latencias is None:
+            print(f"{Colors.WARNING}💡 Rastreio desligado (TRACE_ENABLED){Colors.ENDC}")
+            return
+
+        try:
+            relatorios = (
+                ("ESTE CLIENTE", self.latencias.resumo()),
+                ("TODOS OS CLIENTES (servidor)", self.servidor.obter_latencia()),
+            )
+        except Exception as e:
+            print(f"{Colors.FAIL}❌ Erro: {e}{Colors.ENDC}")
+            return
+
+        for titulo, resumo in relatorios:
+            print(f"\n{Colors.HEADER}{'='*70}{Colors.ENDC}")
+            print(f"{Colors.BOLD}⏱️  LATÊNCIA - {titulo}{Colors.ENDC}")
+            print(f"{Colors.HEADER}{'='*70}{Colors.ENDC}\n")
+
+            if not resumo:
+                print(f"{Colors.WARNING}  Sem entregas rastreadas{Colors.ENDC}")
+                continue
+
+            print(f"  {'etapa':<16}{'n':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+            for etapa, r in resumo.items():
+                print(f"  {etapa:<16}{r['amostras']:>8}{r['p50_ms']:>10.2f}"
+                      f"{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}  {ETAPAS.get(etapa, '')}")
+
+        print()
+
     def processar_comando(self, texto):
         """Processa comandos"""
-        comando = texto.lower().strip()
+        partes = texto.strip().split(maxsplit=1)
+        comando = partes[0].lower()
+        argumento = partes[1].strip() if len(partes) > 1 else ""
         
         if comando == "/help":
             print(HELP_MESSAGE)
@@ -250,11 +633,26 @@ class ChatClient:
         elif comando == "/users":
             self.listar_usuarios()
             
+        elif comando == "/join":
+            self.entrar_sala(argumento.lower())
+
+        elif comando == "/leave":
+            self.sair_sala(argumento.lower())
+
+        elif comando == "/rooms":
+            self.listar_salas()
+
         elif comando == "/history":
             self.mostrar_historico()
+
+        elif comando == "/search":
+            self.pesquisar(argumento)
             
         elif comando == "/stats":
             self.mostrar_estatisticas()
+
+        elif comando == "/latency":
+            self.mostrar_latencia()
             
         elif comando == "/clear":
             os.system('clear' if os.name == 'posix' else 'cls')
@@ -280,6 +678,9 @@ class ChatClient:
         print(f"{Colors.OKCYAN}💡 /help para comandos{Colors.ENDC}\n")
         
         self.rodando = True
+
+        if self.push_desejado and self.ativar_push():
+            print(f"{Colors.OKCYAN}📡 Modo push ativo{Colors.ENDC}\n")
         
         thread = threading.Thread(target=self.receber_mensagens, daemon=True)
         thread.start()
@@ -287,7 +688,7 @@ class ChatClient:
         try:
             while self.rodando:
                 try:
-                    texto = input(f"{Colors.BOLD}{self.nome_usuario}>{Colors.ENDC} ").strip()
+                    texto = input(self.prompt()).strip()
                     
                     if not texto:
                         continue
@@ -312,10 +713,17 @@ class ChatClient:
         """Desconecta"""
         if self.rodando:
             self.rodando = False
+            self.desativar_push()
+
+            # Envia o que ainda está na fila antes de sair
+            if self.fila_envio:
+                self.fila_envio.encerrar()
+                self.fila_envio = None
             
             try:
                 if self.servidor and self.nome_usuario:
                     self.servidor.desconectar_usuario(self.nome_usuario)
+                    self.conexao.fechar()
                     print(f"{Colors.OKCYAN}👋 Desconectado{Colors.ENDC}")
             except:
                 pass
@@ -337,7 +745,11 @@ class ChatClient:
 
 def main():
     """Ponto de entrada"""
-    cliente = ChatClient()
+    configurar()
+    cliente = ChatClient(
+        push=PUSH_ENABLED or "--push" in sys.argv,
+        transporte="async" if "--async" in sys.argv else CLIENT_TRANSPORT
+    )
     
     try:
         cliente.iniciar()
@@ -0,0 +1,344 @@
+"""
+Conexão do cliente com o servidor
+Resolve o servidor (URI em cache no disco; Name Server só quando o
+cache falha), entrega um proxy por thread e reconecta com backoff
+exponencial
+"""
+
+import json
+import os
+import random
+import threading
+import time
+import weakref
+
+import Pyro4
+
+from config.settings import (
+    SALA_PADRAO,
+    CHAT_SERVER_NAME,
+    CLIENT_TRANSPORT,
+    ASYNC_SERVER_HOST,
+    ASYNC_FRONTEND_PORT,
+    URI_CACHE_FILE,
+    CONNECT_TIMEOUT,
+    RECONNECT_BASE_DELAY,
+    RECONNECT_MAX_DELAY,
+)
+
+from client.roteador import RoteadorShards, listar_shards
+from client.transporte_async import ProxyAsync
+from common.serializacao import negociar, disponivel
+from common.utils import caminho_do_pacote
+
+
+def localizar_servidor(transporte="pyro"):
+    """
+    Localiza o servidor (ou os shards) no Name Server
+
+    Args:
+        transporte: "pyro", ou "async" para conectar direto ao front end
+            asyncio (ASYNC_SERVER_HOST:ASYNC_FRONTEND_PORT, sem Name Server)
+
+    Returns:
+        Pyro4.Proxy, RoteadorShards ou ProxyAsync: Conexão com o
+        serializador negociado
+    """
+    if transporte == "async":
+        return ProxyAsync(ASYNC_SERVER_HOST, ASYNC_FRONTEND_PORT)
+
+    ns = Pyro4.locateNS()
+
+    # Com shards registrados, as salas são roteadas entre eles
+    shards = listar_shards(ns)
+    if shards:
+        print(f"🧩 {len(shards)} shards encontrados")
+        with Pyro4.Proxy(next(iter(shards.values()))) as shard:
+            negociar(shard)
+        return RoteadorShards(shards)
+
+    servidor = Pyro4.Proxy(ns.lookup(CHAT_SERVER_NAME))
+    negociar(servidor)
+    return servidor
+
+
+def espera_reconexao(tentativa):
+    """
+    Espera antes de uma nova tentativa: backoff exponencial com jitter
+    completo (clientes que caíram juntos não voltam juntos)
+
+    Args:
+        tentativa: Tentativas que já falharam (0 = primeira)
+
+    Returns:
+        float: Segundos, sorteados entre 0 e RECONNECT_BASE_DELAY * 2^tentativa
+        (no máximo RECONNECT_MAX_DELAY)
+    """
+    return random.uniform(0, min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * 2 ** tentativa))
+
+
+def abrir_conexao(servidor, sala=SALA_PADRAO):
+    """
+    Garante que a conexão está aberta antes de uma chamada
+
+    Uma falha aqui garante que nada chegou ao servidor, então a chamada
+    pode ser repetida sem risco de duplicar (ver client.envio); depois
+    de aberta, uma falha na chamada pode ter sido depois do envio.
+
+    Args:
+        servidor: Pyro4.Proxy, RoteadorShards ou ProxyAsync (None = sem
+            conexão)
+        sala: Sala da chamada (escolhe o shard)
+
+    Raises:
+        Pyro4.errors.CommunicationError: Se não conectou
+        ConnectionError: Sem conexão, ou a do front end asyncio caiu
+    """
+    if servidor is None:
+        raise ConnectionError("não conectado")
+    if isinstance(servidor, ProxyAsync):
+        conexao = servidor.conexao
+        if conexao.escritor is None or conexao.erro is not None:
+            raise ConnectionError(conexao.erro or "conexão não aberta")
+    elif isinstance(servidor, RoteadorShards):
+        servidor.abrir(sala)
+    elif servidor._pyroConnection is None:
+        servidor._pyroBind()
+
+
+class GerenciadorConexao:
+    """
+    Conexão do cliente: resolução, proxies por thread e reconexão
+
+    A URI resolvida (ou a lista de shards) e o serializador negociado
+    ficam em URI_CACHE_FILE; conectar() tenta o cache primeiro e só
+    consulta o Name Server se ele não responder (servidor reiniciado,
+    failover para a réplica). Um Pyro4.Proxy atende uma chamada por vez,
+    então cada thread recebe o seu (proxy()); a cada conectar() a
+    geração muda e as threads trocam de proxy na próxima chamada.
+
+    Attributes:
+        principal: Conexão criada pelo último conectar()
+        geracao (int): Incrementada a cada conectar()
+        origem (str): "cache", "nameserver" ou "async" (último conectar)
+    """
+
+    def __init__(self, transporte=CLIENT_TRANSPORT, arquivo_cache=URI_CACHE_FILE):
+        """
+        Args:
+            transporte: "pyro" ou "async"
+            arquivo_cache: Arquivo JSON da URI em cache, relativo à pasta
+                chat-distribuido (None = sem cache)
+        """
+        self.transporte = transporte
+        self.arquivo_cache = caminho_do_pacote(arquivo_cache)
+        self.principal = None
+        self.geracao = 0
+        self.origem = None
+        self.lock = threading.Lock()
+        self.proxies = weakref.WeakKeyDictionary()  # Thread -> (geração, proxy)
+
+    def conectar(self):
+        """
+        Resolve o servidor e testa a conexão
+
+        A nova conexão passa a ser o proxy da thread que chamou. As
+        demais threads trocam de proxy na próxima chamada a proxy() e
+        liberam o antigo elas mesmas: liberar daqui esperaria a chamada
+        em andamento nele (ex.: um long-poll).
+
+        Returns:
+            Conexão principal (Pyro4.Proxy, RoteadorShards ou ProxyAsync)
+
+        Raises:
+            Exception: Erro da última forma de resolução tentada
+        """
+        principal, origem = self._localizar()
+        thread = threading.current_thread()
+
+        with self.lock:
+            anterior = self.principal
+            proprio = self.proxies.get(thread)
+            self.principal, self.origem = principal, origem
+            self.geracao += 1
+            self.proxies[thread] = (self.geracao, principal)
+
+        if proprio is not None:
+            self._liberar(proprio[1])
+        if isinstance(anterior, ProxyAsync):
+            self._liberar(anterior)  # compartilhado: não é de nenhuma thread
+        return principal
+
+    def tentar_conectar(self, tentativas, ao_falhar=None):
+        """
+        conectar() com backoff entre tentativas (a primeira é imediata)
+
+        Args:
+            tentativas: Máximo de tentativas
+            ao_falhar: Chamada com (tentativa, exceção, espera) após cada falha
+
+        Returns:
+            Conexão principal, ou None se todas falharam
+        """
+        for tentativa in range(tentativas):
+            try:
+                return self.conectar()
+            except Exception as e:
+                if tentativa == tentativas - 1:
+                    if ao_falhar:
+                        ao_falhar(tentativa, e, 0)
+                    break
+                espera = espera_reconexao(tentativa)
+                if ao_falhar:
+                    ao_falhar(tentativa, e, espera)
+                time.sleep(espera)
+        return None
+
+    def proxy(self):
+        """
+        Conexão da thread atual, da geração atual
+
+        Returns:
+            Pyro4.Proxy, RoteadorShards ou ProxyAsync (compartilhado:
+            atende várias threads); None antes de conectar()
+        """
+        thread = threading.current_thread()
+        with self.lock:
+            principal, geracao = self.principal, self.geracao
+            if principal is None or isinstance(principal, ProxyAsync):
+                return principal
+            atual = self.proxies.get(thread)
+            if atual is not None and atual[0] == geracao:
+                return atual[1]
+
+        if atual is not None:
+            self._liberar(atual[1])  # de antes da reconexão
+
+        proxy = self._copiar(principal)
+        with self.lock:
+            self.proxies[thread] = (geracao, proxy)
+        return proxy
+
+    def liberar(self):
+        """Libera a conexão da thread atual (chamar ao fim de cada thread)"""
+        with self.lock:
+            atual = self.proxies.pop(threading.current_thread(), None)
+        if atual is not None and not isinstance(atual[1], ProxyAsync):
+            self._liberar(atual[1])
+
+    def fechar(self):
+        """
+        Libera a conexão desta thread e a compartilhada (asyncio)
+
+        As outras threads liberam as suas com liberar() ao terminar.
+        """
+        self.liberar()
+        with self.lock:
+            principal, self.principal = self.principal, None
+        if isinstance(principal, ProxyAsync):
+            self._liberar(principal)
+
+    # ---------------------------------------------------------- resolução
+
+    def _localizar(self):
+        """Conexão testada e de onde veio"""
+        if self.transporte == "async":
+            servidor = localizar_servidor("async")
+            servidor.ping()
+            return servidor, "async"
+
+        cache = self._ler_cache()
+        if cache:
+            try:
+                return self._do_cache(cache), "cache"
+            except Exception:
+                pass  # URI velha: resolve de novo
+
+        servidor = localizar_servidor()
+        self._gravar_cache(servidor)
+        return servidor, "nameserver"
+
+    def _do_cache(self, cache):
+        """Conecta pela URI (ou shards) do cache, com timeout curto"""
+        if disponivel(cache.get("serializador")):
+            Pyro4.config.SERIALIZER = cache["serializador"]
+
+        if cache.get("shards"):
+            servidor = RoteadorShards(cache["shards"])
+            proxies = list(servidor.proxies.values())
+        else:
+            servidor = Pyro4.Proxy(cache["uri"])
+            proxies = [servidor]
+
+        try:
+            for proxy in proxies:
+                proxy._pyroTimeout = CONNECT_TIMEOUT
+            servidor.ping()
+            # Réplica ainda não promovida (ou primário deposto) responde,
+            # mas recusa escritas
+            if not cache.get("shards") and servidor.obter_estatisticas().get("papel") != "primario":
+                raise Pyro4.errors.CommunicationError("URI em cache não é do primário")
+        except Exception:
+            self._liberar(servidor)
+            raise
+        finally:
+            for proxy in proxies:
+                proxy._pyroTimeout = None
+        return servidor
+
+    def _chave_cache(self):
+        """Identifica o que foi resolvido (cache de outro Name Server não vale)"""
+        return f"{CHAT_SERVER_NAME}@{Pyro4.config.NS_HOST}:{Pyro4.config.NS_PORT}"
+
+    def _ler_cache(self):
+        """Conteúdo do cache, ou None se ausente, inválido ou de outro servidor"""
+        if not self.arquivo_cache:
+            return None
+        try:
+            with open(self.arquivo_cache, encoding="utf-8") as arquivo:
+                cache = json.load(arquivo)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(cache, dict) or cache.get("chave") != self._chave_cache():
+            return None
+        return cache
+
+    def _gravar_cache(self, servidor):
+        """Grava a resolução (arquivo temporário + rename: nunca fica pela metade)"""
+        if not self.arquivo_cache:
+            return
+
+        cache = {"chave": self._chave_cache(), "serializador": Pyro4.config.SERIALIZER}
+        if isinstance(servidor, RoteadorShards):
+            cache["shards"] = servidor.uris
+        else:
+            cache["uri"] = str(servidor._pyroUri)
+
+        temporario = f"{self.arquivo_cache}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.arquivo_cache) or ".", exist_ok=True)
+            with open(temporario, "w", encoding="utf-8") as arquivo:
+                json.dump(cache, arquivo)
+            os.replace(temporario, self.arquivo_cache)
+        except OSError:
+            pass  # sem cache, a próxima conexão usa o Name Server
+
+    # ---------------------------------------------------------- proxies
+
+    @staticmethod
+    def _copiar(principal):
+        """Conexão independente com o mesmo servidor"""
+        if isinstance(principal, RoteadorShards):
+            return principal.clonar()
+        return Pyro4.Proxy(principal._pyroUri)
+
+    @staticmethod
+    def _liberar(proxy):
+        """Fecha uma conexão, ignorando erros"""
+        try:
+            if isinstance(proxy, (RoteadorShards, ProxyAsync)):
+                proxy.fechar()
+            else:
+                proxy._pyroRelease()
+        except Exception:
+            pass
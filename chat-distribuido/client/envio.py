@@ -0,0 +1,119 @@
+"""
+Envio de mensagens em segundo plano
+O cliente enfileira e volta ao prompt; uma thread com proxy próprio (do
+GerenciadorConexao) faz as chamadas e confirma cada mensagem por um Future
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import Pyro4
+
+from config.settings import SALA_PADRAO, SEND_QUEUE_SIZE
+
+from client.conexao import abrir_conexao, espera_reconexao
+
+
+class FilaEnvio(threading.Thread):
+    """
+    Fila de saída com uma thread de envio
+
+    enviar() não faz rede: devolve um Future que recebe a resposta do
+    servidor ((sucesso, mensagem)) ou a exceção da chamada, e a thread
+    envia na ordem de chegada pelo seu próprio proxy. Recusas (rate
+    limit, conteúdo bloqueado) chegam depois, pelo callback ao_concluir.
+
+    Só uma falha ao abrir a conexão é tentada de novo (nada foi
+    enviado); uma falha durante a chamada (timeout, conexão fechada)
+    vai para o Future, porque o servidor pode ter gravado a mensagem e
+    repetir a duplicaria.
+    """
+
+    def __init__(self, conexao, ao_concluir=None, capacidade=SEND_QUEUE_SIZE):
+        """
+        Args:
+            conexao: GerenciadorConexao; o proxy da thread é pedido a
+                cada mensagem, então acompanha as reconexões
+            ao_concluir: Chamada com o Future de cada envio, na thread
+                de envio
+            capacidade: Mensagens aguardando envio
+        """
+        super().__init__(name="FilaEnvio", daemon=True)
+        self.conexao = conexao
+        self.ao_concluir = ao_concluir
+        self.fila = queue.Queue(capacidade)
+
+    def enviar(self, *argumentos):
+        """
+        Enfileira uma chamada enviar_mensagem
+
+        Args:
+            *argumentos: Argumentos de ChatServer.enviar_mensagem
+
+        Returns:
+            Future: Confirmação do servidor
+
+        Raises:
+            queue.Full: Fila cheia (servidor lento ou inacessível)
+        """
+        futuro = Future()
+        if self.ao_concluir:
+            futuro.add_done_callback(self.ao_concluir)
+        self.fila.put_nowait((argumentos, futuro))
+        return futuro
+
+    def encerrar(self, espera=2.0):
+        """
+        Para a thread depois de enviar o que já está na fila
+
+        Args:
+            espera: Segundos esperando o envio das pendentes
+        """
+        if not self.is_alive():
+            return
+        self.fila.put(None)
+        self.join(espera)
+
+    def run(self):
+        while True:
+            item = self.fila.get()
+            if item is None:
+                break
+
+            argumentos, futuro = item
+            if not futuro.set_running_or_notify_cancel():
+                continue
+
+            try:
+                proxy = self._conectado(argumentos)
+                resultado = proxy.enviar_mensagem(*argumentos)
+            except Exception as e:
+                futuro.set_exception(e)
+            else:
+                futuro.set_result(resultado)
+
+        self.conexao.liberar()
+
+    def _conectado(self, argumentos):
+        """
+        Proxy da thread com a conexão já aberta
+
+        Se não conectou, espera e tenta uma vez mais, pegando a conexão
+        nova se o cliente reconectou nesse meio tempo.
+
+        Raises:
+            Pyro4.errors.CommunicationError, ConnectionError: Se não
+            conectou nas duas tentativas
+        """
+        sala = argumentos[2] if len(argumentos) > 2 else SALA_PADRAO
+        for tentativa in range(2):
+            proxy = self.conexao.proxy()
+            try:
+                abrir_conexao(proxy, sala)
+                return proxy
+            except (Pyro4.errors.CommunicationError, ConnectionError):
+                if tentativa:
+                    raise
+                time.sleep(espera_reconexao(0))
@@ -0,0 +1,90 @@
+"""
+Exporta o histórico de uma sala para um arquivo JSON lines comprimido
+
+Usa iterar_historico: as mensagens chegam em páginas e vão direto para
+o arquivo, então a memória não cresce com o tamanho do histórico. A
+compressão do arquivo segue a extensão (.gz, .xz ou sem compressão).
+
+Uso:
+    python -m client.exportar [--sala geral] [--desde 0] [--ate N]
+                              [--lote 500] [--saida historico.jsonl.gz]
+"""
+
+import argparse
+import gzip
+import json
+import lzma
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import SALA_PADRAO, HISTORY_STREAM_PAGE, BATCH_COMPRESSION
+from common.compressao import descompactar_lote
+from common.serializacao import configurar
+from client.conexao import localizar_servidor
+
+
+def abrir_saida(caminho):
+    """Abre o arquivo de saída em texto, comprimido conforme a extensão"""
+    if caminho.endswith(".gz"):
+        return gzip.open(caminho, "wt", encoding="utf-8")
+    if caminho.endswith(".xz"):
+        return lzma.open(caminho, "wt", encoding="utf-8")
+    return open(caminho, "w", encoding="utf-8")
+
+
+def exportar(servidor, caminho, sala=SALA_PADRAO, desde_seq=0, ate_seq=None,
+             lote=HISTORY_STREAM_PAGE):
+    """
+    Grava o histórico da sala, uma mensagem por linha
+
+    Args:
+        servidor: Proxy do servidor (ou RoteadorShards)
+        caminho: Arquivo de saída
+        sala: Nome da sala
+        desde_seq: Começa depois desta sequência
+        ate_seq: Termina nesta sequência (None = até a última)
+        lote: Mensagens por página
+
+    Returns:
+        int: Mensagens exportadas
+    """
+    total = 0
+
+    with abrir_saida(caminho) as saida:
+        paginas = servidor.iterar_historico(desde_seq, ate_seq, lote, sala, BATCH_COMPRESSION)
+        for pagina in paginas:
+            for msg in descompactar_lote(pagina):
+                saida.write(json.dumps(msg, ensure_ascii=False, separators=(",", ":")))
+                saida.write("\n")
+            total += len(pagina) if isinstance(pagina, list) else pagina["quantidade"]
+
+    return total
+
+
+def main():
+    """Ponto de entrada"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sala", default=SALA_PADRAO)
+    parser.add_argument("--desde", type=int, default=0)
+    parser.add_argument("--ate", type=int, default=None)
+    parser.add_argument("--lote", type=int, default=HISTORY_STREAM_PAGE)
+    parser.add_argument("--saida", default=None)
+    args = parser.parse_args()
+
+    saida = args.saida or f"{args.sala}.jsonl.gz"
+
+    configurar()
+    servidor = localizar_servidor()
+
+    inicio = time.perf_counter()
+    total = exportar(servidor, saida, args.sala, args.desde, args.ate, args.lote)
+    duracao = time.perf_counter() - inicio
+
+    print(f"✅ {total} mensagens de #{args.sala} em {saida} ({duracao:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
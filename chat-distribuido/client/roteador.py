@@ -0,0 +1,397 @@
+"""
+Roteamento de salas entre shards do servidor
+Cada sala vive em um único shard, escolhido por hash consistente
+"""
+
+import queue
+import threading
+import time
+
+import Pyro4
+
+from config.settings import (
+    SALA_PADRAO,
+    SHARD_NAME_PREFIX,
+    SHARD_REFRESH_INTERVAL,
+    LONG_POLL_TIMEOUT,
+    POLLING_INTERVAL,
+    HISTORY_STREAM_PAGE,
+    SEARCH_MAX_RESULTS,
+)
+
+from common.hashring import AnelConsistente
+from common.compressao import descompactar_lote
+
+
+def listar_shards(ns=None):
+    """
+    Consulta os shards registrados no Name Server
+
+    Args:
+        ns: Proxy do Name Server (localiza se None)
+
+    Returns:
+        dict: Nome do shard -> URI
+    """
+    ns = ns or Pyro4.locateNS()
+    return dict(ns.list(prefix=SHARD_NAME_PREFIX))
+
+
+class ColetorShard(threading.Thread):
+    """
+    Long-poll contínuo em um shard
+
+    Usa proxy próprio e guarda a última sequência de cada sala que já
+    entregou, então nunca pede de novo o mesmo lote.
+    """
+
+    def __init__(self, uri, usuario, ultimos, saida, compressao=None):
+        """
+        Args:
+            uri: URI do shard
+            usuario: Nome do usuário
+            ultimos: Sequências iniciais (sala -> seq)
+            saida: Fila onde os lotes (ou exceções) são colocados
+            compressao: Formato de lote comprimido aceito
+        """
+        super().__init__(daemon=True)
+        self.uri = uri
+        self.usuario = usuario
+        self.ultimos = dict(ultimos)
+        self.saida = saida
+        self.compressao = compressao
+        self.ativo = True
+
+    def run(self):
+        servidor = Pyro4.Proxy(self.uri)
+
+        while self.ativo:
+            inicio = time.monotonic()
+            try:
+                mensagens = descompactar_lote(servidor.obter_mensagens(
+                    self.usuario, self.ultimos, LONG_POLL_TIMEOUT, self.compressao
+                ))
+            except Exception as e:
+                self.ativo = False
+                self.saida.put(e)
+                break
+
+            for m in mensagens:
+                sala = m["sala"]
+                if m["tipo"] == "lacuna":
+                    self.ultimos[sala] = m["seq"]
+                else:
+                    self.ultimos[sala] = max(self.ultimos.get(sala, 0), m["seq"])
+
+            if mensagens and self.ativo:
+                self.saida.put(mensagens)
+            elif time.monotonic() - inicio < POLLING_INTERVAL:
+                time.sleep(POLLING_INTERVAL)  # shard sem long-poll (multiplex)
+
+        servidor._pyroRelease()
+
+
+class RoteadorShards:
+    """
+    Fachada com a mesma interface do ChatServer sobre vários shards
+
+    O usuário é registrado em todos os shards; operações de sala vão
+    para o shard dono da sala. A lista de shards é relida do Name Server
+    periodicamente e quando um shard responde que a sala foi movida; as
+    salas do usuário que mudaram de dono são reentradas no novo shard.
+
+    Como um Pyro4.Proxy, cada instância deve ser usada por uma thread
+    (ver clonar).
+    """
+
+    def __init__(self, shards=None):
+        """
+        Args:
+            shards: Nome -> URI dos shards (consulta o Name Server se None)
+        """
+        self.uris = {}
+        self.proxies = {}
+        self.anel = AnelConsistente()
+        self.atualizado_em = 0
+
+        self.usuario = None
+        self.salas = {SALA_PADRAO}  # salas do usuário (para reentrar)
+        self.uri_push = None
+
+        self.coletores = {}  # shard -> ColetorShard
+        self.fila = queue.Queue()
+
+        self._definir_shards(shards if shards is not None else listar_shards())
+
+    def clonar(self):
+        """
+        Cria roteador independente (proxies próprios) para outra thread
+
+        Returns:
+            RoteadorShards: Novo roteador com os mesmos shards
+        """
+        clone = RoteadorShards(self.uris)
+        clone.usuario = self.usuario
+        clone.salas = self.salas
+        clone.uri_push = self.uri_push
+        return clone
+
+    def fechar(self):
+        """Para os coletores e libera as conexões"""
+        self.fechar_coletores()
+        for proxy in self.proxies.values():
+            proxy._pyroRelease()
+
+    def abrir(self, sala=SALA_PADRAO):
+        """
+        Conecta ao shard dono da sala, sem chamar nada nele
+
+        Raises:
+            Pyro4.errors.CommunicationError: Se não conectou
+        """
+        proxy = self.proxies[self._dono(sala)]
+        if proxy._pyroConnection is None:
+            proxy._pyroBind()
+
+    # ---------------------------------------------------------- interface
+
+    def ping(self):
+        return all(p.ping() for p in self.proxies.values())
+
+    def registrar_usuario(self, nome):
+        dono = self._dono(SALA_PADRAO)
+        sucesso, mensagem = self.proxies[dono].registrar_usuario(nome)
+        if not sucesso:
+            return sucesso, mensagem
+
+        for shard, proxy in self.proxies.items():
+            if shard != dono:
+                proxy.registrar_usuario(nome, False)
+
+        self.usuario = nome
+        return sucesso, mensagem
+
+    def desconectar_usuario(self, nome):
+        self.fechar_coletores()
+        for proxy in self.proxies.values():
+            proxy.desconectar_usuario(nome)
+
+    def entrar_sala(self, usuario, sala):
+        sucesso, mensagem = self._na_sala("entrar_sala", sala, usuario, sala)
+        if sucesso:
+            self.salas.add(sala)
+        return sucesso, mensagem
+
+    def sair_sala(self, usuario, sala):
+        sucesso, mensagem = self._na_sala("sair_sala", sala, usuario, sala)
+        if sucesso:
+            self.salas.discard(sala)
+        return sucesso, mensagem
+
+    def listar_salas(self, usuario=None):
+        self._atualizar()
+        salas = []
+        for shard, proxy in self.proxies.items():
+            # A sala padrão existe em todos os shards; só vale a do dono
+            salas.extend(
+                s for s in proxy.listar_salas(usuario)
+                if self.anel.no_para(s["nome"]) == shard
+            )
+        return sorted(salas, key=lambda s: s["nome"])
+
+    def obter_membros(self, sala=SALA_PADRAO):
+        return self._na_sala("obter_membros", sala, sala)
+
+    def enviar_mensagem(self, remetente, conteudo, sala=SALA_PADRAO, rastreio=None):
+        return self._na_sala("enviar_mensagem", sala, remetente, conteudo, sala, rastreio)
+
+    def obter_historico(self, limite=20, sala=SALA_PADRAO, compressao=None):
+        return self._na_sala("obter_historico", sala, limite, sala, compressao)
+
+    def iterar_historico(self, desde_seq=0, ate_seq=None, lote=HISTORY_STREAM_PAGE,
+                         sala=SALA_PADRAO, compressao=None):
+        # Iterador remoto do shard dono (preso ao proxy dele)
+        return self.proxies[self._dono(sala)].iterar_historico(
+            desde_seq, ate_seq, lote, sala, compressao
+        )
+
+    def buscar_mensagens(self, desde=None, ate=None, remetente=None, sala=SALA_PADRAO,
+                         limite=SEARCH_MAX_RESULTS, compressao=None):
+        return self._na_sala(
+            "buscar_mensagens", sala, desde, ate, remetente, sala, limite, compressao
+        )
+
+    def pesquisar(self, termos, limite=20, sala=SALA_PADRAO, compressao=None):
+        return self._na_sala("pesquisar", sala, termos, limite, sala, compressao)
+
+    def obter_mensagens(self, usuario, ultimo_id, timeout=0, compressao=None):
+        """
+        Junta mensagens de todos os shards
+
+        Com timeout > 0 cada shard tem um coletor em long-poll contínuo
+        e a chamada retorna assim que qualquer um entregar um lote.
+        """
+        self._atualizar()
+
+        if not timeout:
+            resposta = []
+            for proxy in self.proxies.values():
+                resposta.extend(descompactar_lote(
+                    proxy.obter_mensagens(usuario, ultimo_id, 0, compressao)
+                ))
+            return resposta
+
+        for shard, uri in self.uris.items():
+            coletor = self.coletores.get(shard)
+            if coletor is None or not coletor.ativo:
+                coletor = ColetorShard(uri, usuario, ultimo_id, self.fila, compressao)
+                self.coletores[shard] = coletor
+                coletor.start()
+
+        try:
+            lotes = [self.fila.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+
+        while not self.fila.empty():
+            lotes.append(self.fila.get_nowait())
+
+        resposta = []
+        erros = []
+        for lote in lotes:
+            if isinstance(lote, Exception):
+                erros.append(lote)
+            else:
+                resposta.extend(lote)
+
+        if erros:
+            self.atualizado_em = 0  # shard caiu: relê a lista
+            if not resposta:
+                raise erros[0]
+            for erro in erros:
+                self.fila.put(erro)  # entrega o que chegou, falha na próxima
+        return resposta
+
+    def fechar_coletores(self):
+        """Para os coletores de long-poll"""
+        for coletor in self.coletores.values():
+            coletor.ativo = False
+        self.coletores = {}
+
+    def inscrever_push(self, usuario, uri_callback, ultimo_id):
+        for proxy in self.proxies.values():
+            sucesso, mensagem = proxy.inscrever_push(usuario, uri_callback, ultimo_id)
+            if not sucesso:
+                return sucesso, mensagem
+        self.uri_push = uri_callback
+        return True, mensagem
+
+    def cancelar_push(self, usuario):
+        self.uri_push = None
+        for proxy in self.proxies.values():
+            proxy.cancelar_push(usuario)
+
+    def push_ativo(self, usuario):
+        self._atualizar()
+        return all(p.push_ativo(usuario) for p in self.proxies.values())
+
+    def obter_usuarios_online(self):
+        online = set()
+        for proxy in self.proxies.values():
+            online.update(proxy.obter_usuarios_online())
+        return sorted(online)
+
+    def obter_estatisticas(self):
+        todas = [p.obter_estatisticas() for p in self.proxies.values()]
+        maior = max(todas, key=lambda s: s["uptime_segundos"])
+        return {
+            "usuarios_online": len(self.obter_usuarios_online()),
+            "total_mensagens": sum(s["total_mensagens"] for s in todas),
+            "total_usuarios_historico": max(s["total_usuarios_historico"] for s in todas),
+            "pico_usuarios": max(s["pico_usuarios"] for s in todas),
+            "salas": len(self.listar_salas()),
+            "shards": len(todas),
+            "uptime_segundos": maior["uptime_segundos"],
+            "uptime_formatado": maior["uptime_formatado"],
+        }
+
+    def reportar_latencia(self, usuario, agregados):
+        # Agregados de todas as salas vão para o shard da sala padrão
+        return self._na_sala("reportar_latencia", SALA_PADRAO, usuario, agregados)
+
+    def obter_latencia(self):
+        return self.proxies[self._dono(SALA_PADRAO)].obter_latencia()
+
+    # ------------------------------------------------------------ interno
+
+    def _dono(self, sala):
+        """Shard dono da sala"""
+        self._atualizar()
+        if not self.anel:
+            raise Pyro4.errors.NamingError("Nenhum shard registrado")
+        return self.anel.no_para(sala)
+
+    def _na_sala(self, metodo, sala, *args):
+        """Chama método no dono da sala; relê os shards se ela foi movida"""
+        resultado = getattr(self.proxies[self._dono(sala)], metodo)(*args)
+
+        # Respostas (sucesso, texto) chegam como lista com serializador json
+        movida = (
+            not isinstance(resultado, dict)
+            and len(resultado) == 2 and resultado[0] is False
+            and str(resultado[1]).startswith("↪️")
+        )
+        if not movida:
+            return resultado
+
+        self._atualizar(forcar=True)
+        return getattr(self.proxies[self._dono(sala)], metodo)(*args)
+
+    def _atualizar(self, forcar=False):
+        """Relê a lista de shards (no máximo a cada SHARD_REFRESH_INTERVAL)"""
+        if not forcar and time.time() - self.atualizado_em < SHARD_REFRESH_INTERVAL:
+            return
+
+        try:
+            shards = listar_shards()
+        except Pyro4.errors.NamingError:
+            return  # mantém a lista atual
+        self._definir_shards(shards)
+
+    def _definir_shards(self, shards):
+        """Troca o conjunto de shards e reentra nas salas que mudaram de dono"""
+        self.atualizado_em = time.time()
+        if shards == self.uris:
+            return
+
+        anterior = self.anel
+        self.anel = AnelConsistente(shards)
+
+        for shard in set(self.uris) - set(shards):
+            self.proxies.pop(shard)._pyroRelease()
+            coletor = self.coletores.pop(shard, None)
+            if coletor:
+                coletor.ativo = False
+
+        for shard, uri in shards.items():
+            if self.uris.get(shard) != uri:
+                self.proxies[shard] = Pyro4.Proxy(uri)
+                coletor = self.coletores.pop(shard, None)
+                if coletor:
+                    coletor.ativo = False
+
+        novos = set(shards) - set(self.uris)
+        self.uris = dict(shards)
+
+        if self.usuario is None or not len(anterior):
+            return
+
+        for shard in novos:
+            self.proxies[shard].registrar_usuario(self.usuario, False)
+            if self.uri_push:
+                self.proxies[shard].inscrever_push(self.usuario, self.uri_push, {})
+
+        for sala in sorted(self.salas):
+            dono = self.anel.no_para(sala)
+            if anterior.no_para(sala) != dono:
+                self.proxies[dono].entrar_sala(self.usuario, sala)
@@ -0,0 +1,187 @@
+"""
+Transporte asyncio do cliente (protocolo de common.quadros)
+ConexaoAsync é a conexão assíncrona com o front end do servidor (ver
+server.frente_async); ProxyAsync a usa com a mesma interface síncrona
+do Pyro4.Proxy, para o ChatClient
+"""
+
+import asyncio
+import functools
+import itertools
+import threading
+
+from config.settings import ASYNC_SERVER_HOST, ASYNC_FRONTEND_PORT
+
+from common.quadros import codificar, ler_quadro
+
+
+class ErroRemoto(Exception):
+    """Exceção levantada pelo método no servidor ("Tipo: texto")"""
+
+
+class ConexaoAsync:
+    """
+    Conexão com o front end asyncio
+
+    As chamadas são corrotinas (await conexao.enviar_mensagem(...)) e
+    várias podem estar em andamento ao mesmo tempo: cada resposta é
+    casada com o pedido pelo id. Uma conexão por sessão custa só um
+    socket e uma tarefa de leitura, então um processo abre milhares.
+    """
+
+    def __init__(self, host=ASYNC_SERVER_HOST, porta=ASYNC_FRONTEND_PORT):
+        """
+        Args:
+            host: Host do front end
+            porta: Porta do front end
+        """
+        self.host = host
+        self.porta = porta
+        self.leitor = None
+        self.escritor = None
+        self.tarefa_leitura = None
+        self.ids = itertools.count(1)
+        self.pendentes = {}  # id -> future da resposta
+        self.erro = None  # motivo do fim da conexão
+
+    async def __aenter__(self):
+        await self.abrir()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.fechar()
+
+    def __getattr__(self, nome):
+        if nome.startswith("_"):
+            raise AttributeError(nome)
+        return functools.partial(self.chamar, nome)
+
+    async def abrir(self):
+        """Conecta ao front end"""
+        self.leitor, self.escritor = await asyncio.open_connection(self.host, self.porta)
+        self.erro = None
+        self.tarefa_leitura = asyncio.create_task(self._ler())
+
+    async def fechar(self):
+        """Encerra a conexão; chamadas em andamento recebem ConnectionError"""
+        if self.escritor is None:
+            return
+        self.escritor.close()
+        self.tarefa_leitura.cancel()
+        try:
+            await self.tarefa_leitura
+        except asyncio.CancelledError:
+            pass
+        self._falhar(ConnectionError("conexão encerrada"))
+        self.escritor = None
+
+    async def chamar(self, metodo, *args):
+        """
+        Chama um método do ChatServer
+
+        Args:
+            metodo: Nome do método
+            *args: Argumentos (serializáveis em JSON)
+
+        Returns:
+            Resultado do método (tuplas chegam como listas)
+
+        Raises:
+            ErroRemoto: Se o método levantou exceção no servidor
+            ConnectionError: Se a conexão caiu ou não foi aberta
+        """
+        if self.escritor is None or self.erro is not None:
+            raise ConnectionError(self.erro or "conexão não aberta")
+
+        id_pedido = next(self.ids)
+        futuro = asyncio.get_running_loop().create_future()
+        self.pendentes[id_pedido] = futuro
+        try:
+            self.escritor.write(codificar({"id": id_pedido, "metodo": metodo, "args": list(args)}))
+            await self.escritor.drain()
+            return await futuro
+        finally:
+            self.pendentes.pop(id_pedido, None)
+
+    async def _ler(self):
+        """Tarefa que lê as respostas e completa os futures"""
+        try:
+            while True:
+                resposta = await ler_quadro(self.leitor)
+                if resposta is None:
+                    raise ConnectionError("servidor encerrou a conexão")
+
+                futuro = self.pendentes.get(resposta.get("id"))
+                if futuro is None or futuro.done():
+                    continue
+                if "erro" in resposta:
+                    futuro.set_exception(ErroRemoto(resposta["erro"]))
+                else:
+                    futuro.set_result(resposta.get("resultado"))
+
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError) as e:
+            self._falhar(ConnectionError(str(e) or type(e).__name__))
+
+    def _falhar(self, erro):
+        """Marca a conexão como encerrada e falha as chamadas pendentes"""
+        self.erro = str(erro)
+        for futuro in self.pendentes.values():
+            if not futuro.done():
+                futuro.set_exception(erro)
+
+
+class ProxyAsync:
+    """
+    Fachada síncrona de ConexaoAsync para o ChatClient
+
+    Tem a forma de um Pyro4.Proxy (servidor.enviar_mensagem(...)) e
+    roda a conexão em um laço asyncio próprio, em uma thread daemon.
+    Pode ser usada por várias threads ao mesmo tempo: o long-poll da
+    thread de recebimento não bloqueia os envios da principal.
+    """
+
+    def __init__(self, host=ASYNC_SERVER_HOST, porta=ASYNC_FRONTEND_PORT):
+        """
+        Args:
+            host: Host do front end
+            porta: Porta do front end
+
+        Raises:
+            OSError: Se não conectou
+        """
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="ProxyAsync", daemon=True)
+        self.thread.start()
+        self.conexao = ConexaoAsync(host, porta)
+        try:
+            self._executar(self.conexao.abrir())
+        except BaseException:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def __getattr__(self, nome):
+        if nome.startswith("_"):
+            raise AttributeError(nome)
+        return functools.partial(self._chamar, nome)
+
+    def _chamar(self, metodo, *args):
+        return self._executar(self.conexao.chamar(metodo, *args))
+
+    def _executar(self, corotina):
+        """Roda a corrotina no laço da conexão e espera o resultado"""
+        return asyncio.run_coroutine_threadsafe(corotina, self.loop).result()
+
+    def fechar(self):
+        """Encerra a conexão e o laço"""
+        if not self.loop.is_running():
+            return
+        try:
+            self._executar(self.conexao.fechar())
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
@@ -0,0 +1,87 @@
+"""
+Compressão de lotes de mensagens
+Respostas grandes (histórico, recuperação após reconexão) viajam como um
+único bloco comprimido em vez de milhares de dicionários pequenos
+"""
+
+import base64
+import json
+import lzma
+import zlib
+
+from config.settings import BATCH_COMPRESSION_THRESHOLD
+
+FORMATOS = {
+    "zlib": (zlib.compress, zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+# Nenhuma mensagem codificada em JSON tem menos que isso: lotes menores
+# que limite / _BYTES_MINIMOS nem chegam a ser codificados
+_BYTES_MINIMOS = 64
+
+
+def lote_compactado(obj):
+    """
+    Verifica se a resposta é um lote comprimido
+
+    Args:
+        obj: Resposta de obter_mensagens/obter_historico
+
+    Returns:
+        bool: True se for o formato de compactar_lote
+    """
+    return isinstance(obj, dict) and "compactado" in obj
+
+
+def compactar_lote(mensagens, formato, binario=True, limite=BATCH_COMPRESSION_THRESHOLD):
+    """
+    Comprime lote de mensagens se ele passar do limite
+
+    Args:
+        mensagens: Lista de dicionários de mensagem
+        formato: "zlib" ou "lzma" (None devolve o lote sem mudança)
+        binario: Se o serializador transporta bytes; senão usa base64
+        limite: Tamanho mínimo em bytes (JSON) para comprimir
+
+    Returns:
+        list ou dict: O próprio lote ou {"compactado", "dados", "base64",
+        "quantidade"}
+    """
+    if formato not in FORMATOS or len(mensagens) * _BYTES_MINIMOS < limite:
+        return mensagens
+
+    bruto = json.dumps(mensagens, ensure_ascii=False, separators=(",", ":")).encode()
+    if len(bruto) < limite:
+        return mensagens
+
+    dados = FORMATOS[formato][0](bruto)
+    if not binario:
+        dados = base64.b64encode(dados).decode("ascii")
+
+    return {
+        "compactado": formato,
+        "dados": dados,
+        "base64": not binario,
+        "quantidade": len(mensagens),
+    }
+
+
+def descompactar_lote(lote):
+    """
+    Devolve a lista de dicionários de um lote (comprimido ou não)
+
+    Args:
+        lote: Resposta de obter_mensagens/obter_historico
+
+    Returns:
+        list: Dicionários de mensagem
+    """
+    if not lote_compactado(lote):
+        return lote
+
+    dados = lote["dados"]
+    if lote["base64"]:
+        dados = base64.b64decode(dados)
+
+    return json.loads(FORMATOS[lote["compactado"]][1](dados))
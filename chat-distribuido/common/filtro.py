@@ -0,0 +1,257 @@
+"""
+Filtro de conteúdo por lista de bloqueio
+Autômato Aho-Corasick: procura milhares de termos em uma única passada
+pelo texto, em tempo linear no tamanho da mensagem
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from config.settings import BLOCKLIST_FILE, BLOCKLIST_RELOAD_INTERVAL
+from common.utils import normalizar, caminho_do_pacote
+
+
+def preparar(texto):
+    """Normaliza e reduz espaços seguidos a um só"""
+    return " ".join(normalizar(texto).split())
+
+
+def _caractere_de_palavra(c):
+    """Letras, dígitos e _ formam palavras (como \\w)"""
+    return c.isalnum() or c == "_"
+
+
+class AhoCorasick:
+    """
+    Autômato de Aho-Corasick sobre termos normalizados (minúsculas, sem
+    acentos e com espaços simples, tanto nos termos quanto no texto)
+
+    Cada estado é um nó da trie dos termos, com transições em dicionário,
+    link de falha (maior sufixo que também é prefixo de algum termo) e
+    os termos que terminam nele (incluindo os herdados pela falha).
+
+    Imutável depois de construído: buscas concorrentes não precisam de
+    lock, e a recarga troca o autômato inteiro.
+
+    Attributes:
+        termos (list): Termos distintos, normalizados
+    """
+
+    def __init__(self, termos):
+        """
+        Compila o autômato
+
+        Args:
+            termos: Iterável de termos (normalizados aqui)
+        """
+        self.termos = sorted({t for t in map(preparar, termos) if t})
+        self.transicoes = [{}]
+        self.falha = [0]
+        self.saidas = [()]
+
+        for termo in self.termos:
+            estado = 0
+            for c in termo:
+                proximo = self.transicoes[estado].get(c)
+                if proximo is None:
+                    proximo = len(self.transicoes)
+                    self.transicoes[estado][c] = proximo
+                    self.transicoes.append({})
+                    self.falha.append(0)
+                    self.saidas.append(())
+                estado = proximo
+            self.saidas[estado] = (termo,)
+
+        # Links de falha em largura: a falha de um nó é resolvida antes
+        # da dos seus filhos
+        fila = deque(self.transicoes[0].values())
+        while fila:
+            estado = fila.popleft()
+            for c, filho in self.transicoes[estado].items():
+                fila.append(filho)
+                falha = self.falha[estado]
+                while falha and c not in self.transicoes[falha]:
+                    falha = self.falha[falha]
+                destino = self.transicoes[falha].get(c, 0)
+                self.falha[filho] = destino if destino != filho else 0
+                self.saidas[filho] = self.saidas[filho] + self.saidas[self.falha[filho]]
+
+    def __len__(self):
+        return len(self.termos)
+
+    def procurar(self, texto, palavra_inteira=False):
+        """
+        Ocorrências dos termos no texto (já preparado)
+
+        Args:
+            texto: Texto normalizado, com espaços simples
+            palavra_inteira: Só aceita ocorrências que não estejam
+                coladas em letras/dígitos dos dois lados
+
+        Yields:
+            tuple: (início, termo)
+        """
+        transicoes = self.transicoes
+        falha = self.falha
+        saidas = self.saidas
+        raiz = transicoes[0]
+        estado = 0
+
+        for i, c in enumerate(texto):
+            if estado == 0 and c not in raiz:
+                continue  # caso mais comum: nenhum termo começa aqui
+
+            while estado and c not in transicoes[estado]:
+                estado = falha[estado]
+            estado = transicoes[estado].get(c, 0)
+
+            for termo in saidas[estado]:
+                inicio = i - len(termo) + 1
+                if palavra_inteira and not self._isolado(texto, inicio, i + 1, termo):
+                    continue
+                yield inicio, termo
+
+    @staticmethod
+    def _isolado(texto, inicio, fim, termo):
+        """Confere as fronteiras de palavra nas pontas do termo"""
+        if inicio > 0 and _caractere_de_palavra(termo[0]) and _caractere_de_palavra(texto[inicio - 1]):
+            return False
+        if fim < len(texto) and _caractere_de_palavra(termo[-1]) and _caractere_de_palavra(texto[fim]):
+            return False
+        return True
+
+    def primeiro(self, texto, palavra_inteira=False):
+        """
+        Primeiro termo encontrado no texto
+
+        Args:
+            texto: Texto original (preparado aqui)
+            palavra_inteira: Ver procurar
+
+        Returns:
+            str: Termo encontrado ou None
+        """
+        for _, termo in self.procurar(preparar(texto), palavra_inteira):
+            return termo
+        return None
+
+
+class ListaBloqueio:
+    """
+    Lista de bloqueio carregada de arquivo, com recarga automática
+
+    O arquivo tem um termo (ou expressão) por linha; linhas vazias e
+    iniciadas por # são ignoradas. A cada intervalo o mtime do arquivo
+    é conferido na própria chamada de verificação e, se mudou, o
+    autômato é recompilado e trocado sem interromper as buscas. Um
+    arquivo inválido ou ausente mantém a lista anterior. Arquivo
+    ausente ou sem termos gera um aviso (uma vez por situação): o
+    filtro não bloqueia nada.
+
+    Attributes:
+        caminho (str): Arquivo da lista
+        automato (AhoCorasick): Autômato em uso
+    """
+
+    def __init__(self, caminho=BLOCKLIST_FILE, intervalo=BLOCKLIST_RELOAD_INTERVAL):
+        """
+        Carrega a lista
+
+        Args:
+            caminho: Arquivo da lista (pode não existir); relativo à
+                pasta chat-distribuido, não à pasta de trabalho
+            intervalo: Segundos entre conferências do arquivo (0 = nunca)
+        """
+        self.caminho = caminho_do_pacote(caminho)
+        self.avisado = None  # último aviso dado (não repete a cada conferência)
+        self.intervalo = intervalo
+        self.automato = AhoCorasick(())
+        self.mtime = None
+        self.proxima_conferencia = 0.0
+        self.lock_recarga = threading.Lock()
+        self.recarregar()
+
+    def __len__(self):
+        return len(self.automato)
+
+    def recarregar(self):
+        """
+        Relê o arquivo se ele mudou desde a última carga
+
+        Returns:
+            bool: True se o autômato foi trocado
+        """
+        if not self.lock_recarga.acquire(blocking=False):
+            return False  # outra thread já está recarregando
+
+        try:
+            self.proxima_conferencia = time.monotonic() + self.intervalo
+            try:
+                mtime = os.stat(self.caminho).st_mtime_ns
+            except OSError:
+                self._avisar("ausente", f"⚠️  Lista de bloqueio {self.caminho} não encontrada: "
+                                        f"{len(self.automato)} termos")
+                return False
+            if mtime == self.mtime:
+                return False
+
+            try:
+                with open(self.caminho, encoding="utf-8") as arquivo:
+                    termos = [linha for linha in arquivo if not linha.lstrip().startswith("#")]
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"⚠️  Lista de bloqueio {self.caminho} não carregada: {e}")
+                return False
+
+            self.automato = AhoCorasick(termos)
+            self.mtime = mtime
+            if self.automato.termos:
+                self.avisado = None
+            else:
+                self._avisar("vazia", f"⚠️  Lista de bloqueio {self.caminho} sem termos: nada é bloqueado")
+            return True
+        finally:
+            self.lock_recarga.release()
+
+    def _avisar(self, situacao, texto):
+        """Imprime o aviso só quando a situação muda"""
+        if self.avisado != situacao:
+            self.avisado = situacao
+            print(texto)
+
+    def encontrar(self, texto, palavra_inteira=True):
+        """
+        Primeiro termo bloqueado presente no texto
+
+        Args:
+            texto: Texto original
+            palavra_inteira: Exige fronteira de palavra nas pontas do
+                termo (mensagens); False acha o termo colado em outras
+                letras (nomes de usuário)
+
+        Returns:
+            str: Termo encontrado ou None
+        """
+        if self.intervalo and time.monotonic() >= self.proxima_conferencia:
+            self.recarregar()
+        return self.automato.primeiro(texto, palavra_inteira)
+
+
+_lista_padrao = None
+_lock_padrao = threading.Lock()
+
+
+def lista_bloqueio():
+    """
+    Lista de bloqueio compartilhada pelo processo (BLOCKLIST_FILE)
+
+    Returns:
+        ListaBloqueio: Instância única, criada no primeiro uso
+    """
+    global _lista_padrao
+    if _lista_padrao is None:
+        with _lock_padrao:
+            if _lista_padrao is None:
+                _lista_padrao = ListaBloqueio()
+    return _lista_padrao
@@ -0,0 +1,97 @@
+"""
+Hash consistente para distribuir salas entre shards
+"""
+
+import bisect
+import hashlib
+
+from config.settings import HASH_VIRTUAL_NODES
+
+
+def _hash(texto):
+    """Hash estável (igual em todos os processos) de 64 bits"""
+    return int.from_bytes(hashlib.md5(texto.encode()).digest()[:8], "big")
+
+
+class AnelConsistente:
+    """
+    Anel de hash consistente com nós virtuais
+
+    Adicionar ou remover um nó só move as chaves dos pontos vizinhos
+    (cerca de 1/N das chaves).
+
+    Attributes:
+        nos (set): Nomes dos nós no anel
+        replicas (int): Nós virtuais por nó
+    """
+
+    def __init__(self, nos=(), replicas=HASH_VIRTUAL_NODES):
+        """
+        Cria anel
+
+        Args:
+            nos: Nomes iniciais dos nós
+            replicas: Nós virtuais por nó
+        """
+        self.replicas = replicas
+        self.nos = set()
+        self.pontos = []  # hashes ordenados
+        self.donos = {}   # hash -> nó
+
+        for no in nos:
+            self.adicionar(no)
+
+    def __len__(self):
+        return len(self.nos)
+
+    def __eq__(self, outro):
+        return isinstance(outro, AnelConsistente) and self.nos == outro.nos
+
+    def adicionar(self, no):
+        """
+        Adiciona nó ao anel
+
+        Args:
+            no: Nome do nó
+        """
+        if no in self.nos:
+            return
+
+        self.nos.add(no)
+        for i in range(self.replicas):
+            ponto = _hash(f"{no}#{i}")
+            self.donos[ponto] = no
+            bisect.insort(self.pontos, ponto)
+
+    def remover(self, no):
+        """
+        Remove nó do anel
+
+        Args:
+            no: Nome do nó
+        """
+        if no not in self.nos:
+            return
+
+        self.nos.discard(no)
+        for i in range(self.replicas):
+            ponto = _hash(f"{no}#{i}")
+            if self.donos.get(ponto) == no:
+                del self.donos[ponto]
+                self.pontos.pop(bisect.bisect_left(self.pontos, ponto))
+
+    def no_para(self, chave):
+        """
+        Retorna o nó responsável pela chave
+
+        Args:
+            chave: Texto (ex.: nome da sala)
+
+        Returns:
+            str: Nome do nó (None se o anel estiver vazio)
+        """
+        if not self.pontos:
+            return None
+
+        i = bisect.bisect(self.pontos, _hash(chave)) % len(self.pontos)
+        return self.donos[self.pontos[i]]
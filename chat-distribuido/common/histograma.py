@@ -0,0 +1,123 @@
+"""
+Histograma de faixas logarítmicas
+Usado nas métricas do servidor e nos agregados de latência que os
+clientes enviam (ver common.rastreio)
+"""
+
+import math
+
+# 2^-20 s (~1 µs) a 2^8 s (256 s), 16 faixas por potência de 2 (erro
+# relativo máximo de ~3% nos percentis)
+EXPOENTE_MIN = -20
+EXPOENTE_MAX = 8
+SUBFAIXAS = 16
+FAIXAS = (EXPOENTE_MAX - EXPOENTE_MIN) * SUBFAIXAS
+ESCALA = 2 * SUBFAIXAS  # mantissa em [0.5, 1) -> subfaixa
+
+
+class HistogramaLog:
+    """
+    Histograma de faixas logarítmicas (no estilo HDR)
+
+    Cada potência de 2 é dividida em SUBFAIXAS faixas lineares, então o
+    registro é O(1) (math.frexp) e a memória é fixa, sem guardar as
+    amostras. Valores fora da faixa vão para a primeira/última.
+    """
+
+    __slots__ = ("contagens", "total", "soma")
+
+    def __init__(self):
+        self.contagens = [0] * FAIXAS
+        self.total = 0
+        self.soma = 0.0
+
+    def registrar(self, segundos):
+        """
+        Conta uma amostra
+
+        Args:
+            segundos: Valor medido (zero ou negativo vai para a primeira faixa)
+        """
+        if segundos > 0:
+            mantissa, expoente = math.frexp(segundos)
+            faixa = (expoente - EXPOENTE_MIN) * SUBFAIXAS + int((mantissa - 0.5) * ESCALA)
+            faixa = min(max(faixa, 0), FAIXAS - 1)
+        else:
+            faixa = segundos = 0
+        self.contagens[faixa] += 1
+        self.total += 1
+        self.soma += segundos
+
+    def mesclar(self, outro):
+        """Soma as contagens de outro histograma a este"""
+        contagens = self.contagens
+        for i, n in enumerate(outro.contagens):
+            if n:
+                contagens[i] += n
+        self.total += outro.total
+        self.soma += outro.soma
+
+    def percentil(self, p):
+        """
+        Valor abaixo do qual estão p% das amostras
+
+        Args:
+            p: Percentil (0-100)
+
+        Returns:
+            float: Meio da faixa do percentil, em segundos (0 sem amostras)
+        """
+        if not self.total:
+            return 0.0
+
+        alvo = max(1, math.ceil(self.total * p / 100))
+        acumulado = 0
+        for faixa, n in enumerate(self.contagens):
+            acumulado += n
+            if acumulado >= alvo:
+                expoente, sub = divmod(faixa, SUBFAIXAS)
+                meio = 0.5 + (sub + 0.5) / (2 * SUBFAIXAS)
+                return math.ldexp(meio, expoente + EXPOENTE_MIN)
+        return 0.0
+
+    def exportar(self):
+        """
+        Forma compacta para enviar por RPC (só faixas não vazias)
+
+        Pares em lista em vez de dicionário: o serializador json
+        transformaria as chaves inteiras em strings.
+
+        Returns:
+            dict: {"faixas": [[faixa, contagem], ...], "soma": segundos}
+        """
+        return {
+            "faixas": [[i, n] for i, n in enumerate(self.contagens) if n],
+            "soma": self.soma,
+        }
+
+    @staticmethod
+    def importar(dados):
+        """
+        Reconstrói histograma exportado (vindo de outro processo)
+
+        Args:
+            dados: Retorno de exportar
+
+        Returns:
+            HistogramaLog: Novo histograma
+
+        Raises:
+            ValueError: Se os dados forem inválidos
+        """
+        histograma = HistogramaLog()
+        try:
+            for faixa, n in dados["faixas"]:
+                faixa, n = int(faixa), int(n)
+                if not 0 <= faixa < FAIXAS or n < 0:
+                    raise ValueError(f"faixa inválida: {faixa}")
+                histograma.contagens[faixa] += n
+                histograma.total += n
+            histograma.soma = max(float(dados["soma"]), 0.0)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"histograma inválido: {e}") from e
+        return histograma
@@ -2,72 +2,161 @@
 Modelos de dados compartilhados entre cliente e servidor
 """
 
+import sys
+import time
 from datetime import datetime
 
+from config.settings import SALA_PADRAO
+
+from common.compressao import descompactar_lote
+
 
 class Mensagem:
     """
     Representa uma mensagem no sistema de chat
-    
+
+    Usa __slots__ e guarda o horário como epoch (float) para reduzir o
+    custo por mensagem quando o servidor retém muito histórico.
+
     Attributes:
-        remetente (str): Nome do usuário que enviou
+        remetente (str): Nome do usuário que enviou (internado)
         conteudo (str): Texto da mensagem
-        timestamp (datetime): Data/hora do envio
-        tipo (str): Tipo da mensagem (normal, sistema, erro)
+        ts (float): Data/hora do envio em segundos desde epoch
+        timestamp (datetime): Data/hora do envio (derivado de ts)
+        tipo (str): Tipo da mensagem (normal, sistema, erro, lacuna)
+        seq (int): Número de sequência atribuído pelo servidor (por sala)
+        sala (str): Sala em que a mensagem foi enviada
+        rastreio (dict): Marcas de latência (ver common.rastreio) ou None
     """
-    
-    def __init__(self, remetente, conteudo, timestamp=None, tipo="normal"):
+
+    __slots__ = ("remetente", "conteudo", "_ts", "tipo", "seq", "sala", "rastreio", "_dict")
+
+    def __init__(self, remetente, conteudo, timestamp=None, tipo="normal", seq=None,
+                 sala=SALA_PADRAO, rastreio=None):
         """
         Cria nova mensagem
-        
+
         Args:
             remetente: Nome do remetente
             conteudo: Conteúdo da mensagem
-            timestamp: Data/hora (usa datetime.now() se None)
+            timestamp: datetime, epoch (float) ou string ISO; usa o
+                horário atual se None. Strings ISO só são convertidas
+                quando acessadas
             tipo: Tipo da mensagem
+            seq: Número de sequência (None até ser armazenada)
+            sala: Nome da sala
+            rastreio: Marcas de latência, se a mensagem é rastreada
         """
-        self.remetente = remetente
+        if timestamp is None:
+            timestamp = time.time()
+        elif isinstance(timestamp, datetime):
+            timestamp = timestamp.timestamp()
+
+        self.remetente = sys.intern(remetente)
         self.conteudo = conteudo
-        self.timestamp = timestamp or datetime.now()
-        self.tipo = tipo
+        self._ts = timestamp
+        self.tipo = sys.intern(tipo)
+        self.seq = seq
+        self.sala = sys.intern(sala)
+        self.rastreio = rastreio
+        self._dict = None  # codificação em cache (ver congelar)
+
+    @property
+    def ts(self):
+        """Data/hora do envio em segundos desde epoch"""
+        if isinstance(self._ts, str):
+            self._ts = datetime.fromisoformat(self._ts).timestamp()
+        return self._ts
+
+    @property
+    def timestamp(self):
+        """Data/hora do envio"""
+        return datetime.fromtimestamp(self.ts)
+
+    def congelar(self):
+        """
+        Codifica a mensagem uma única vez e guarda o resultado
+
+        Chamado pelo servidor quando a mensagem é armazenada (seq já
+        definido). Depois disso to_dict() devolve sempre o mesmo
+        dicionário, que não deve ser modificado.
+
+        Returns:
+            dict: Dados da mensagem
+        """
+        self._dict = None
+        self._dict = self.to_dict()
+        return self._dict
 
     def to_dict(self):
         """
         Converte mensagem para dicionário
-        
+
+        Inclui "timestamp" em ISO (clientes antigos) e "ts" em epoch,
+        que clientes novos usam sem precisar de fromisoformat.
+        "rastreio" só aparece em mensagens rastreadas.
+
         Returns:
             dict: Dados da mensagem
         """
-        return {
+        if self._dict is not None:
+            return self._dict
+
+        dados = {
             "remetente": self.remetente,
             "conteudo": self.conteudo,
             "timestamp": self.timestamp.isoformat(),
+            "ts": self.ts,
             "tipo": self.tipo,
+            "seq": self.seq,
+            "sala": self.sala,
         }
+        if self.rastreio is not None:
+            dados["rastreio"] = self.rastreio
+        return dados
 
     @staticmethod
     def from_dict(d):
         """
         Cria mensagem a partir de dicionário
-        
+
         Args:
             d: Dicionário com dados
-            
+
         Returns:
             Mensagem: Nova instância
         """
         return Mensagem(
             remetente=d["remetente"],
             conteudo=d["conteudo"],
-            timestamp=datetime.fromisoformat(d["timestamp"]),
-            tipo=d.get("tipo", "normal")
+            timestamp=d.get("ts") or d["timestamp"],
+            tipo=d.get("tipo", "normal"),
+            seq=d.get("seq"),
+            sala=d.get("sala", SALA_PADRAO),
+            rastreio=d.get("rastreio")
         )
-    
+
+    @staticmethod
+    def from_lote(lote):
+        """
+        Cria mensagens a partir de uma resposta em lote
+
+        Aceita a lista de dicionários ou o lote comprimido devolvido
+        pelo servidor (ver common.compressao).
+
+        Args:
+            lote: Resposta de obter_mensagens/obter_historico
+
+        Returns:
+            list: Instâncias de Mensagem
+        """
+        return [Mensagem.from_dict(d) for d in descompactar_lote(lote)]
+
     def __str__(self):
         """Representação em string"""
         hora = self.timestamp.strftime("%H:%M:%S")
         return f"[{hora}] {self.remetente}: {self.conteudo}"
-    
+
     def __repr__(self):
         """Representação técnica"""
-        return f"Mensagem(remetente={self.remetente}, tipo={self.tipo})"
+        return f"Mensagem(sala={self.sala}, seq={self.seq}, remetente={self.remetente}, tipo={self.tipo})"
@@ -0,0 +1,64 @@
+"""
+Protocolo do front end asyncio (ver server.frente_async)
+Quadros JSON precedidos do tamanho (4 bytes, big-endian)
+
+Pedido:   {"id": n, "metodo": "enviar_mensagem", "args": [...]}
+Resposta: {"id": n, "resultado": ...} ou {"id": n, "erro": "Tipo: texto"}
+
+O id casa cada resposta com o pedido: várias chamadas podem estar em
+andamento na mesma conexão (ex.: um long-poll e um envio), e as
+respostas chegam na ordem em que terminam.
+"""
+
+import json
+import struct
+
+from config.settings import ASYNC_MAX_FRAME
+
+CABECALHO = struct.Struct("!I")
+
+
+def codificar(obj):
+    """
+    Monta o quadro de um pedido ou resposta
+
+    Args:
+        obj: Dicionário serializável em JSON
+
+    Returns:
+        bytes: Tamanho + JSON em UTF-8
+    """
+    dados = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return CABECALHO.pack(len(dados)) + dados
+
+
+async def ler_quadro(leitor, maximo=ASYNC_MAX_FRAME):
+    """
+    Lê o próximo quadro
+
+    Args:
+        leitor: asyncio.StreamReader
+        maximo: Maior quadro aceito (bytes)
+
+    Returns:
+        dict: Quadro decodificado (None se a conexão terminou entre quadros)
+
+    Raises:
+        ValueError: Quadro grande demais ou que não é um objeto JSON
+        asyncio.IncompleteReadError: Conexão terminou no meio do quadro
+    """
+    try:
+        cabecalho = await leitor.readexactly(CABECALHO.size)
+    except EOFError as e:
+        if e.partial:
+            raise
+        return None
+
+    tamanho, = CABECALHO.unpack(cabecalho)
+    if tamanho > maximo:
+        raise ValueError(f"quadro de {tamanho} bytes (máximo {maximo})")
+
+    quadro = json.loads(await leitor.readexactly(tamanho))
+    if not isinstance(quadro, dict):
+        raise ValueError("quadro deve ser um objeto JSON")
+    return quadro
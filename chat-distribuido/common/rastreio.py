@@ -0,0 +1,200 @@
+"""
+Rastreio de latência ponta a ponta das mensagens
+O cliente marca o envio, o servidor a chegada, o armazenamento e o
+despacho a cada destinatário, e quem recebe calcula as etapas e as
+agrega em histogramas (ver common.histograma)
+
+Os horários são de relógio (time.time): com cliente e servidor em
+máquinas diferentes, as etapas "envio" e "transporte" incluem a
+diferença entre os relógios.
+"""
+
+import threading
+import time
+import uuid
+
+from common.histograma import HistogramaLog
+
+PERCENTIS = (50, 95, 99)
+
+# Etapas na ordem em que acontecem (e em que o /latency mostra)
+ETAPAS = {
+    "envio": "cliente → servidor (serialização, rede e fila do daemon)",
+    "lock": "espera pelo lock da sala",
+    "servidor": "validação, rate limit e lock até armazenar",
+    "fila_push": "armazenada até sair da fila do push",
+    "espera_polling": "armazenada até a resposta do polling",
+    "transporte": "servidor → cliente (serialização e rede)",
+    "exibicao": "recebida até exibida",
+    "total": "envio até exibição",
+}
+
+
+def novo_rastreio():
+    """
+    Rastreio de uma mensagem prestes a ser enviada
+
+    Returns:
+        dict: {"id", "envio"}
+    """
+    return {"id": uuid.uuid4().hex[:16], "envio": time.time()}
+
+
+def aceitar_rastreio(dados, chegada):
+    """
+    Valida o rastreio recebido do cliente e marca a chegada
+
+    Args:
+        dados: Rastreio enviado pelo cliente
+        chegada: Horário em que a chamada chegou ao servidor
+
+    Returns:
+        dict: Rastreio só com campos conhecidos (None se inválido)
+    """
+    try:
+        return {"id": str(dados["id"])[:32], "envio": float(dados["envio"]), "chegada": chegada}
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def carimbar(mensagens, modo):
+    """
+    Marca o despacho das mensagens rastreadas de uma resposta
+
+    O dicionário de cada mensagem é compartilhado por todos os
+    destinatários (ver Mensagem.congelar): as rastreadas são copiadas
+    antes de receber o horário deste despacho.
+
+    Args:
+        mensagens: Lista de dicionários com mensagens
+        modo: "push" ou "polling"
+
+    Returns:
+        list: A própria lista, ou uma cópia se alguma foi marcada
+    """
+    resultado = mensagens
+    for i, m in enumerate(mensagens):
+        rastreio = m.get("rastreio")
+        if rastreio is None:
+            continue
+        if resultado is mensagens:
+            resultado = list(mensagens)
+            agora = time.time()
+        resultado[i] = dict(m, rastreio=dict(rastreio, despacho=agora, modo=modo))
+    return resultado
+
+
+class AgregadorLatencia:
+    """
+    Histogramas de latência por etapa
+
+    Usado pelos clientes (entregas que receberam) e pelo servidor (soma
+    dos agregados que os clientes reportam).
+    """
+
+    def __init__(self):
+        self.etapas = {}  # etapa -> HistogramaLog
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.etapas["total"].total if "total" in self.etapas else 0
+
+    def registrar_entrega(self, rastreio, recebido, exibido):
+        """
+        Calcula e registra as etapas de uma mensagem recebida
+
+        Args:
+            rastreio: Campo "rastreio" da mensagem
+            recebido: Horário em que o lote chegou ao cliente
+            exibido: Horário em que a mensagem foi exibida
+
+        Returns:
+            bool: False se o rastreio está incompleto (ex.: veio do
+            histórico, sem despacho)
+        """
+        try:
+            envio = rastreio["envio"]
+            chegada = rastreio["chegada"]
+            armazenado = rastreio["armazenado"]
+            despacho = rastreio["despacho"]
+        except (KeyError, TypeError):
+            return False
+
+        fila = "fila_push" if rastreio.get("modo") == "push" else "espera_polling"
+        amostras = (
+            ("envio", chegada - envio),
+            ("lock", rastreio.get("lock", 0.0)),
+            ("servidor", armazenado - chegada),
+            (fila, despacho - armazenado),
+            ("transporte", recebido - despacho),
+            ("exibicao", exibido - recebido),
+            ("total", exibido - envio),
+        )
+
+        with self.lock:
+            for etapa, segundos in amostras:
+                histograma = self.etapas.get(etapa)
+                if histograma is None:
+                    histograma = self.etapas[etapa] = HistogramaLog()
+                histograma.registrar(segundos)
+        return True
+
+    def exportar(self, limpar=False):
+        """
+        Forma compacta para reportar ao servidor
+
+        Args:
+            limpar: Zera o agregador (para reportar só o que é novo)
+
+        Returns:
+            dict: etapa -> HistogramaLog.exportar()
+        """
+        with self.lock:
+            dados = {etapa: h.exportar() for etapa, h in self.etapas.items() if h.total}
+            if limpar:
+                self.etapas = {}
+        return dados
+
+    def mesclar(self, dados):
+        """
+        Soma agregados exportados por outro processo
+
+        Args:
+            dados: Retorno de exportar
+
+        Raises:
+            ValueError: Se houver etapa desconhecida ou histograma inválido
+        """
+        if not isinstance(dados, dict):
+            raise ValueError("agregados devem ser um dicionário")
+
+        recebidos = {}
+        for etapa, histograma in dados.items():
+            if etapa not in ETAPAS:
+                raise ValueError(f"etapa desconhecida: {etapa}")
+            recebidos[etapa] = HistogramaLog.importar(histograma)
+
+        with self.lock:
+            for etapa, histograma in recebidos.items():
+                if etapa not in self.etapas:
+                    self.etapas[etapa] = HistogramaLog()
+                self.etapas[etapa].mesclar(histograma)
+
+    def resumo(self):
+        """
+        Percentis de cada etapa com amostras
+
+        Returns:
+            dict: etapa -> {amostras, media_ms, p50_ms, p95_ms, p99_ms},
+            na ordem de ETAPAS
+        """
+        with self.lock:
+            resumo = {}
+            for etapa in ETAPAS:
+                h = self.etapas.get(etapa)
+                if h is None or not h.total:
+                    continue
+                resumo[etapa] = {"amostras": h.total, "media_ms": h.soma / h.total * 1000}
+                for p in PERCENTIS:
+                    resumo[etapa][f"p{p}_ms"] = h.percentil(p) * 1000
+        return resumo
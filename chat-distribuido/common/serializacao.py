@@ -0,0 +1,114 @@
+"""
+Serialização das chamadas RPC (formato no fio)
+Configura o Pyro4 e negocia o serializador entre cliente e servidor
+"""
+
+import importlib
+
+import Pyro4
+import Pyro4.util
+
+from config.settings import RPC_SERIALIZER, RPC_SERIALIZERS_ACCEPTED
+
+SERIALIZADORES = ("marshal", "msgpack", "json", "serpent")
+
+# Serializadores que dependem de pacotes fora da stdlib
+_DEPENDENCIAS = {"msgpack": "msgpack", "serpent": "serpent"}
+
+# Serializadores que transportam bytes sem conversão (base64 nos demais)
+_IDS_BINARIOS = {Pyro4.util.MarshalSerializer.serializer_id, Pyro4.util.MsgpackSerializer.serializer_id}
+
+
+def disponivel(nome):
+    """
+    Verifica se o serializador pode ser usado neste ambiente
+
+    Args:
+        nome: Nome do serializador
+
+    Returns:
+        bool: True se conhecido e com dependências instaladas
+    """
+    if nome not in SERIALIZADORES:
+        return False
+
+    modulo = _DEPENDENCIAS.get(nome)
+    if modulo is None:
+        return True
+
+    try:
+        importlib.import_module(modulo)
+        return True
+    except ImportError:
+        return False
+
+
+def preferencias():
+    """
+    Serializadores em ordem de preferência (só os disponíveis)
+
+    Returns:
+        list: RPC_SERIALIZER primeiro, depois RPC_SERIALIZERS_ACCEPTED
+    """
+    ordem = []
+    for nome in (RPC_SERIALIZER,) + tuple(RPC_SERIALIZERS_ACCEPTED):
+        if nome not in ordem and disponivel(nome):
+            ordem.append(nome)
+    return ordem
+
+
+def configurar():
+    """
+    Aplica a configuração ao Pyro4
+
+    Deve ser chamada antes de criar Daemons (o conjunto aceito é lido
+    na criação) e vale para servidor e cliente (daemon de callback).
+    """
+    ordem = preferencias()
+    if not ordem:
+        raise ValueError(f"Nenhum serializador disponível em {RPC_SERIALIZERS_ACCEPTED}")
+
+    Pyro4.config.SERIALIZERS_ACCEPTED = set(ordem)
+    Pyro4.config.SERIALIZER = ordem[0]
+    Pyro4.config.ITER_STREAMING = True  # geradores viram iteradores remotos
+
+
+def negociar(proxy):
+    """
+    Escolhe o primeiro serializador da preferência que o servidor aceita
+
+    Tenta cada um com um ping; o escolhido passa a ser o padrão do
+    processo (Pyro4.config.SERIALIZER), usado por todos os proxies.
+
+    Args:
+        proxy: Pyro4.Proxy do servidor
+
+    Returns:
+        str: Nome do serializador escolhido
+    """
+    erro = None
+
+    for nome in preferencias():
+        proxy._pyroRelease()
+        proxy._pyroSerializer = nome
+        try:
+            proxy.ping()
+        except (Pyro4.errors.CommunicationError, Pyro4.errors.SerializeError) as e:
+            erro = e
+            continue
+
+        proxy._pyroSerializer = None
+        Pyro4.config.SERIALIZER = nome
+        return nome
+
+    raise erro
+
+
+def chamada_binaria():
+    """
+    Verifica se a chamada RPC em andamento transporta bytes diretamente
+
+    Returns:
+        bool: True com marshal ou msgpack (usar dentro de um método remoto)
+    """
+    return Pyro4.current_context.serializer_id in _IDS_BINARIOS
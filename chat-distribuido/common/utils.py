@@ -1,64 +1,101 @@
-"""
-Utilitários compartilhados
-"""
-
-import os
-
-
-def formatar_timestamp(dt):
-    """
-    Formata datetime para exibição
-    
-    Args:
-        dt: objeto datetime
-        
-    Returns:
-        str: Data/hora formatada
-    """
-    return dt.strftime("%d/%m/%Y %H:%M:%S")
-
-
-def truncar_texto(texto, max_len=50):
-    """
-    Trunca texto longo
-    
-    Args:
-        texto: Texto a truncar
-        max_len: Comprimento máximo
-        
-    Returns:
-        str: Texto truncado
-    """
-    if len(texto) <= max_len:
-        return texto
-    return texto[:max_len-3] + "..."
-
-
-def limpar_terminal():
-    """Limpa terminal (multiplataforma)"""
-    os.system('cls' if os.name == 'nt' else 'clear')
-
-
-def formatar_duracao(segundos):
-    """
-    Formata duração em segundos
-    
-    Args:
-        segundos: Número de segundos
-        
-    Returns:
-        str: Duração formatada (ex: "2h 30m")
-    """
-    horas = int(segundos // 3600)
-    minutos = int((segundos % 3600) // 60)
-    segs = int(segundos % 60)
-    
-    partes = []
-    if horas > 0:
-        partes.append(f"{horas}h")
-    if minutos > 0:
-        partes.append(f"{minutos}m")
-    if segs > 0 or not partes:
-        partes.append(f"{segs}s")
-    
-    return " ".join(partes)
+"""
+Utilitários compartilhados
+"""
+
+import os
+import unicodedata
+
+# Pasta chat-distribuido: base dos caminhos relativos das configurações
+DIRETORIO_BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def caminho_do_pacote(caminho):
+    """
+    Resolve caminho das configurações a partir da pasta chat-distribuido,
+    não do diretório de onde o processo foi iniciado
+
+    Args:
+        caminho: Relativo ou absoluto (absoluto fica como está)
+
+    Returns:
+        str: Caminho absoluto (None se caminho for None)
+    """
+    if caminho is None:
+        return None
+    return os.path.join(DIRETORIO_BASE, caminho)
+
+
+def formatar_timestamp(dt):
+    """
+    Formata datetime para exibição
+    
+    Args:
+        dt: objeto datetime
+        
+    Returns:
+        str: Data/hora formatada
+    """
+    return dt.strftime("%d/%m/%Y %H:%M:%S")
+
+
+def normalizar(texto):
+    """
+    Normaliza texto para comparação (minúsculas, sem acentos)
+
+    Args:
+        texto: Texto original
+
+    Returns:
+        str: Texto normalizado
+    """
+    texto = texto.casefold()
+    if texto.isascii():
+        return texto
+    texto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def truncar_texto(texto, max_len=50):
+    """
+    Trunca texto longo
+    
+    Args:
+        texto: Texto a truncar
+        max_len: Comprimento máximo
+        
+    Returns:
+        str: Texto truncado
+    """
+    if len(texto) <= max_len:
+        return texto
+    return texto[:max_len-3] + "..."
+
+
+def limpar_terminal():
+    """Limpa terminal (multiplataforma)"""
+    os.system('cls' if os.name == 'nt' else 'clear')
+
+
+def formatar_duracao(segundos):
+    """
+    Formata duração em segundos
+    
+    Args:
+        segundos: Número de segundos
+        
+    Returns:
+        str: Duração formatada (ex: "2h 30m")
+    """
+    horas = int(segundos // 3600)
+    minutos = int((segundos % 3600) // 60)
+    segs = int(segundos % 60)
+    
+    partes = []
+    if horas > 0:
+        partes.append(f"{horas}h")
+    if minutos > 0:
+        partes.append(f"{minutos}m")
+    if segs > 0 or not partes:
+        partes.append(f"{segs}s")
+    
+    return " ".join(partes)
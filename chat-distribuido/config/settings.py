@@ -3,6 +3,7 @@ Configurações Globais do Sistema de Chat
 Centralizadas para facilitar manutenção
 """
 
+import os
 import re
 
 # ============================================================
@@ -15,6 +16,53 @@ NAMESERVER_PORT = 9090
 CHAT_SERVER_NAME = "chat.server"
 CHAT_SERVER_HOST = "0.0.0.0"
 
+SALA_PADRAO = "geral"          # Sala em que todo usuário entra ao registrar
+
+# Sharding: cada processo registra "chat.server.shard-N" e os clientes
+# distribuem as salas entre eles por hash consistente
+SHARD_NAME_PREFIX = "chat.server.shard-"
+HASH_VIRTUAL_NODES = 100       # Nós virtuais por shard no anel
+SHARD_REFRESH_INTERVAL = 10    # Cliente relê a lista de shards a cada N segundos
+
+# Replicação: a réplica registra "chat.replica.<nome do primário>",
+# acompanha o primário e assume o nome dele se ele cair
+REPLICA_NAME_PREFIX = "chat.replica."
+REPLICATION_POLL_TIMEOUT = 10  # Long-poll da réplica no primário (segundos)
+REPLICA_FAILOVER_TIMEOUT = 5   # Primário inacessível por N segundos = falhou
+# Promoção automática: numa partição a réplica pode assumir com o
+# primário vivo; ele é deposto pela época ao rever o Name Server, mas
+# as mensagens que aceitou sem replicar se perdem. Padrão: manual
+# (python -m server.promover)
+REPLICA_AUTO_PROMOTE = False
+
+# Serialização das chamadas RPC: "serpent" (padrão do Pyro4), "marshal",
+# "msgpack" ou "json". O cliente tenta RPC_SERIALIZER e depois os demais
+# aceitos, na ordem, até o servidor aceitar. marshal é o mais rápido
+# (ver bench.serializacao), mas é opcional: clientes de outras versões
+# e de terceiros falam serpent. msgpack requer o pacote msgpack.
+RPC_SERIALIZER = "serpent"
+RPC_SERIALIZERS_ACCEPTED = ("marshal", "msgpack", "json", "serpent")
+
+# Compressão de lotes grandes (obter_mensagens/obter_historico): "zlib",
+# "lzma" ou None. Só lotes a partir do limite (bytes em JSON) são
+# comprimidos, e só para clientes que pedem o formato.
+BATCH_COMPRESSION = "zlib"
+BATCH_COMPRESSION_THRESHOLD = 16 * 1024
+
+# Daemon Pyro4 do servidor. "thread" atende cada conexão em uma thread
+# do pool (conexões ociosas de polling ocupam threads); "multiplex"
+# atende todas com select em uma única thread, sem long-poll. Variáveis
+# de ambiente PYRO_* (ex.: PYRO_SERVERTYPE) têm precedência.
+DAEMON_SERVER_TYPE = "thread"  # "thread" ou "multiplex"
+DAEMON_POOL_MIN = 4            # Threads mantidas mesmo ociosas
+DAEMON_POOL_MAX = 2000         # Máximo de threads = conexões simultâneas no modo thread
+DAEMON_ADAPTIVE_POOL = True    # Pool com fila: cresce com a fila, encolhe quando ocioso
+DAEMON_POOL_QUEUE = 500        # Conexões esperando thread antes de recusar (pool no máximo)
+DAEMON_POOL_IDLE_TIMEOUT = 30  # Thread acima do mínimo ociosa por N segundos termina
+DAEMON_SOCKET_BACKLOG = 1024   # Fila de conexões do listen() (o Pyro4 usa 100)
+DAEMON_COMM_TIMEOUT = 0        # Timeout dos sockets (0 = nenhum; > LONG_POLL_MAX_TIMEOUT)
+DAEMON_POLL_TIMEOUT = 2.0      # Intervalo do select e da manutenção do daemon
+
 # ============================================================
 # LIMITES E SEGURANÇA
 # ============================================================
@@ -23,16 +71,98 @@ MAX_MESSAGE_LENGTH = 500
 MAX_USERNAME_LENGTH = 20
 MIN_USERNAME_LENGTH = 3
 MAX_MESSAGES_PER_MINUTE = 30
+GLOBAL_MAX_MESSAGES_PER_MINUTE = 0  # Limite do servidor inteiro (0 = sem limite)
+RATE_LIMIT_ALGORITHM = "token_bucket"  # "token_bucket" ou "sliding_window"
+RATE_LIMIT_PERIOD = 60         # Janela/rajada dos limites por minuto acima (segundos)
 MAX_HISTORY_SIZE = 100
+HISTORY_STREAM_PAGE = 500      # Mensagens por página em iterar_historico
+HISTORY_STREAM_MAX_PAGE = 5000 # Maior página aceita pelo servidor
+MAX_ROOMS = 500                # Salas existentes no servidor
+MAX_ROOMS_PER_USER = 20        # Salas por usuário
+CACHE_ENCODED_MESSAGES = True  # Codifica cada mensagem uma vez (desligar com históricos enormes)
+INDEX_HISTORY = True           # Índices por horário/remetente para buscar_mensagens
+SEARCH_MAX_RESULTS = 1000      # Máximo de mensagens devolvidas por buscar_mensagens
+FULLTEXT_INDEX = True          # Índice invertido do conteúdo para pesquisar (/search)
+FULLTEXT_MAX_RESULTS = 50      # Máximo de resultados de pesquisar
+FULLTEXT_PREFIX_EXPANSIONS = 50  # Termos do vocabulário considerados por prefixo
 CLIENT_TIMEOUT = 300  # 5 minutos
+BLOCKLIST_FILE = "config/blocklist.txt"  # Termos bloqueados, um por linha (relativo à pasta chat-distribuido)
+BLOCKLIST_RELOAD_INTERVAL = 5  # Confere mudanças no arquivo a cada N segundos (0 = nunca)
+NOMES_RESERVADOS = ('admin', 'root', 'sistema', 'server')
+EXPIRY_CHECK_INTERVAL = 5      # Espera máxima entre verificações de inatividade
+
+# ============================================================
+# PERSISTÊNCIA
+# ============================================================
+
+PERSISTENCE_ENABLED = False    # Grava mensagens em log append-only
+LOG_DIR = "data/log"           # Pasta dos segmentos do log (relativa à pasta chat-distribuido)
+LOG_SEGMENT_SIZE = 64 * 1024 * 1024  # Bytes por segmento
+LOG_DURABILITY = "batch"       # "os", "batch" ou "sync"
+LOG_FSYNC_INTERVAL = 0.05      # Intervalo do fsync em lote (segundos)
+LOG_RECOVERY_MESSAGES = MAX_HISTORY_SIZE  # Mensagens do fim do log relidas por sala ao iniciar
+LOG_MAX_SEGMENTS = 64          # Segmentos mantidos; os mais antigos são apagados (0 = sem limite)
+LOG_MAX_AGE = 0                # Apaga segmentos sem escrita há N segundos (0 = sem limite)
 
 # ============================================================
 # POLLING
 # ============================================================
 
 POLLING_INTERVAL = 0.5
-MAX_RECONNECT_ATTEMPTS = 3
-RECONNECT_DELAY = 2
+LONG_POLL_TIMEOUT = 20         # Espera máxima pedida pelo cliente (0 = polling simples)
+LONG_POLL_MAX_TIMEOUT = 30     # Espera máxima aceita pelo servidor
+MAX_RECONNECT_ATTEMPTS = 10    # Tentativas de reconexão antes de desistir
+RECONNECT_BASE_DELAY = 0.5     # Backoff: espera sorteada em [0, base * 2^tentativa]
+RECONNECT_MAX_DELAY = 30       # Teto da espera entre tentativas (segundos)
+CONNECT_TIMEOUT = 3            # Timeout do teste da URI em cache (segundos)
+URI_CACHE_FILE = "data/cliente/servidor.json"  # URI resolvida, relativo à pasta chat-distribuido (None = sempre o Name Server)
+SEND_QUEUE_SIZE = 100          # Mensagens do cliente aguardando a thread de envio
+
+# ============================================================
+# PUSH (CALLBACKS)
+# ============================================================
+
+PUSH_ENABLED = False           # Cliente usa push em vez de polling
+PUSH_CALLBACK_HOST = "localhost"  # Host do daemon de callback do cliente
+PUSH_DISPATCHER_THREADS = 8    # Threads de entrega no servidor
+PUSH_CALL_TIMEOUT = 2.0        # Timeout de cada entrega (segundos)
+PUSH_MAX_FAILURES = 3          # Falhas seguidas antes de voltar ao polling
+PUSH_RETRY_DELAY = 0.2         # Espera antes de repetir uma entrega (dobra a cada falha)
+PUSH_MAX_QUEUE = 200           # Lotes pendentes antes de voltar ao polling
+PUSH_CHECK_INTERVAL = 5        # Cliente confirma assinatura a cada N segundos
+
+# ============================================================
+# FRONT END ASYNCIO
+# ============================================================
+
+# Protocolo TCP leve (quadros JSON, ver common.quadros) atendido por um
+# laço asyncio no mesmo processo e com o mesmo estado do servidor Pyro4.
+# Long-polls esperam sem ocupar threads: um processo mantém dezenas de
+# milhares de sessões. Sem Name Server, sem push e sem shards.
+ASYNC_FRONTEND_ENABLED = False  # Servidor também atende o protocolo asyncio
+ASYNC_FRONTEND_HOST = "0.0.0.0"
+ASYNC_FRONTEND_PORT = 9700     # Shard N usa +N, réplica +100
+ASYNC_FRONTEND_WORKERS = 8     # Threads para chamadas com lock, compressão ou log
+ASYNC_MAX_FRAME = 1024 * 1024  # Maior quadro aceito (bytes)
+ASYNC_MAX_PENDING = 8          # Chamadas em andamento por conexão
+CLIENT_TRANSPORT = "pyro"      # Cliente: "pyro" ou "async" (ou --async)
+ASYNC_SERVER_HOST = "localhost"  # Onde o cliente "async" conecta
+
+# ============================================================
+# MÉTRICAS
+# ============================================================
+
+# Desligadas por padrão: a medição custa 2-4 us por chamada, 5-7% de
+# um ping ou enviar_mensagem (python -m bench.metricas); ligue com
+# CHAT_METRICS_ENABLED=1 no ambiente (bench.carga liga)
+METRICS_ENABLED = os.environ.get("CHAT_METRICS_ENABLED") == "1"  # Mede cada método remoto
+METRICS_HTTP_HOST = "127.0.0.1"  # Endpoint Prometheus só local
+METRICS_HTTP_PORT = 0          # GET /metrics (0 = desligado, ex.: 9464); shard N usa +N
+
+# Rastreio de latência ponta a ponta: o cliente marca as mensagens que
+# envia, quem recebe agrega as etapas e reporta ao servidor (/latency)
+TRACE_ENABLED = False          # Cliente rastreia envios; servidor aceita e carimba
+TRACE_REPORT_INTERVAL = 30     # Cliente reporta seus agregados a cada N segundos
 
 # ============================================================
 # MENSAGENS
@@ -55,8 +185,13 @@ HELP_MESSAGE = """
 
   🔹 /help      - Mostra esta mensagem de ajuda
   🔹 /users     - Lista todos os usuários online
-  🔹 /history   - Mostra histórico de mensagens
+  🔹 /join SALA - Entra na sala (e passa a enviar para ela)
+  🔹 /leave SALA - Sai da sala
+  🔹 /rooms     - Lista as salas
+  🔹 /history   - Mostra histórico da sala atual
+  🔹 /search TERMOS - Pesquisa mensagens da sala atual
   🔹 /stats     - Estatísticas do servidor
+  🔹 /latency   - Latência das mensagens por etapa (rastreio)
   🔹 /clear     - Limpa a tela
   🔹 /quit      - Sair do chat (/exit também funciona)
 
@@ -92,6 +227,12 @@ class Colors:
 # VALIDAÇÕES
 # ============================================================
 
+def lista_bloqueio():
+    """Lista de bloqueio compartilhada (common.filtro importa este módulo)"""
+    from common.filtro import lista_bloqueio as compartilhada
+    return compartilhada()
+
+
 def validar_username(username):
     """
     Valida nome de usuário
@@ -100,6 +241,7 @@ def validar_username(username):
     - Entre 3 e 20 caracteres
     - Apenas letras, números e underscore
     - Deve começar com letra
+    - Não pode ser reservado nem conter termo da lista de bloqueio
     
     Args:
         username: Nome a validar
@@ -119,8 +261,11 @@ def validar_username(username):
     if not re.match(r'^[a-zA-Z][a-zA-Z0-9_]*$', username):
         return False, "Nome deve começar com letra e conter apenas letras, números e _"
     
-    palavras_proibidas = ['admin', 'root', 'sistema', 'server']
-    if username.lower() in palavras_proibidas:
+    if username.lower() in NOMES_RESERVADOS:
+        return False, "Este nome não está disponível"
+
+    # Nomes não têm espaços: o termo vale mesmo colado em outras letras
+    if lista_bloqueio().encontrar(username, palavra_inteira=False):
         return False, "Este nome não está disponível"
     
     return True, "OK"
@@ -146,5 +291,34 @@ def validar_mensagem(mensagem):
     for char in caracteres_proibidos:
         if char in mensagem:
             return False, "Mensagem contém caracteres inválidos"
+
+    if lista_bloqueio().encontrar(mensagem):
+        return False, "Mensagem contém termo bloqueado"
     
     return True, "OK"
+
+
+def validar_sala(sala):
+    """
+    Valida nome de sala
+
+    Regras:
+    - Entre 1 e 30 caracteres
+    - Apenas letras minúsculas, números, _ e -
+
+    Args:
+        sala: Nome a validar
+
+    Returns:
+        tuple: (bool, str) - (valido, mensagem)
+    """
+    if not sala:
+        return False, "Nome da sala não pode ser vazio"
+
+    if len(sala) > 30:
+        return False, "Nome da sala deve ter no máximo 30 caracteres"
+
+    if not re.match(r'^[a-z0-9_-]+$', sala):
+        return False, "Sala deve conter apenas letras minúsculas, números, _ e -"
+
+    return True, "OK"
@@ -75,18 +75,24 @@ def start_nameserver():
         return None
 
 
-def start_server():
-    """Inicia Servidor"""
-    print_info("Iniciando Servidor...")
+def start_server(shard=None):
+    """Inicia Servidor (ou um shard)"""
+    comando = [sys.executable, "-m", "server.start_server"]
+    nome = "Servidor"
+    if shard is not None:
+        comando += ["--shard", str(shard)]
+        nome = f"Shard {shard}"
+
+    print_info(f"Iniciando {nome}...")
     
     if sys.platform == "win32":
         process = subprocess.Popen(
-            [sys.executable, "-m", "server.start_server"],
+            comando,
             creationflags=subprocess.CREATE_NEW_CONSOLE
         )
     else:
         process = subprocess.Popen(
-            [sys.executable, "-m", "server.start_server"],
+            comando,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE
         )
@@ -94,7 +100,7 @@ def start_server():
     time.sleep(2)
     
     if process.poll() is None:
-        print_success("Servidor OK")
+        print_success(f"{nome} OK")
         return process
     else:
         print_error("Falha no Servidor")
@@ -155,13 +161,18 @@ def main():
             print_error("Impossível iniciar Name Server")
             return
         
-        # Servidor
-        server = start_server()
-        if server:
-            processes.append(server)
-        else:
-            print_error("Impossível iniciar Servidor")
-            return
+        # Servidor (ou N shards com --shards N)
+        shards = [None]
+        if "--shards" in sys.argv:
+            shards = range(int(sys.argv[sys.argv.index("--shards") + 1]))
+
+        for shard in shards:
+            server = start_server(shard)
+            if server:
+                processes.append(server)
+            else:
+                print_error("Impossível iniciar Servidor")
+                return
         
         # Menu
         print_header("SISTEMA INICIADO")
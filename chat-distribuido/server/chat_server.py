@@ -4,37 +4,158 @@ Gerencia usuários, mensagens e broadcast
 """
 
 import Pyro4
+import os
+import signal
 import threading
 import time
 from datetime import datetime
-from collections import defaultdict
 
 from config.settings import (
     CHAT_SERVER_NAME,
-    MAX_HISTORY_SIZE,
+    SHARD_NAME_PREFIX,
+    REPLICA_NAME_PREFIX,
+    REPLICA_FAILOVER_TIMEOUT,
+    SALA_PADRAO,
+    MAX_ROOMS,
+    MAX_ROOMS_PER_USER,
     CLIENT_TIMEOUT,
+    EXPIRY_CHECK_INTERVAL,
     MAX_MESSAGES_PER_MINUTE,
+    PUSH_DISPATCHER_THREADS,
+    LONG_POLL_MAX_TIMEOUT,
+    PERSISTENCE_ENABLED,
+    LOG_DIR,
+    LOG_RECOVERY_MESSAGES,
+    BATCH_COMPRESSION,
+    HISTORY_STREAM_PAGE,
+    HISTORY_STREAM_MAX_PAGE,
+    SEARCH_MAX_RESULTS,
+    FULLTEXT_MAX_RESULTS,
+    MAX_MESSAGE_LENGTH,
+    METRICS_ENABLED,
+    METRICS_HTTP_HOST,
+    METRICS_HTTP_PORT,
+    TRACE_ENABLED,
+    ASYNC_FRONTEND_ENABLED,
+    ASYNC_FRONTEND_HOST,
+    ASYNC_FRONTEND_PORT,
     validar_mensagem,
     validar_username,
+    validar_sala,
+    lista_bloqueio,
 )
 
 from common.models import Mensagem
+from server.push import DespachantePush
+from server.salas import Sala
+from server.rate_limit import criar_limitador_mensagens
+from server.expiracao import FilaExpiracao
+from server.persistencia import LogMensagens
+from server.replicacao import SeguidorPrimario, epoca_registrada, registrar_primario, primario_ativo
+from server.metricas import MetricasRPC, LockMedido, instrumentar, servir_http
+from server.daemon import criar_daemon, long_poll_permitido
+from server.frente_async import FrenteAsync
+from common.serializacao import configurar, chamada_binaria
+from common.compressao import compactar_lote
+from common.utils import caminho_do_pacote
+from common.rastreio import AgregadorLatencia, aceitar_rastreio, carimbar, PERCENTIS
+
+
+class Sessao:
+    """
+    Usuário conectado
+
+    Attributes:
+        ultima_atividade (float): Horário da última chamada do usuário
+    """
+
+    __slots__ = ("ultima_atividade",)
+
+    def __init__(self):
+        self.ultima_atividade = time.time()
 
 
 @Pyro4.expose
+@instrumentar
 class ChatServer:
-    """Servidor principal do chat"""
+    """
+    Servidor principal do chat
 
-    def __init__(self):
-        """Inicializa o servidor"""
-        self.usuarios = {}  # nome -> timestamp última atividade
-        self.mensagens = []  # lista de objetos Mensagem
-        self.lock = threading.Lock()
+    O estado é dividido em domínios com locks próprios, adquiridos
+    sempre nesta ordem quando aninhados:
+
+    - lock_usuarios: presença (self.usuarios, self.expiracao)
+    - lock_salas: criação de salas e índice usuário -> salas
+    - Sala.lock: histórico, membros e ouvintes de cada sala
+    - rate_limiter: rate limiting (lock interno)
+    - lock_stats: contadores (self.stats)
+
+    Leituras de histórico, presença e estatísticas não usam lock.
+
+    Como réplica, o servidor copia mensagens e presença do primário,
+    recusa escritas e atende leituras até ser promovido. Um primário
+    que vê outro de época maior no Name Server fica "deposto": recusa
+    escritas e encerra o daemon, e os clientes reconectam ao novo.
+
+    Com métricas, todo método remoto é medido (ver server.metricas) e
+    os locks acima são LockMedido, que somam a espera à chamada.
+    """
+
+    def __init__(self, log=None, primario=None, metricas=None):
+        """
+        Inicializa o servidor
+
+        Args:
+            log: LogMensagens para persistir o histórico (opcional); as
+                últimas mensagens do log são recarregadas
+            primario: Nome do primário no Name Server; se informado, o
+                servidor começa como réplica dele
+            metricas: MetricasRPC que recebe as medições (None = sem métricas)
+        """
+        self.metricas = metricas
+        self.novo_lock = LockMedido if metricas else threading.Lock
+
+        self.usuarios = {}  # nome -> Sessao
+        self.expiracao = FilaExpiracao(CLIENT_TIMEOUT)
+        self.lock_usuarios = self.novo_lock()
+
+        self.salas = {SALA_PADRAO: Sala(SALA_PADRAO, lock=self.novo_lock())}  # nome -> Sala
+        self.salas_usuario = {}  # nome -> set de nomes de sala
+        self.lock_salas = self.novo_lock()
+        self.esperando = {}  # nome -> Event do long-poll em andamento
+        # Servidor multiplex atende tudo em uma thread: sem long-poll
+        self.espera_maxima = LONG_POLL_MAX_TIMEOUT if long_poll_permitido() else 0
+        self.pool_daemon = None  # PoolAdaptativo do daemon (definido em main)
+        self.frente_async = None  # FrenteAsync no mesmo processo (definido em main)
+        self.salas_movidas = set()  # salas exportadas para outro shard
+
+        # Replicação: versão da presença e long-polls das réplicas
+        self.papel = "replica" if primario else "primario"  # ou "deposto"
+        self.epoca = 0  # do primário (ver server.replicacao)
+        self.versao_presenca = 0
+        self.seguidores = set()
+        self.nome_servico = None  # nome no Name Server (definido em main)
+        self.uri = None
+
+        self.log = log
+        if log:
+            self._restaurar(log.recuperar(LOG_RECOVERY_MESSAGES))
         
+        # Rastreio de latência: agregados reportados pelos clientes
+        self.latencias = AgregadorLatencia() if TRACE_ENABLED else None
+
+        # Entrega por push (opcional)
+        self.push = DespachantePush(
+            PUSH_DISPATCHER_THREADS,
+            ao_entregar=metricas.egresso.registrar if metricas else None,
+            rastrear=TRACE_ENABLED
+        )
+
         # Rate limiting por usuário
-        self.message_timestamps = defaultdict(list)
+        self.rate_limiter = criar_limitador_mensagens()
         
         # Estatísticas
+        self.lock_stats = self.novo_lock()
         self.stats = {
             'total_messages': 0,
             'total_users': 0,
@@ -48,6 +169,10 @@ class ChatServer:
             daemon=True
         )
         self.limpeza_thread.start()
+
+        self.seguidor = None
+        if primario:
+            self.seguidor = SeguidorPrimario(self, primario)
         
         print("✅ Servidor inicializado")
 
@@ -55,12 +180,14 @@ class ChatServer:
         """Verifica se servidor está ativo"""
         return True
 
-    def registrar_usuario(self, nome):
+    def registrar_usuario(self, nome, entrar_padrao=True):
         """
         Registra novo usuário
         
         Args:
             nome: Nome do usuário
+            entrar_padrao: Entra na sala padrão (com shards, só no shard
+                dono dela)
             
         Returns:
             tuple: (sucesso, mensagem)
@@ -69,18 +196,32 @@ class ChatServer:
         if not valido:
             return False, msg
 
-        with self.lock:
+        recusa = self._somente_leitura()
+        if recusa:
+            return recusa
+
+        with self.lock_usuarios:
             if nome in self.usuarios:
                 return False, "❌ Nome já em uso"
 
-            self.usuarios[nome] = time.time()
-            self.stats['total_users'] += 1
-            self.stats['peak_users'] = max(
-                self.stats['peak_users'], 
-                len(self.usuarios)
-            )
+            sessao = self.usuarios[nome] = Sessao()
+            self.expiracao.agendar(nome, sessao)
+
+            with self.lock_stats:
+                self.stats['total_users'] += 1
+                self.stats['peak_users'] = max(
+                    self.stats['peak_users'], 
+                    len(self.usuarios)
+                )
+
+            with self.lock_salas:
+                # Pode já ter salas importadas de outro shard
+                self.salas_usuario.setdefault(nome, set())
 
-            self._registrar_sistema(f"🔵 {nome} entrou no chat")
+            if entrar_padrao:
+                self._entrar(nome, SALA_PADRAO, f"🔵 {nome} entrou no chat")
+
+            self._presenca_mudou()
             
             print(f"[REGISTRO] '{nome}' conectado. Online: {len(self.usuarios)}")
 
@@ -88,95 +229,661 @@ class ChatServer:
 
     def desconectar_usuario(self, nome):
         """
-        Remove usuário
+        Remove usuário (sai de todas as salas)
         
         Args:
             nome: Nome do usuário
         """
-        with self.lock:
+        if self._somente_leitura():
+            return
+
+        with self.lock_usuarios:
             if nome in self.usuarios:
                 del self.usuarios[nome]
-                self._registrar_sistema(f"🔴 {nome} saiu do chat")
-                
-                if nome in self.message_timestamps:
-                    del self.message_timestamps[nome]
+                self._remover(nome, f"🔴 {nome} saiu do chat")
                 
                 print(f"[SAÍDA] '{nome}' desconectado. Online: {len(self.usuarios)}")
 
-    def enviar_mensagem(self, remetente, conteudo):
+    def entrar_sala(self, usuario, sala):
+        """
+        Entra em uma sala (criando-a se não existir)
+
+        Args:
+            usuario: Nome do usuário
+            sala: Nome da sala
+
+        Returns:
+            tuple: (sucesso, mensagem)
+        """
+        valido, msg = validar_sala(sala)
+        if not valido:
+            return False, msg
+
+        if sala in self.salas_movidas:
+            return False, f"↪️ #{sala} foi movida para outro shard"
+
+        recusa = self._somente_leitura()
+        if recusa:
+            return recusa
+
+        with self.lock_usuarios:
+            if not self._tocar(usuario):
+                return False, "❌ Usuário não registrado"
+
+            if sala in self.salas_usuario.get(usuario, ()):
+                return True, f"✅ Já está em #{sala}"
+
+            if len(self.salas_usuario.get(usuario, ())) >= MAX_ROOMS_PER_USER:
+                return False, f"⚠️ Limite de {MAX_ROOMS_PER_USER} salas por usuário"
+
+            if sala not in self.salas and len(self.salas) >= MAX_ROOMS:
+                return False, "⚠️ Limite de salas do servidor atingido"
+
+            self._entrar(usuario, sala, f"➡️ {usuario} entrou em #{sala}")
+
+        return True, f"✅ Entrou em #{sala}"
+
+    def sair_sala(self, usuario, sala):
+        """
+        Sai de uma sala
+
+        Args:
+            usuario: Nome do usuário
+            sala: Nome da sala
+
+        Returns:
+            tuple: (sucesso, mensagem)
+        """
+        if sala == SALA_PADRAO:
+            return False, f"❌ Não é possível sair de #{SALA_PADRAO}"
+
+        recusa = self._somente_leitura()
+        if recusa:
+            return recusa
+
+        with self.lock_usuarios:
+            self._tocar(usuario)
+
+            with self.lock_salas:
+                salas = self.salas_usuario.get(usuario)
+                if not salas or sala not in salas:
+                    return False, f"❌ Você não está em #{sala}"
+                salas.discard(sala)
+
+            self._sair(usuario, self.salas[sala], f"⬅️ {usuario} saiu de #{sala}")
+
+        return True, f"✅ Saiu de #{sala}"
+
+    def listar_salas(self, usuario=None):
+        """
+        Lista salas existentes
+
+        Args:
+            usuario: Se informado, indica em quais o usuário está
+
+        Returns:
+            list: Dicionários com nome, membros, mensagens e participa
+        """
+        minhas = self.salas_usuario.get(usuario, set())
+        return [
+            {
+                'nome': sala.nome,
+                'membros': len(sala.membros),
+                'mensagens': sala.mensagens.ultimo_seq,
+                'participa': sala.nome in minhas,
+            }
+            for sala in sorted(list(self.salas.values()), key=lambda s: s.nome)
+        ]
+
+    def obter_membros(self, sala=SALA_PADRAO):
+        """
+        Retorna membros de uma sala
+
+        Args:
+            sala: Nome da sala
+
+        Returns:
+            list: Nomes dos usuários
+        """
+        s = self.salas.get(sala)
+        return sorted(list(s.membros)) if s else []
+
+    def enviar_mensagem(self, remetente, conteudo, sala=SALA_PADRAO, rastreio=None):
         """
         Recebe mensagem do cliente
         
         Args:
             remetente: Nome do remetente
             conteudo: Texto da mensagem
+            sala: Sala de destino (o remetente deve participar)
+            rastreio: {"id", "envio"} do cliente (ver common.rastreio);
+                ignorado com TRACE_ENABLED desligado
             
         Returns:
             tuple: (sucesso, mensagem)
         """
+        chegada = time.time()
+
         valido, msg = validar_mensagem(conteudo)
         if not valido:
             return False, msg
+
+        if sala in self.salas_movidas:
+            return False, f"↪️ #{sala} foi movida para outro shard"
+
+        recusa = self._somente_leitura()
+        if recusa:
+            return recusa
+
+        if sala not in self.salas_usuario.get(remetente, ()):
+            return False, f"❌ Você não está em #{sala}"
         
         # Rate limiting
         agora = time.time()
-        with self.lock:
-            # Remove timestamps antigos
-            self.message_timestamps[remetente] = [
-                ts for ts in self.message_timestamps[remetente]
-                if agora - ts < 60
-            ]
-            
-            # Verifica limite
-            if len(self.message_timestamps[remetente]) >= MAX_MESSAGES_PER_MINUTE:
-                return False, f"⚠️ Limite de {MAX_MESSAGES_PER_MINUTE} msg/min"
-            
-            self.message_timestamps[remetente].append(agora)
+        permitido, motivo = self.rate_limiter.permitir(remetente, agora)
+        if not permitido:
+            if motivo == "global":
+                return False, "⚠️ Servidor sobrecarregado, tente novamente"
+            return False, f"⚠️ Limite de {MAX_MESSAGES_PER_MINUTE} msg/min"
 
         # Cria mensagem
-        msg_obj = Mensagem(remetente, conteudo, datetime.now())
+        if rastreio and self.latencias is not None:
+            rastreio = aceitar_rastreio(rastreio, chegada)
+        else:
+            rastreio = None
+        msg_obj = Mensagem(remetente, conteudo, agora, sala=sala, rastreio=rastreio)
 
-        with self.lock:
-            self.usuarios[remetente] = time.time()
-            self.mensagens.append(msg_obj)
-            self.stats['total_messages'] += 1
+        self._tocar(remetente)
 
-            # Limita histórico
-            if len(self.mensagens) > MAX_HISTORY_SIZE:
-                self.mensagens = self.mensagens[-MAX_HISTORY_SIZE:]
+        marca = self._armazenar(msg_obj)
+        if marca:
+            self.log.aguardar_duravel(marca)
+
+        with self.lock_stats:
+            self.stats['total_messages'] += 1
+        if self.metricas:
+            self.metricas.ingresso.registrar()
 
         return True, "✅ Enviada"
 
-    def obter_mensagens(self, usuario, ultimo_id):
+    def obter_mensagens(self, usuario, ultimo_id, timeout=0, compressao=None):
         """
-        Retorna novas mensagens
+        Retorna novas mensagens das salas do usuário
+        
+        Com timeout > 0 funciona como long-poll: se não houver mensagens
+        novas, espera até que cheguem ou o timeout expire. Só as salas
+        do usuário são consultadas e só elas acordam a espera.
+        
+        Se o cliente ficou para trás do histórico retido de uma sala, as
+        mensagens dela começam com uma do tipo "lacuna" informando
+        quantas se perderam.
         
         Args:
             usuario: Nome do usuário
-            ultimo_id: ID da última mensagem recebida
+            ultimo_id: Dicionário sala -> última sequência recebida; um
+                inteiro é aceito como a sequência da sala padrão
+            timeout: Espera máxima em segundos (0 = retorna imediatamente;
+                ignorado no daemon multiplex, ver server.daemon)
+            compressao: Formato de lote comprimido aceito pelo cliente
+                ("zlib" ou "lzma"); lotes grandes vêm comprimidos
             
         Returns:
-            list: Lista de dicionários com mensagens
+            list: Lista de dicionários com mensagens (ou lote comprimido,
+            ver common.compressao)
         """
-        with self.lock:
-            if usuario in self.usuarios:
-                self.usuarios[usuario] = time.time()
-            
-            novas = self.mensagens[ultimo_id:]
-            return [msg.to_dict() for msg in novas]
+        timeout = min(max(timeout, 0), self.espera_maxima)
+        self._tocar(usuario)
+
+        ultimos = self._normalizar_ultimos(ultimo_id)
+        salas = self._salas_de(usuario)
+
+        resposta = self._coletar(salas, ultimos)
+        if resposta or not timeout:
+            return self._responder_polling(resposta, compressao)
+
+        evento = threading.Event()
+        self.esperando[usuario] = evento
+        for sala in salas:
+            sala.ouvir(evento)
+
+        try:
+            # Confere de novo: algo pode ter chegado antes de ouvir
+            resposta = self._coletar(salas, ultimos)
+            if not resposta and evento.wait(timeout):
+                resposta = self._coletar(salas, ultimos)
+        finally:
+            for sala in salas:
+                sala.deixar_de_ouvir(evento)
+            if self.esperando.get(usuario) is evento:
+                del self.esperando[usuario]
+
+        return self._responder_polling(resposta, compressao)
+
+    def inscrever_push(self, usuario, uri_callback, ultimo_id):
+        """
+        Ativa entrega por push para o usuário
+
+        O cliente expõe um objeto de callback com o método
+        receber(mensagens). Mensagens posteriores a ultimo_id já
+        armazenadas são enviadas no primeiro lote.
+
+        Args:
+            usuario: Nome do usuário
+            uri_callback: URI do objeto de callback do cliente
+            ultimo_id: Dicionário sala -> última sequência recebida
+
+        Returns:
+            tuple: (sucesso, mensagem)
+        """
+        recusa = self._somente_leitura()
+        if recusa:
+            return recusa
+
+        if not self._tocar(usuario):
+            return False, "❌ Usuário não registrado"
+
+        ultimos = self._normalizar_ultimos(ultimo_id)
+        salas = self._salas_de(usuario)
 
-    def obter_historico(self, limite=20):
+        # Com os locks das salas nenhuma mensagem nova é publicada
+        # entre o cálculo dos pendentes e a inscrição
+        for sala in salas:
+            sala.lock.acquire()
+        try:
+            pendentes = self._coletar(salas, ultimos)
+            self.push.inscrever(usuario, uri_callback, pendentes)
+        finally:
+            for sala in reversed(salas):
+                sala.lock.release()
+
+        print(f"[PUSH] '{usuario}' inscrito")
+        return True, "✅ Push ativado"
+
+    def cancelar_push(self, usuario):
+        """
+        Desativa entrega por push (usuário volta ao polling)
+
+        Args:
+            usuario: Nome do usuário
+        """
+        self.push.cancelar(usuario)
+
+    def push_ativo(self, usuario):
+        """
+        Verifica se o usuário ainda recebe por push
+
+        Também conta como atividade do usuário.
+
+        Args:
+            usuario: Nome do usuário
+
+        Returns:
+            bool: True se inscrito
+        """
+        self._tocar(usuario)
+        return self.push.inscrito(usuario)
+
+    def exportar_sala(self, sala):
         """
-        Retorna histórico de mensagens
+        Congela a sala para movê-la a outro shard (rebalanceamento)
+
+        A partir daqui envios e entradas na sala são recusados com um
+        aviso de sala movida; os clientes reentram no novo dono. A sala
+        continua aqui até retirar_sala (importada no destino) ou
+        reabrir_sala (importação falhou).
+
+        Args:
+            sala: Nome da sala
+
+        Returns:
+            dict: "mensagens" (histórico em dicionários, em ordem) e
+            "membros" (nomes); (False, motivo) em réplica ou deposto
+        """
+        recusa = self._somente_leitura()
+        if recusa:
+            return recusa
+
+        with self.lock_salas:
+            s = self.salas.get(sala)
+            if s is None:
+                return {"mensagens": [], "membros": []}
+            self.salas_movidas.add(sala)
+
+        with s.lock:
+            mensagens = s.mensagens.ultimas(s.mensagens.capacidade)
+            membros = sorted(s.membros)
+
+        print(f"[SHARD] #{sala} exportada ({len(mensagens)} mensagens)")
+        return {
+            "mensagens": [m.to_dict() for m in mensagens],
+            "membros": membros,
+        }
+
+    def retirar_sala(self, sala):
+        """
+        Remove deste shard uma sala exportada e já importada no destino
+
+        Args:
+            sala: Nome da sala
+
+        Returns:
+            tuple: (sucesso, mensagem)
+        """
+        recusa = self._somente_leitura()
+        if recusa:
+            return recusa
+
+        if sala not in self.salas_movidas:
+            return False, f"❌ #{sala} não foi exportada"
+
+        with self.lock_usuarios:
+            with self.lock_salas:
+                s = self.salas.pop(sala, None)
+                if s is None:
+                    return True, f"✅ #{sala} já retirada"
+                for membro in s.membros:
+                    self.salas_usuario.get(membro, set()).discard(sala)
+
+        with s.lock:
+            s.acordar()
+
+        self._presenca_mudou()
+
+        print(f"[SHARD] #{sala} retirada")
+        return True, f"✅ #{sala} retirada"
+
+    def reabrir_sala(self, sala):
+        """
+        Volta a aceitar uma sala exportada cuja importação falhou
+
+        Args:
+            sala: Nome da sala
+
+        Returns:
+            tuple: (sucesso, mensagem)
+        """
+        recusa = self._somente_leitura()
+        if recusa:
+            return recusa
+
+        with self.lock_salas:
+            if sala not in self.salas:
+                return False, f"❌ #{sala} não está neste shard"
+            self.salas_movidas.discard(sala)
+
+        print(f"[SHARD] #{sala} reaberta")
+        return True, f"✅ #{sala} reaberta"
+
+    def importar_sala(self, sala, dados):
+        """
+        Recebe sala exportada por outro shard
+
+        As sequências são preservadas, então os clientes continuam de
+        onde pararam. Se a sala já foi criada aqui (clientes que migraram
+        antes dela), suas mensagens vão para depois das importadas. Os
+        membros continuam na sala, então quem está em long-poll ou push
+        recebe as mensagens novas sem precisar reentrar.
+
+        Args:
+            sala: Nome da sala
+            dados: Retorno de exportar_sala
+
+        Returns:
+            tuple: (sucesso, mensagem)
+        """
+        recusa = self._somente_leitura()
+        if recusa:
+            return recusa
+
+        mensagens = [Mensagem.from_dict(d) for d in dados["mensagens"]]
+
+        self.salas_movidas.discard(sala)
+        s = self._sala(sala)
+
+        with self.lock_salas:
+            for membro in dados["membros"]:
+                self.salas_usuario.setdefault(membro, set()).add(sala)
+
+        with s.lock:
+            s.membros.update(dados["membros"])
+            s.importar(mensagens)
+            if self.log:
+                for msg in s.mensagens.ultimas(s.mensagens.capacidade):
+                    self.log.anexar(msg)
+
+        for membro in dados["membros"]:
+            evento = self.esperando.get(membro)
+            if evento:
+                evento.set()
+
+        self._presenca_mudou()
+
+        print(f"[SHARD] #{sala} importada ({len(mensagens)} mensagens)")
+        return True, f"✅ #{sala} importada"
+
+    def obter_replicacao(self, posicoes, versao_presenca, timeout=0):
+        """
+        Fluxo de replicação: mensagens de todas as salas e presença
+
+        Chamado pela réplica em long-poll; retorna assim que houver
+        mensagens posteriores a posicoes ou a presença mudar.
+
+        Args:
+            posicoes: Dicionário sala -> última sequência replicada
+            versao_presenca: Última versão de presença recebida
+            timeout: Espera máxima em segundos
+
+        Returns:
+            dict: "mensagens" (dicionários, em ordem dentro de cada sala),
+            "versao" e "presenca" (usuário -> salas; None se não mudou)
+        """
+        timeout = min(max(timeout, 0), self.espera_maxima)
+
+        evento = threading.Event()
+        self.seguidores.add(evento)  # acorda com mudança de presença
+
+        versao = self.versao_presenca
+        salas = sorted(list(self.salas.values()), key=lambda s: s.nome)
+        for sala in salas:
+            sala.ouvir(evento)
+
+        try:
+            mensagens = self._coletar(salas, posicoes)
+            if not mensagens and versao == versao_presenca and timeout:
+                evento.wait(timeout)
+                versao = self.versao_presenca
+                atuais = sorted(list(self.salas.values()), key=lambda s: s.nome)
+                mensagens = self._coletar(atuais, posicoes)
+        finally:
+            self.seguidores.discard(evento)
+            for sala in salas:
+                sala.deixar_de_ouvir(evento)
+
+        presenca = None
+        if versao != versao_presenca:
+            with self.lock_usuarios:
+                with self.lock_salas:
+                    presenca = {
+                        nome: sorted(self.salas_usuario.get(nome, ()))
+                        for nome in self.usuarios
+                    }
+
+        return {"mensagens": mensagens, "versao": versao, "presenca": presenca,
+                "epoca": self.epoca}
+
+    def promover(self):
+        """
+        Promove a réplica a primário
+
+        Para de seguir o primário, renova as sessões replicadas (os
+        clientes têm um timeout inteiro para reconectar) e assume o nome
+        do primário no Name Server com a época seguinte, o que depõe o
+        primário antigo se ele ainda estiver vivo (ver _conferir_epoca).
+        Mensagens que ele aceitou e ainda não tinham sido replicadas se
+        perdem: a replicação é assíncrona.
+
+        Returns:
+            tuple: (sucesso, mensagem)
+        """
+        ns = Pyro4.locateNS() if self.nome_servico else None
+        registrada = epoca_registrada(ns, self.nome_servico)[1] if ns else 0
+
+        with self.lock_usuarios:
+            if self.papel != "replica" or self.seguidor is None:
+                return False, "❌ Só uma réplica pode ser promovida"
+
+            self.seguidor.parar()
+            agora = time.time()
+            for sessao in self.usuarios.values():
+                sessao.ultima_atividade = agora
+            self.epoca = max(self.epoca, registrada) + 1
+            self.papel = "primario"
+
+        if ns:
+            registrar_primario(ns, self.nome_servico, self.uri, self.epoca)
+            ns.remove(REPLICA_NAME_PREFIX + self.nome_servico)
+
+        print(f"[RÉPLICA] Promovida a primário ({self.nome_servico}, época {self.epoca})")
+        return True, "✅ Promovida a primário"
+
+    def obter_historico(self, limite=20, sala=SALA_PADRAO, compressao=None):
+        """
+        Retorna histórico de mensagens de uma sala
         
         Args:
             limite: Número de mensagens
+            sala: Nome da sala
+            compressao: Formato de lote comprimido aceito pelo cliente
             
         Returns:
-            list: Lista de mensagens
+            list: Lista de mensagens (ou lote comprimido)
+        """
+        s = self.salas.get(sala)
+        if s is None:
+            return []
+        return self._responder_lote([m.to_dict() for m in s.mensagens.ultimas(limite)], compressao)
+
+    def iterar_historico(self, desde_seq=0, ate_seq=None, lote=HISTORY_STREAM_PAGE,
+                         sala=SALA_PADRAO, compressao=None):
+        """
+        Percorre o histórico de uma sala em páginas (gerador)
+
+        Com o ITER_STREAMING do Pyro4 o cliente recebe um iterador remoto
+        e cada página só é montada quando ele pede a próxima, então a
+        memória dos dois lados fica limitada a uma página. Mensagens que
+        já saíram da memória vêm do log em disco (se houver).
+
+        Args:
+            desde_seq: Começa depois desta sequência
+            ate_seq: Termina nesta sequência, inclusive (None = até a última)
+            lote: Mensagens por página
+            sala: Nome da sala
+            compressao: Formato de lote comprimido aceito pelo cliente
+
+        Yields:
+            list: Página de dicionários de mensagem (ou lote comprimido)
+        """
+        lote = min(max(lote, 1), HISTORY_STREAM_MAX_PAGE)
+        s = self.salas.get(sala)
+        if s is None:
+            return
+
+        fim = s.mensagens.proximo_seq if ate_seq is None else ate_seq + 1
+        ultimo = desde_seq
+        pagina = []
+
+        # Arquivo: o que está só no disco (antes do início da memória)
+        primeiro_em_memoria = s.mensagens.primeiro_seq
+        if self.log and desde_seq + 1 < primeiro_em_memoria:
+            for msg in self.log.ler(sala, desde_seq):
+                if msg.seq >= min(primeiro_em_memoria, fim):
+                    break
+                if msg.seq <= ultimo:
+                    continue  # sequência repetida no log (ex.: importação)
+
+                pagina.append(msg.to_dict())
+                ultimo = msg.seq
+                if len(pagina) >= lote:
+                    yield self._responder_lote(pagina, compressao)
+                    pagina = []
+
+        # Memória, uma página por vez (o que já foi descartado é pulado)
+        inicio = ultimo + 1
+        while inicio < min(fim, s.mensagens.proximo_seq):
+            inicio = max(inicio, s.mensagens.primeiro_seq)
+            parte = min(inicio + lote, fim)
+
+            for msg in s.mensagens.entre(inicio, parte):
+                pagina.append(msg.to_dict())
+                if len(pagina) >= lote:
+                    yield self._responder_lote(pagina, compressao)
+                    pagina = []
+
+            inicio = parte
+
+        if pagina:
+            yield self._responder_lote(pagina, compressao)
+
+    def buscar_mensagens(self, desde=None, ate=None, remetente=None, sala=SALA_PADRAO,
+                         limite=SEARCH_MAX_RESULTS, compressao=None):
         """
-        with self.lock:
-            return [m.to_dict() for m in self.mensagens[-limite:]]
+        Busca mensagens retidas por intervalo de horário e/ou remetente
+
+        Usa o índice do histórico da sala (bisect sobre os horários e
+        posting list por remetente): O(log n + k). Só cobre o que ainda
+        está em memória; mensagens mais antigas ficam no log em disco.
+
+        Args:
+            desde: Horário mínimo, inclusive (epoch ou string ISO)
+            ate: Horário máximo, inclusive (epoch ou string ISO)
+            remetente: Nome do remetente (None = todos)
+            sala: Nome da sala
+            limite: Máximo de mensagens (as mais antigas primeiro)
+            compressao: Formato de lote comprimido aceito pelo cliente
+
+        Returns:
+            list: Mensagens em ordem de sequência (ou lote comprimido)
+        """
+        s = self.salas.get(sala)
+        if s is None or not s.mensagens.indexar:
+            return []
+
+        desde = self._horario(desde)
+        ate = self._horario(ate)
+        limite = min(max(limite, 1), SEARCH_MAX_RESULTS)
+
+        # O índice não tem leitura sem lock como o buffer
+        with s.lock:
+            encontradas = s.mensagens.buscar(desde, ate, remetente, limite)
+
+        return self._responder_lote([m.to_dict() for m in encontradas], compressao)
+
+    def pesquisar(self, termos, limite=20, sala=SALA_PADRAO, compressao=None):
+        """
+        Pesquisa textual nas mensagens retidas de uma sala
+
+        Usa o índice invertido mantido a cada mensagem armazenada; cada
+        termo casa também por prefixo e o resultado vem por relevância.
+
+        Args:
+            termos: Texto da consulta
+            limite: Máximo de resultados
+            sala: Nome da sala
+            compressao: Formato de lote comprimido aceito pelo cliente
+
+        Returns:
+            list: Mensagens da mais relevante para a menos (ou lote comprimido)
+        """
+        s = self.salas.get(sala)
+        if s is None or not s.mensagens.indexar_texto:
+            return []
+
+        limite = min(max(limite, 1), FULLTEXT_MAX_RESULTS)
+
+        with s.lock:
+            encontradas = s.mensagens.pesquisar(str(termos)[:MAX_MESSAGE_LENGTH], limite)
+
+        return self._responder_lote([m.to_dict() for m in encontradas], compressao)
 
     def obter_usuarios_online(self):
         """
@@ -185,8 +892,8 @@ class ChatServer:
         Returns:
             list: Nomes dos usuários
         """
-        with self.lock:
-            return sorted(list(self.usuarios.keys()))
+        # list(dict) é atômico sob o GIL
+        return sorted(list(self.usuarios))
     
     def obter_estatisticas(self):
         """
@@ -195,74 +902,507 @@ class ChatServer:
         Returns:
             dict: Estatísticas
         """
-        with self.lock:
-            uptime = datetime.now() - self.stats['start_time']
-            return {
-                'usuarios_online': len(self.usuarios),
-                'total_mensagens': self.stats['total_messages'],
-                'total_usuarios_historico': self.stats['total_users'],
-                'pico_usuarios': self.stats['peak_users'],
-                'uptime_segundos': uptime.total_seconds(),
-                'uptime_formatado': str(uptime).split('.')[0]
-            }
+        uptime = datetime.now() - self.stats['start_time']
+        return {
+            'usuarios_online': len(self.usuarios),
+            'total_mensagens': self.stats['total_messages'],
+            'total_usuarios_historico': self.stats['total_users'],
+            'pico_usuarios': self.stats['peak_users'],
+            'salas': len(self.salas),
+            'papel': self.papel,
+            'uptime_segundos': uptime.total_seconds(),
+            'uptime_formatado': str(uptime).split('.')[0]
+        }
 
-    def _registrar_sistema(self, texto):
-        """Adiciona mensagem de sistema"""
-        m = Mensagem("Sistema", texto, datetime.now(), tipo="sistema")
-        self.mensagens.append(m)
+    def obter_metricas(self):
+        """
+        Retorna métricas por método remoto e taxas de mensagens
+
+        Returns:
+            dict: {"rpc": {metodo: {chamadas, erros, recusas, media_ms,
+            p50_ms, p95_ms, p99_ms, espera_lock_ms}}, "ingresso",
+            "egresso" (mensagens/s em janelas de 1, 10 e 60 s e total),
+            "uptime_segundos"}; vazio com métricas desligadas
+        """
+        if self.metricas is None:
+            return {}
+        return self.metricas.obter()
+
+    def reportar_latencia(self, usuario, agregados):
+        """
+        Recebe os agregados de latência de um cliente
+
+        Cada cliente reporta periodicamente os histogramas das entregas
+        rastreadas que recebeu desde o último reporte.
+
+        Args:
+            usuario: Nome do usuário
+            agregados: AgregadorLatencia.exportar() do cliente
+
+        Returns:
+            tuple: (sucesso, mensagem)
+        """
+        if self.latencias is None:
+            return False, "❌ Rastreio de latência desligado no servidor"
+
+        self._tocar(usuario)
+        try:
+            self.latencias.mesclar(agregados)
+        except ValueError as e:
+            return False, f"❌ Agregados inválidos: {e}"
+        return True, "✅ Latências registradas"
+
+    def obter_latencia(self):
+        """
+        Relatório de latência ponta a ponta de todos os clientes
+
+        Returns:
+            dict: etapa -> {amostras, media_ms, p50_ms, p95_ms, p99_ms}
+            (ver common.rastreio.ETAPAS); vazio com rastreio desligado
+        """
+        if self.latencias is None:
+            return {}
+        return self.latencias.resumo()
+
+    def _texto_metricas(self):
+        """Métricas no formato do Prometheus (endpoint HTTP)"""
+        extras = {
+            "chat_usuarios_online": len(self.usuarios),
+            "chat_salas": len(self.salas),
+            "chat_assinantes_push": len(self.push.assinantes),
+        }
+        if self.pool_daemon:
+            for chave, valor in self.pool_daemon.estado().items():
+                extras[f"chat_daemon_pool_{chave}"] = valor
+        if self.frente_async:
+            for chave, valor in self.frente_async.estado().items():
+                extras[f"chat_async_{chave}"] = valor
+        for etapa, resumo in self.obter_latencia().items():
+            for p in PERCENTIS:
+                extras[f"chat_latencia_{etapa}_p{p}_segundos"] = resumo[f"p{p}_ms"] / 1000
+        return self.metricas.prometheus(extras)
+
+    def _responder_polling(self, mensagens, compressao):
+        """Conta o egresso, carimba o despacho (rastreio) e monta o lote"""
+        if mensagens:
+            if self.metricas:
+                self.metricas.egresso.registrar(len(mensagens))
+            if self.latencias is not None:
+                mensagens = carimbar(mensagens, "polling")
+        return self._responder_lote(mensagens, compressao)
+
+    def _responder_lote(self, mensagens, compressao):
+        """Comprime o lote se o cliente aceita e ele passa do limite"""
+        if not compressao or not BATCH_COMPRESSION:
+            return mensagens
+        return compactar_lote(mensagens, compressao, chamada_binaria())
+
+    @staticmethod
+    def _horario(valor):
+        """Converte horário de busca (epoch, string ISO ou None) em epoch"""
+        if isinstance(valor, str):
+            return datetime.fromisoformat(valor).timestamp()
+        return valor
+
+    def _somente_leitura(self):
+        """Recusa de escrita enquanto réplica ou deposto (None no primário)"""
+        if self.papel == "replica":
+            return False, "❌ Servidor réplica (somente leitura)"
+        if self.papel == "deposto":
+            return False, "❌ Servidor deposto (outro primário assumiu)"
+        return None
+
+    def _conferir_epoca(self):
+        """
+        Fencing do primário: se o Name Server aponta o nome dele para
+        outro servidor de época maior (réplica promovida durante uma
+        partição), passa a "deposto"
+
+        Returns:
+            bool: True se foi deposto
+        """
+        try:
+            with Pyro4.locateNS() as ns:
+                uri, epoca = epoca_registrada(ns, self.nome_servico)
+        except Exception:
+            return False  # sem Name Server não há como outro ter assumido
+
+        if uri is None or str(uri) == str(self.uri) or epoca <= self.epoca:
+            return False
+
+        self.papel = "deposto"
+        print(f"[RÉPLICA] Deposto: {self.nome_servico} agora é {uri} (época {epoca})")
+        return True
+
+    def _presenca_mudou(self):
+        """Avisa as réplicas que usuários ou salas mudaram"""
+        self.versao_presenca += 1
+        for evento in list(self.seguidores):
+            evento.set()
+
+    def _posicoes_replicadas(self):
+        """Última sequência de cada sala (réplica)"""
+        return {nome: sala.mensagens.ultimo_seq for nome, sala in list(self.salas.items())}
+
+    def _aplicar_replicacao(self, lote):
+        """Aplica na réplica um lote retornado por obter_replicacao"""
+        for d in lote["mensagens"]:
+            sala = self._sala(d["sala"])
+
+            with sala.lock:
+                ultimo = sala.mensagens.ultimo_seq
+
+                if d["tipo"] == "lacuna":
+                    if d["seq"] < ultimo:
+                        sala.recomecar()  # primário reiniciou sem o histórico
+                    continue
+
+                if d["seq"] <= ultimo:
+                    continue
+
+                msg = Mensagem.from_dict(d)
+                sala.mensagens.restaurar([msg])
+                if self.log:
+                    self.log.anexar(msg)
+                sala.acordar()
+
+        self.epoca = max(self.epoca, lote.get("epoca", 0))
+        if lote["presenca"] is not None:
+            self._aplicar_presenca(lote["presenca"])
+
+    def _aplicar_presenca(self, presenca):
+        """Substitui usuários e membros pelos do primário (réplica)"""
+        membros = {}
+        for nome, salas in presenca.items():
+            for sala in salas:
+                membros.setdefault(sala, set()).add(nome)
+
+        with self.lock_usuarios:
+            usuarios = {}
+            for nome in presenca:
+                sessao = self.usuarios.get(nome)
+                if sessao is None:
+                    sessao = Sessao()
+                    self.expiracao.agendar(nome, sessao)
+                usuarios[nome] = sessao
+            self.usuarios = usuarios
+
+            with self.lock_salas:
+                self.salas_usuario = {nome: set(salas) for nome, salas in presenca.items()}
+
+            for nome in set(self.salas) | set(membros):
+                sala = self._sala(nome)
+                with sala.lock:
+                    sala.membros = membros.get(nome, set())
+
+    def _tocar(self, usuario):
+        """
+        Marca atividade do usuário (sem lock)
+
+        Returns:
+            bool: True se o usuário está conectado
+        """
+        sessao = self.usuarios.get(usuario)
+        if sessao is None:
+            return False
+
+        sessao.ultima_atividade = time.time()
+        return True
+
+    def _normalizar_ultimos(self, ultimo_id):
+        """Converte ultimo_id (int legado ou dicionário) em dicionário"""
+        if isinstance(ultimo_id, dict):
+            return ultimo_id
+        return {SALA_PADRAO: ultimo_id or 0}
+
+    def _salas_de(self, usuario):
+        """
+        Salas do usuário, em ordem de nome (sem lock)
+
+        Quem não está registrado lê só a sala padrão; salas movidas
+        para outro shard são ignoradas.
+        """
+        nomes = self.salas_usuario.get(usuario)
+        if nomes is None:
+            nomes = (SALA_PADRAO,)
+        salas = (self.salas.get(n) for n in sorted(list(nomes)))
+        return [s for s in salas if s is not None]
+
+    def _coletar(self, salas, ultimos):
+        """Junta as mensagens novas de várias salas (sem lock)"""
+        resposta = []
+        for sala in salas:
+            resposta.extend(self._mensagens_desde(sala, ultimos.get(sala.nome, 0)))
+        return resposta
+
+    def _mensagens_desde(self, sala, ultimo_id):
+        """
+        Monta resposta com mensagens da sala posteriores a ultimo_id
+        (não precisa de lock)
+        """
+        historico = sala.mensagens
+        reiniciado = ultimo_id > historico.ultimo_seq
+        perdidas, novas = historico.desde(ultimo_id)
+        resposta = [m.to_dict() for m in novas]
+
+        if perdidas or reiniciado:
+            if reiniciado:
+                texto = "🔄 Servidor reiniciado, sequência recomeçou"
+            else:
+                texto = f"⚠️ {perdidas} mensagens perdidas (fora do histórico)"
+
+            lacuna = Mensagem(
+                "Sistema",
+                texto,
+                datetime.now(),
+                tipo="lacuna",
+                seq=novas[0].seq - 1 if novas else historico.ultimo_seq,
+                sala=sala.nome
+            )
+            resposta.insert(0, lacuna.to_dict())
+
+        return resposta
+
+    def _sala(self, nome):
+        """Retorna a sala, criando-a se necessário"""
+        sala = self.salas.get(nome)
+        if sala is None:
+            with self.lock_salas:
+                sala = self.salas.get(nome)
+                if sala is None:
+                    sala = self.salas[nome] = Sala(nome, lock=self.novo_lock())
+        return sala
+
+    def _entrar(self, usuario, nome_sala, aviso):
+        """Adiciona usuário à sala e avisa os membros (chamar com lock_usuarios)"""
+        sala = self._sala(nome_sala)
+
+        with self.lock_salas:
+            self.salas_usuario.setdefault(usuario, set()).add(nome_sala)
+
+        with sala.lock:
+            sala.membros.add(usuario)
+
+        self._presenca_mudou()
+
+        # Long-poll em andamento não conhece a sala nova: faz o cliente voltar
+        evento = self.esperando.get(usuario)
+        if evento:
+            evento.set()
+
+        self._registrar_sistema(aviso, nome_sala)
+
+    def _sair(self, usuario, sala, aviso):
+        """Remove usuário da sala e avisa os membros (chamar com lock_usuarios)"""
+        with sala.lock:
+            sala.membros.discard(usuario)
+
+        self._presenca_mudou()
+        self._registrar_sistema(aviso, sala.nome)
+
+    def _remover(self, usuario, aviso):
+        """Tira o usuário de todas as salas e libera seu estado"""
+        with self.lock_salas:
+            salas = self.salas_usuario.pop(usuario, set())
+
+        for nome in sorted(salas):
+            self._sair(usuario, self.salas[nome], aviso)
+
+        self.rate_limiter.remover(usuario)
+        self.push.cancelar(usuario)
+        self._presenca_mudou()
+
+    def _restaurar(self, mensagens):
+        """Distribui mensagens lidas do log entre as salas"""
+        por_sala = {}
+        for msg in mensagens:
+            por_sala.setdefault(msg.sala, []).append(msg)
+
+        for nome, msgs in por_sala.items():
+            self._sala(nome).mensagens.restaurar(msgs)
+
+    def _armazenar(self, msg):
+        """
+        Adiciona ao histórico da sala, grava no log e avisa os leitores
+
+        Returns:
+            int: Marca de durabilidade do log (None sem log)
+        """
+        sala = self._sala(msg.sala)
+        rastreio = msg.rastreio
+        if rastreio:
+            pedido = time.time()
+
+        with sala.lock:
+            if rastreio:
+                # Antes de adicionar: leitores sem lock já podem vê-la
+                agora = time.time()
+                rastreio["lock"] = agora - pedido
+                rastreio["armazenado"] = agora
+            sala.mensagens.adicionar(msg)
+            marca = self.log.anexar(msg) if self.log else None
+            self.push.publicar([msg.to_dict()], sala.membros)
+            sala.acordar()
+
+        return marca
+
+    def _registrar_sistema(self, texto, sala=SALA_PADRAO):
+        """Adiciona mensagem de sistema à sala"""
+        self._armazenar(Mensagem("Sistema", texto, tipo="sistema", sala=sala))
 
     def _limpar_inativos(self):
-        """Thread que remove usuários inativos"""
+        """
+        Thread que remove usuários inativos
+
+        Dorme até o próximo prazo da fila de expiração (no máximo
+        EXPIRY_CHECK_INTERVAL) e só processa as sessões vencidas.
+        """
+        proxima_conferencia = 0  # da época (ver _conferir_epoca)
+
         while True:
-            time.sleep(30)
-            agora = time.time()
+            with self.lock_usuarios:
+                prazo = self.expiracao.proximo_prazo()
+
+            espera = EXPIRY_CHECK_INTERVAL
+            if prazo is not None:
+                espera = min(max(prazo - time.time(), 0), espera)
+            time.sleep(espera)
+
+            if self.papel != "primario":
+                continue  # o primário decide quem expirou
 
-            with self.lock:
-                remover = [
-                    u for u, ts in self.usuarios.items()
-                    if agora - ts > CLIENT_TIMEOUT
-                ]
+            if self.nome_servico and time.monotonic() >= proxima_conferencia:
+                proxima_conferencia = time.monotonic() + REPLICA_FAILOVER_TIMEOUT
+                if self._conferir_epoca():
+                    continue
+
+            with self.lock_usuarios:
+                remover = self.expiracao.vencidos(time.time(), self.usuarios)
                 
                 for u in remover:
                     del self.usuarios[u]
-                    self._registrar_sistema(f"⚠️ {u} desconectado (inatividade)")
+                    self._remover(u, f"⚠️ {u} desconectado (inatividade)")
                     print(f"[TIMEOUT] '{u}' removido")
-                    
-                    if u in self.message_timestamps:
-                        del self.message_timestamps[u]
 
 
-def main():
-    """Inicia o servidor"""
+def _interromper(sinal, quadro):
+    """SIGTERM (ex.: launch.py) encerra como o Ctrl+C"""
+    raise KeyboardInterrupt
+
+
+def main(shard=None, replica=False):
+    """
+    Inicia o servidor
+
+    Args:
+        shard: Número do shard (registra "chat.server.shard-N" em vez
+            de "chat.server")
+        replica: Inicia como réplica do servidor (ou shard) e registra
+            "chat.replica.<nome>"
+    """
+    nome = CHAT_SERVER_NAME if shard is None else f"{SHARD_NAME_PREFIX}{shard}"
+
     print("\n" + "="*60)
     print("🚀 SERVIDOR DO CHAT DISTRIBUÍDO")
     print("="*60 + "\n")
 
+    signal.signal(signal.SIGTERM, _interromper)
+    log = None
     try:
+        configurar()
+        print(f"🔌 Serialização: {Pyro4.config.SERIALIZER} "
+              f"(aceita: {', '.join(sorted(Pyro4.config.SERIALIZERS_ACCEPTED))})")
+        print(f"🚫 Lista de bloqueio: {len(lista_bloqueio())} termos ({lista_bloqueio().caminho})")
+
         print("📡 Conectando ao Name Server...")
-        daemon = Pyro4.Daemon()
+        daemon = criar_daemon()
         ns = Pyro4.locateNS()
-        
+        pool = getattr(daemon.transportServer, "pool", None)
+        if Pyro4.config.SERVERTYPE == "multiplex":
+            print("🔀 Daemon multiplex (sem long-poll)")
+        else:
+            print(f"🧵 Daemon com pool de {Pyro4.config.THREADPOOL_SIZE_MIN}-"
+                  f"{Pyro4.config.THREADPOOL_SIZE} threads ({type(pool).__name__})")
+
+        if PERSISTENCE_ENABLED:
+            print("💾 Abrindo log de mensagens...")
+            # Cada shard tem seu próprio log
+            diretorio = caminho_do_pacote(LOG_DIR)
+            if shard is not None:
+                diretorio = os.path.join(diretorio, f"shard-{shard}")
+            if replica:
+                diretorio += "-replica"
+            log = LogMensagens(diretorio)
+
         print("🔧 Criando servidor...")
-        server = ChatServer()
+        metricas = MetricasRPC() if METRICS_ENABLED else None
+        server = ChatServer(log, primario=nome if replica else None, metricas=metricas)
+        if hasattr(pool, "estado"):
+            server.pool_daemon = pool
+        if log:
+            total = sum(len(s.mensagens) for s in server.salas.values())
+            print(f"💾 {total} mensagens recuperadas em {len(server.salas)} salas")
+
+        if metricas and METRICS_HTTP_PORT:
+            # Uma porta por processo: shard N usa a base + N, réplica + 100
+            porta = METRICS_HTTP_PORT + (shard or 0) + (100 if replica else 0)
+            try:
+                servir_http(server._texto_metricas, METRICS_HTTP_HOST, porta)
+                print(f"📈 Métricas: http://{METRICS_HTTP_HOST}:{porta}/metrics")
+            except OSError as e:
+                print(f"⚠️  Endpoint de métricas indisponível na porta {porta}: {e}")
+
+        if ASYNC_FRONTEND_ENABLED:
+            # Mesma regra de portas do endpoint de métricas
+            porta = ASYNC_FRONTEND_PORT + (shard or 0) + (100 if replica else 0)
+            frente = FrenteAsync(server, ASYNC_FRONTEND_HOST, porta)
+            try:
+                frente.iniciar_em_thread()
+                server.frente_async = frente
+                print(f"⚡ Front end asyncio: {ASYNC_FRONTEND_HOST}:{porta}")
+            except OSError as e:
+                print(f"⚠️  Front end asyncio indisponível na porta {porta}: {e}")
 
         print("📝 Registrando no Name Server...")
+        if not replica:
+            # Primário antigo voltando não toma o nome de quem assumiu
+            atual, epoca = epoca_registrada(ns, nome)
+            if atual is not None and primario_ativo(atual):
+                print(f"❌ {nome} já tem um primário ativo (época {epoca}); "
+                      "inicie com --replica")
+                return
+            server.epoca = epoca + 1 if atual is not None else 0
+
         uri = daemon.register(server)
-        ns.register(CHAT_SERVER_NAME, uri)
+        server.nome_servico, server.uri = nome, uri
+        if replica:
+            ns.register(REPLICA_NAME_PREFIX + nome, uri)
+            print(f"\n🪞 Réplica de: {nome}")
+        else:
+            registrar_primario(ns, nome, uri, server.epoca)
 
-        print(f"\n✅ Servidor: {CHAT_SERVER_NAME}")
+        print(f"\n✅ Servidor: {nome}")
         print(f"📍 URI: {uri}")
         print("\n" + "="*60)
         print("🟢 SERVIDOR ATIVO - Aguardando conexões")
         print("="*60 + "\n")
         print("💡 Ctrl+C para encerrar\n")
 
-        daemon.requestLoop()
+        # Deposto (outro primário assumiu): encerra para os clientes
+        # reconectarem ao novo
+        daemon.requestLoop(loopCondition=lambda: server.papel != "deposto")
+        if server.papel == "deposto":
+            print("\n🔴 Servidor deposto, encerrando")
+            daemon.close()
         
     except Exception as e:
         print(f"\n❌ Erro: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        # fsync do que ainda está no buffer e índice do segmento atual
+        if log:
+            log.fechar()
 
 
 if __name__ == "__main__":
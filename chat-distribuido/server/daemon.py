@@ -0,0 +1,235 @@
+"""
+Daemon Pyro4 do servidor
+Aplica tipo de servidor, limites do pool, backlog e timeouts de
+config/settings.py e, no modo thread, troca o pool do Pyro4 por um
+pool adaptativo
+"""
+
+import logging
+import os
+import threading
+from collections import deque
+
+import Pyro4
+from Pyro4.socketserver.threadpool import NoFreeWorkersError, PoolError
+
+from config.settings import (
+    DAEMON_SERVER_TYPE,
+    DAEMON_POOL_MIN,
+    DAEMON_POOL_MAX,
+    DAEMON_ADAPTIVE_POOL,
+    DAEMON_POOL_QUEUE,
+    DAEMON_POOL_IDLE_TIMEOUT,
+    DAEMON_SOCKET_BACKLOG,
+    DAEMON_COMM_TIMEOUT,
+    DAEMON_POLL_TIMEOUT,
+)
+
+log = logging.getLogger("chat.daemon")
+
+
+class PoolAdaptativo:
+    """
+    Pool de threads do servidor "thread" do Pyro4, dimensionado pela fila
+
+    Cada tarefa é uma conexão inteira (o Pyro4 prende uma thread por
+    conexão). O pool original cria uma thread por conexão até o máximo,
+    recusa as seguintes na hora e encerra cada thread que fica ociosa
+    acima do mínimo, recriando-as no próximo pico. Este:
+
+    - enfileira as conexões e cria threads conforme a profundidade da
+      fila (uma por conexão que nenhuma thread ociosa vai atender);
+    - no máximo de threads, deixa até `fila_maxima` conexões esperando
+      uma conexão terminar antes de recusar;
+    - mantém threads ociosas por `ociosidade` segundos antes de
+      encolher até o mínimo, sem recriar threads a cada rajada.
+
+    Tem a interface usada pelo SocketServer_Threadpool (process, close,
+    num_workers).
+    """
+
+    def __init__(self, minimo=DAEMON_POOL_MIN, maximo=DAEMON_POOL_MAX,
+                 fila_maxima=DAEMON_POOL_QUEUE, ociosidade=DAEMON_POOL_IDLE_TIMEOUT):
+        """
+        Args:
+            minimo: Threads mantidas mesmo ociosas
+            maximo: Máximo de threads
+            fila_maxima: Conexões em espera com o pool no máximo
+            ociosidade: Segundos ociosa até uma thread acima do mínimo terminar
+        """
+        if not 1 <= minimo <= maximo:
+            raise ValueError("pool: é preciso 1 <= mínimo <= máximo")
+
+        self.minimo = minimo
+        self.maximo = maximo
+        self.fila_maxima = fila_maxima
+        self.ociosidade = ociosidade
+        self.fila = deque()
+        self.cond = threading.Condition()
+        self.threads = 0
+        self.ociosas = 0
+        self.iniciando = 0  # criadas que ainda não pegaram a fila
+        self.fechado = False
+        self.recusadas = 0
+        self.pico_fila = 0
+
+        with self.cond:
+            for _ in range(minimo):
+                self._nova_thread()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self):
+        estado = self.estado()
+        return (f"<PoolAdaptativo {estado['threads']} threads, {estado['ocupadas']} ocupadas, "
+                f"fila {estado['fila']}>")
+
+    def num_workers(self):
+        return self.threads
+
+    def estado(self):
+        """
+        Retrato do pool (métricas)
+
+        Returns:
+            dict: threads, ocupadas, fila, pico_fila, recusadas
+        """
+        with self.cond:
+            return {
+                "threads": self.threads,
+                "ocupadas": self.threads - self.ociosas - self.iniciando,
+                "fila": len(self.fila),
+                "pico_fila": self.pico_fila,
+                "recusadas": self.recusadas,
+            }
+
+    def process(self, tarefa):
+        """
+        Enfileira uma conexão e cresce o pool se preciso
+
+        Raises:
+            NoFreeWorkersError: Pool no máximo e fila cheia (o Pyro4
+                recusa a conexão)
+        """
+        with self.cond:
+            if self.fechado:
+                raise PoolError("pool encerrado")
+
+            livres = self.ociosas + self.iniciando
+            if (self.threads >= self.maximo and len(self.fila) >= livres + self.fila_maxima):
+                self.recusadas += 1
+                raise NoFreeWorkersError("pool e fila cheios, aumente DAEMON_POOL_MAX")
+
+            self.fila.append(tarefa)
+            self.pico_fila = max(self.pico_fila, len(self.fila))
+
+            for _ in range(min(len(self.fila) - livres, self.maximo - self.threads)):
+                self._nova_thread()
+            self.cond.notify()
+
+    def close(self):
+        """Encerra o pool; conexões ainda na fila são fechadas"""
+        with self.cond:
+            self.fechado = True
+            pendentes = list(self.fila)
+            self.fila.clear()
+            self.cond.notify_all()
+
+        for tarefa in pendentes:
+            tarefa.csock.close()
+
+    def _nova_thread(self):
+        """Cria uma thread (chamar com self.cond)"""
+        self.threads += 1
+        self.iniciando += 1
+        threading.Thread(target=self._trabalhar, name="Pyro-Adaptativo", daemon=True).start()
+
+    def _trabalhar(self):
+        """Laço de uma thread: atende conexões até ficar ociosa demais"""
+        with self.cond:
+            self.iniciando -= 1
+            self.ociosas += 1
+
+        while True:
+            with self.cond:
+                while not self.fila:
+                    if self.fechado:
+                        self._sair()
+                        return
+                    if (not self.cond.wait(self.ociosidade) and not self.fila
+                            and self.threads > self.minimo):
+                        self._sair()
+                        return
+                tarefa = self.fila.popleft()
+                self.ociosas -= 1
+
+            try:
+                tarefa()
+            except Exception as e:
+                log.exception("exceção na conexão atendida pelo pool: %s", e)
+
+            with self.cond:
+                self.ociosas += 1
+
+    def _sair(self):
+        """Contabiliza a saída de uma thread ociosa (chamar com self.cond)"""
+        self.ociosas -= 1
+        self.threads -= 1
+
+
+def _aplicar(chave, valor):
+    """Configuração do Pyro4, salvo se definida no ambiente (PYRO_<chave>)"""
+    if f"PYRO_{chave}" not in os.environ:
+        setattr(Pyro4.config, chave, valor)
+
+
+def criar_daemon(host=None, porta=0):
+    """
+    Cria o Daemon Pyro4 do servidor com a configuração de DAEMON_*
+
+    Args:
+        host: Endereço de escuta (padrão do Pyro4 se None)
+        porta: Porta (0 = qualquer livre)
+
+    Returns:
+        Pyro4.Daemon: Daemon pronto para registrar objetos; no modo
+        thread com DAEMON_ADAPTIVE_POOL, daemon.transportServer.pool é
+        um PoolAdaptativo
+    """
+    _aplicar("SERVERTYPE", DAEMON_SERVER_TYPE)
+    _aplicar("THREADPOOL_SIZE_MIN", DAEMON_POOL_MIN)
+    _aplicar("THREADPOOL_SIZE", DAEMON_POOL_MAX)
+    _aplicar("COMMTIMEOUT", DAEMON_COMM_TIMEOUT)
+    _aplicar("POLLTIMEOUT", DAEMON_POLL_TIMEOUT)
+
+    daemon = Pyro4.Daemon(host=host, port=porta)
+
+    # O Pyro4 escuta com backlog fixo de 100; listen() de novo o ajusta
+    daemon.sock.listen(DAEMON_SOCKET_BACKLOG)
+
+    if Pyro4.config.SERVERTYPE == "thread" and DAEMON_ADAPTIVE_POOL:
+        servidor = daemon.transportServer
+        servidor.pool.close()
+        servidor.pool = PoolAdaptativo(
+            Pyro4.config.THREADPOOL_SIZE_MIN,
+            Pyro4.config.THREADPOOL_SIZE,
+        )
+
+    return daemon
+
+
+def long_poll_permitido():
+    """
+    Se métodos remotos podem bloquear esperando (long-poll)
+
+    No servidor multiplex todas as chamadas rodam na thread do select:
+    uma espera pararia o servidor inteiro.
+
+    Returns:
+        bool: False no modo multiplex
+    """
+    return Pyro4.config.SERVERTYPE != "multiplex"
@@ -0,0 +1,84 @@
+"""
+Expiração de sessões inativas com min-heap
+Cada verificação só trabalha nas sessões cujo prazo venceu
+"""
+
+import heapq
+import itertools
+
+
+class FilaExpiracao:
+    """
+    Min-heap de prazos de inatividade com invalidação preguiçosa
+
+    Marcar atividade não mexe no heap (só atualiza a sessão). Quando uma
+    entrada vence, a sessão é conferida: se houve atividade desde o
+    agendamento, a entrada é reagendada; se a sessão já não existe, é
+    descartada. Cada sessão ativa é reagendada no máximo uma vez por
+    período de timeout.
+
+    Não é thread-safe: o chamador deve serializar o acesso.
+
+    Attributes:
+        timeout (float): Segundos de inatividade até expirar
+    """
+
+    def __init__(self, timeout):
+        """
+        Cria fila vazia
+
+        Args:
+            timeout: Segundos de inatividade até expirar
+        """
+        self.timeout = timeout
+        self.heap = []  # (prazo, desempate, chave, sessao)
+        self.contador = itertools.count()
+
+    def __len__(self):
+        return len(self.heap)
+
+    def agendar(self, chave, sessao):
+        """
+        Agenda verificação de uma sessão
+
+        Args:
+            chave: Nome do usuário
+            sessao: Objeto com atributo ultima_atividade
+        """
+        prazo = sessao.ultima_atividade + self.timeout
+        heapq.heappush(self.heap, (prazo, next(self.contador), chave, sessao))
+
+    def proximo_prazo(self):
+        """
+        Retorna o prazo mais próximo
+
+        Returns:
+            float: Horário do próximo vencimento (None se vazia)
+        """
+        return self.heap[0][0] if self.heap else None
+
+    def vencidos(self, agora, ativos):
+        """
+        Retira as sessões expiradas
+
+        Args:
+            agora: Horário atual
+            ativos: Dicionário chave -> sessão atualmente conectada
+
+        Returns:
+            list: Chaves expiradas
+        """
+        expirados = []
+
+        while self.heap and self.heap[0][0] <= agora:
+            _, _, chave, sessao = heapq.heappop(self.heap)
+
+            if ativos.get(chave) is not sessao:
+                continue  # desconectou (ou reconectou com nova sessão)
+
+            if sessao.ultima_atividade + self.timeout > agora:
+                self.agendar(chave, sessao)  # teve atividade: reagenda
+            else:
+                expirados.append(chave)
+
+        return expirados
@@ -0,0 +1,307 @@
+"""
+Front end asyncio do servidor
+Atende as operações do ChatServer por quadros JSON em TCP (ver
+common.quadros), no mesmo processo e sobre o mesmo estado do daemon
+Pyro4; a validação é a mesma porque as chamadas vão ao próprio ChatServer
+
+Um long-poll aqui é uma corrotina esperando um future, não uma thread
+presa como no daemon "thread": um processo mantém dezenas de milhares
+de sessões.
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config.settings import (
+    ASYNC_FRONTEND_HOST,
+    ASYNC_FRONTEND_PORT,
+    ASYNC_FRONTEND_WORKERS,
+    ASYNC_MAX_PENDING,
+    DAEMON_SOCKET_BACKLOG,
+    LONG_POLL_MAX_TIMEOUT,
+)
+
+from common.quadros import codificar, ler_quadro
+
+log = logging.getLogger("chat.frente_async")
+
+# Métodos do ChatServer atendidos (sem push, replicação e administração)
+METODOS = frozenset({
+    "ping",
+    "registrar_usuario",
+    "desconectar_usuario",
+    "entrar_sala",
+    "sair_sala",
+    "listar_salas",
+    "obter_membros",
+    "enviar_mensagem",
+    "obter_mensagens",
+    "obter_historico",
+    "buscar_mensagens",
+    "pesquisar",
+    "obter_usuarios_online",
+    "obter_estatisticas",
+    "obter_metricas",
+    "reportar_latencia",
+    "obter_latencia",
+})
+
+# Chamadas que rodam direto no laço: não pegam locks (que threads do
+# daemon Pyro4 podem estar segurando) nem comprimem; as demais vão para
+# o pool de threads
+NO_LACO = frozenset({"ping", "listar_salas", "obter_usuarios_online"})
+
+
+class FrenteAsync:
+    """
+    Servidor asyncio que repassa chamadas a um ChatServer
+
+    Só as chamadas de NO_LACO rodam direto no laço; as que pegam locks
+    do ChatServer (disputados com as threads do daemon Pyro4), comprimem
+    a resposta ou esperam o fsync do log vão para um pool de threads. O
+    long-poll de obter_mensagens é feito aqui, sem bloquear: a sala
+    sinaliza um despertador que completa o future da espera, e só a
+    resposta final é montada no pool.
+
+    Attributes:
+        conexoes (int): Conexões abertas
+        esperando (int): Long-polls em andamento
+    """
+
+    def __init__(self, servidor, host=ASYNC_FRONTEND_HOST, porta=ASYNC_FRONTEND_PORT):
+        """
+        Args:
+            servidor: ChatServer atendido
+            host: Endereço de escuta
+            porta: Porta (0 = qualquer livre; a escolhida fica em self.porta)
+        """
+        self.servidor = servidor
+        self.host = host
+        self.porta = porta
+        self.loop = None
+        self.tcp = None
+        self.executor = ThreadPoolExecutor(ASYNC_FRONTEND_WORKERS, thread_name_prefix="FrenteAsync")
+        self.conexoes = 0
+        self.esperando = 0
+
+        # Despertadores sinalizados por outras threads, entregues ao laço
+        # de uma vez (uma chamada call_soon_threadsafe por rajada)
+        self.lock_acordar = threading.Lock()
+        self.acordar_pendentes = []
+        self.thread_laco = None
+
+    async def iniciar(self):
+        """Começa a escutar (no laço em execução)"""
+        self.loop = asyncio.get_running_loop()
+        self.thread_laco = threading.get_ident()
+        self.tcp = await asyncio.start_server(
+            self._atender, self.host, self.porta, backlog=DAEMON_SOCKET_BACKLOG
+        )
+        self.porta = self.tcp.sockets[0].getsockname()[1]
+
+    async def servir(self):
+        """Escuta e atende até ser cancelado"""
+        await self.iniciar()
+        async with self.tcp:
+            await self.tcp.serve_forever()
+
+    def iniciar_em_thread(self):
+        """
+        Roda o front end em um laço próprio, em uma thread daemon
+
+        Returns:
+            threading.Thread: Thread do laço (já escutando)
+
+        Raises:
+            OSError: Se não foi possível escutar na porta
+        """
+        pronto = threading.Event()
+        erro = []
+
+        def rodar():
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(self.iniciar())
+            except OSError as e:
+                erro.append(e)
+                pronto.set()
+                return
+            pronto.set()
+            loop.run_forever()
+
+        thread = threading.Thread(target=rodar, name="FrenteAsync", daemon=True)
+        thread.start()
+        pronto.wait()
+        if erro:
+            raise erro[0]
+        return thread
+
+    def estado(self):
+        """
+        Retrato do front end (métricas)
+
+        Returns:
+            dict: conexoes, esperando
+        """
+        return {"conexoes": self.conexoes, "esperando": self.esperando}
+
+    async def _atender(self, leitor, escritor):
+        """Laço de uma conexão: cada pedido vira uma tarefa"""
+        self.conexoes += 1
+        tarefas = set()
+        try:
+            while True:
+                pedido = await ler_quadro(leitor)
+                if pedido is None:
+                    break
+
+                tarefa = asyncio.create_task(self._responder(pedido, escritor))
+                tarefas.add(tarefa)
+                tarefa.add_done_callback(tarefas.discard)
+
+                # Limita as chamadas simultâneas de um cliente
+                if len(tarefas) >= ASYNC_MAX_PENDING:
+                    await asyncio.wait(tarefas, return_when=asyncio.FIRST_COMPLETED)
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError as e:
+            log.warning("conexão encerrada, quadro inválido: %s", e)
+        finally:
+            self.conexoes -= 1
+            for tarefa in tarefas:
+                tarefa.cancel()
+            escritor.close()
+
+    async def _responder(self, pedido, escritor):
+        """Executa um pedido e escreve a resposta"""
+        resposta = {"id": pedido.get("id")}
+        try:
+            metodo = pedido.get("metodo")
+            if metodo not in METODOS:
+                raise AttributeError(f"método desconhecido: {metodo}")
+            args = pedido.get("args", [])
+            if not isinstance(args, list):
+                raise TypeError("args deve ser uma lista")
+            resposta["resultado"] = await self._chamar(metodo, args)
+        except Exception as e:
+            resposta["erro"] = f"{type(e).__name__}: {e}"
+
+        try:
+            quadro = codificar(resposta)
+        except (TypeError, ValueError) as e:
+            quadro = codificar({"id": resposta["id"], "erro": f"{type(e).__name__}: {e}"})
+
+        if not escritor.is_closing():
+            escritor.write(quadro)
+            try:
+                await escritor.drain()
+            except ConnectionError:
+                pass
+
+    async def _chamar(self, metodo, args):
+        """Chama o método no ChatServer (no laço, no pool ou com long-poll)"""
+        if metodo == "obter_mensagens":
+            return await self._obter_mensagens(*args)
+
+        funcao = getattr(self.servidor, metodo)
+        if metodo in NO_LACO:
+            return funcao(*args)
+        return await self._no_pool(funcao, *args)
+
+    def _no_pool(self, funcao, *args):
+        """Roda uma chamada do ChatServer no pool de threads (awaitable)"""
+        return self.loop.run_in_executor(self.executor, functools.partial(funcao, *args))
+
+    async def _obter_mensagens(self, usuario, ultimo_id, timeout=0, compressao=None):
+        """
+        obter_mensagens com long-poll assíncrono
+
+        Espera, sem bloquear o laço, até uma sala do usuário receber
+        mensagem (ou o usuário entrar em outra sala), e então responde
+        com o próprio ChatServer.obter_mensagens (sem espera, no pool:
+        pega o lock da sala e pode comprimir).
+        """
+        servidor = self.servidor
+        # Vale também com o daemon multiplex: aqui a espera não prende thread
+        timeout = min(max(timeout, 0), LONG_POLL_MAX_TIMEOUT)
+
+        if timeout:
+            ultimos = servidor._normalizar_ultimos(ultimo_id)
+            salas = servidor._salas_de(usuario)
+            if not self._ha_novas(salas, ultimos):
+                await self._esperar(usuario, salas, ultimos, timeout)
+
+        return await self._no_pool(servidor.obter_mensagens, usuario, ultimo_id, 0, compressao)
+
+    @staticmethod
+    def _ha_novas(salas, ultimos):
+        """Se alguma sala tem resposta (mensagens novas ou sequência reiniciada)"""
+        return any(s.mensagens.ultimo_seq != ultimos.get(s.nome, 0) for s in salas)
+
+    async def _esperar(self, usuario, salas, ultimos, timeout):
+        """Espera um sinal das salas (ver ChatServer.obter_mensagens)"""
+        despertador = _Despertador(self)
+        self.servidor.esperando[usuario] = despertador
+        for sala in salas:
+            sala.ouvir(despertador)
+
+        self.esperando += 1
+        try:
+            # Confere de novo: algo pode ter chegado antes de ouvir
+            if not self._ha_novas(salas, ultimos):
+                await asyncio.wait_for(despertador.futuro, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.esperando -= 1
+            for sala in salas:
+                sala.deixar_de_ouvir(despertador)
+            if self.servidor.esperando.get(usuario) is despertador:
+                del self.servidor.esperando[usuario]
+
+    def _acordar(self, despertador):
+        """Completa a espera de um despertador (de qualquer thread)"""
+        if threading.get_ident() == self.thread_laco:
+            despertador.concluir()
+            return
+
+        with self.lock_acordar:
+            agendar = not self.acordar_pendentes
+            self.acordar_pendentes.append(despertador)
+        if agendar:
+            try:
+                self.loop.call_soon_threadsafe(self._acordar_pendentes)
+            except RuntimeError:
+                pass  # laço encerrado
+
+    def _acordar_pendentes(self):
+        """Conclui os despertadores acumulados (no laço)"""
+        with self.lock_acordar:
+            pendentes, self.acordar_pendentes = self.acordar_pendentes, []
+        for despertador in pendentes:
+            despertador.concluir()
+
+
+class _Despertador:
+    """
+    Substitui o threading.Event de um long-poll: Sala.acordar chama
+    set() com o lock da sala, em qualquer thread
+    """
+
+    __slots__ = ("frente", "futuro")
+
+    def __init__(self, frente):
+        self.frente = frente
+        self.futuro = frente.loop.create_future()
+
+    def set(self):
+        self.frente._acordar(self)
+
+    def concluir(self):
+        """Completa o future (no laço)"""
+        if not self.futuro.done():
+            self.futuro.set_result(True)
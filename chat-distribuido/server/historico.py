@@ -0,0 +1,248 @@
+"""
+Histórico de mensagens em buffer circular
+Cada mensagem recebe um número de sequência crescente atribuído pelo servidor
+"""
+
+from config.settings import FULLTEXT_PREFIX_EXPANSIONS
+from server.indices import IndiceHistorico, IndiceTexto
+
+
+class HistoricoCircular:
+    """
+    Buffer circular de capacidade fixa indexado por número de sequência
+
+    A mensagem de sequência s fica na posição s % capacidade, então
+    localizar o ponto de leitura de um cliente é O(1) e descartar a
+    mensagem mais antiga não copia nada.
+
+    Escritas (adicionar) devem ser serializadas pelo chamador. Leituras
+    não precisam de lock: usam um instantâneo de proximo_seq e conferem
+    o seq de cada posição, descartando as que foram sobrescritas durante
+    a leitura.
+
+    Attributes:
+        capacidade (int): Número máximo de mensagens retidas
+        proximo_seq (int): Sequência que a próxima mensagem receberá
+        congelar (bool): Se guarda a codificação de cada mensagem
+        indice (IndiceHistorico): Índice por horário e remetente (ou None)
+        texto (IndiceTexto): Índice invertido do conteúdo (ou None)
+    """
+
+    def __init__(self, capacidade, proximo_seq=1, congelar=True, indexar=True,
+                 indexar_texto=True):
+        """
+        Cria histórico vazio
+
+        Args:
+            capacidade: Número máximo de mensagens retidas
+            proximo_seq: Sequência inicial
+            congelar: Guarda a codificação de cada mensagem (mais rápido,
+                mas dobra a memória por mensagem)
+            indexar: Mantém IndiceHistorico para buscar_mensagens
+            indexar_texto: Mantém IndiceTexto para pesquisar
+        """
+        self.capacidade = capacidade
+        self.congelar = congelar
+        self.buffer = [None] * capacidade
+        self.proximo_seq = proximo_seq
+        self.seq_inicial = proximo_seq
+        self.indice = IndiceHistorico() if indexar else None
+        self.texto = IndiceTexto(FULLTEXT_PREFIX_EXPANSIONS) if indexar_texto else None
+        self.indices = [i for i in (self.indice, self.texto) if i is not None]
+
+    @property
+    def indexar(self):
+        """Se o histórico mantém índice por horário e remetente"""
+        return self.indice is not None
+
+    @property
+    def indexar_texto(self):
+        """Se o histórico mantém índice invertido"""
+        return self.texto is not None
+
+    def __len__(self):
+        return self.proximo_seq - self.primeiro_seq
+
+    @property
+    def primeiro_seq(self):
+        """Sequência da mensagem mais antiga retida"""
+        return max(self.seq_inicial, self.proximo_seq - self.capacidade)
+
+    @property
+    def ultimo_seq(self):
+        """Sequência da mensagem mais recente (seq_inicial - 1 se vazio)"""
+        return self.proximo_seq - 1
+
+    def adicionar(self, msg):
+        """
+        Armazena mensagem atribuindo sua sequência
+
+        Se congelar estiver ativo, a mensagem é codificada uma vez para
+        que as respostas reutilizem o mesmo dicionário. A mensagem que
+        ocupava a posição sai dos índices junto com o buffer.
+
+        Args:
+            msg: Objeto Mensagem
+
+        Returns:
+            Mensagem: A própria mensagem, com seq preenchido
+        """
+        msg.seq = self.proximo_seq
+        if self.congelar:
+            msg.congelar()
+        posicao = self.proximo_seq % self.capacidade
+        if self.indices:
+            descartada = self.buffer[posicao]
+            for indice in self.indices:
+                if descartada is not None:
+                    indice.remover(descartada)
+                indice.adicionar(msg)
+        self.buffer[posicao] = msg
+        self.proximo_seq += 1
+        return msg
+
+    def restaurar(self, mensagens):
+        """
+        Recarrega mensagens que já têm sequência (ex.: lidas do log)
+
+        Args:
+            mensagens: Objetos Mensagem em ordem de sequência
+        """
+        for msg in mensagens:
+            if self.proximo_seq == self.seq_inicial:
+                self.seq_inicial = msg.seq
+            self.proximo_seq = msg.seq
+            self.adicionar(msg)
+
+    def desde(self, ultimo_seq):
+        """
+        Retorna mensagens posteriores a ultimo_seq
+
+        Se ultimo_seq for maior que a última sequência conhecida (ex.:
+        servidor reiniciado), a leitura recomeça do início do histórico.
+
+        Args:
+            ultimo_seq: Última sequência recebida pelo cliente
+
+        Returns:
+            tuple: (perdidas, mensagens) - perdidas é quantas mensagens
+            já saíram do buffer antes de o cliente lê-las
+        """
+        proximo = self.proximo_seq
+
+        if ultimo_seq >= proximo:
+            ultimo_seq = self.seq_inicial - 1
+
+        inicio = max(ultimo_seq + 1, self.seq_inicial, proximo - self.capacidade)
+        mensagens = self._ler(inicio, proximo)
+
+        if mensagens:
+            perdidas = mensagens[0].seq - (ultimo_seq + 1)
+        else:
+            perdidas = proximo - (ultimo_seq + 1)
+
+        return perdidas, mensagens
+
+    def entre(self, inicio, fim):
+        """
+        Retorna mensagens retidas com inicio <= seq < fim
+
+        Args:
+            inicio: Primeira sequência
+            fim: Sequência final (exclusiva)
+
+        Returns:
+            list: Objetos Mensagem em ordem
+        """
+        proximo = self.proximo_seq
+        inicio = max(inicio, self.seq_inicial, proximo - self.capacidade)
+        return self._ler(inicio, min(fim, proximo))
+
+    def buscar(self, desde=None, ate=None, remetente=None, limite=None):
+        """
+        Mensagens retidas por intervalo de horário e/ou remetente
+
+        Usa o índice (O(log n + k)); o chamador deve serializar com as
+        escritas, já que o índice não é lido sem lock.
+
+        Args:
+            desde: Horário mínimo (epoch, inclusive)
+            ate: Horário máximo (epoch, inclusive)
+            remetente: Nome do remetente (None = todos)
+            limite: Máximo de mensagens (as mais antigas primeiro)
+
+        Returns:
+            list: Objetos Mensagem em ordem de sequência
+        """
+        if self.indice is None:
+            raise ValueError("Histórico sem índice")
+
+        buffer = self.buffer
+        capacidade = self.capacidade
+        mensagens = []
+
+        # Confere cada posição como _ler: após restaurar com sequências
+        # repetidas o índice pode ter entradas além de proximo_seq
+        for s in self.indice.buscar(desde, ate, remetente):
+            m = buffer[s % capacidade]
+            if m is not None and m.seq == s and s < self.proximo_seq:
+                mensagens.append(m)
+                if limite is not None and len(mensagens) >= limite:
+                    break
+
+        return mensagens
+
+    def pesquisar(self, consulta, limite=20):
+        """
+        Mensagens retidas que contêm os termos, por relevância
+
+        Usa o índice invertido; o chamador deve serializar com as
+        escritas, como em buscar.
+
+        Args:
+            consulta: Termos da consulta (cada um casa também por prefixo)
+            limite: Máximo de mensagens
+
+        Returns:
+            list: Objetos Mensagem, da mais relevante para a menos
+        """
+        if self.texto is None:
+            raise ValueError("Histórico sem índice de texto")
+
+        buffer = self.buffer
+        capacidade = self.capacidade
+        mensagens = []
+
+        for _, s in self.texto.pesquisar(consulta, limite):
+            m = buffer[s % capacidade]
+            if m is not None and m.seq == s and s < self.proximo_seq:
+                mensagens.append(m)
+
+        return mensagens
+
+    def ultimas(self, limite):
+        """
+        Retorna as últimas mensagens
+
+        Args:
+            limite: Número máximo de mensagens
+
+        Returns:
+            list: Objetos Mensagem em ordem
+        """
+        proximo = self.proximo_seq
+        inicio = max(self.seq_inicial, proximo - self.capacidade, proximo - limite)
+        return self._ler(inicio, proximo)
+
+    def _ler(self, inicio, fim):
+        """Lê sequências [inicio, fim), ignorando posições sobrescritas"""
+        buffer = self.buffer
+        capacidade = self.capacidade
+        mensagens = []
+
+        for s in range(inicio, fim):
+            m = buffer[s % capacidade]
+            if m is not None and m.seq == s:
+                mensagens.append(m)
+
+        return mensagens
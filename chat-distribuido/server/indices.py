@@ -0,0 +1,432 @@
+"""
+Índices do histórico: horário, remetente e texto
+Permitem buscas sem percorrer as mensagens retidas
+"""
+
+import array
+import bisect
+import collections
+import heapq
+import math
+import re
+
+from common.utils import normalizar
+
+# Quantas entradas mortas no início de uma lista antes de compactá-la
+_COMPACTAR_APOS = 64
+
+
+class _ListaJanela:
+    """
+    Lista ordenada que descarta do início sem copiar a cada remoção
+
+    As remoções quase sempre são do elemento mais antigo (o histórico
+    descarta em ordem), então só um deslocamento avança; a lista é
+    compactada quando metade dela é lixo.
+    """
+
+    __slots__ = ("itens", "inicio")
+
+    def __init__(self, itens=None):
+        self.itens = [] if itens is None else itens
+        self.inicio = 0
+
+    def __len__(self):
+        return len(self.itens) - self.inicio
+
+    def inserir(self, item):
+        """Insere mantendo a ordem (O(1) quando chega em ordem)"""
+        if not self.itens or item >= self.itens[-1]:
+            self.itens.append(item)
+        else:
+            bisect.insort(self.itens, item, lo=self.inicio)
+
+    def remover(self, item):
+        """Remove item (O(1) amortizado quando é o mais antigo)"""
+        itens = self.itens
+        if self.inicio < len(itens) and itens[self.inicio] == item:
+            self.inicio += 1
+            if self.inicio >= _COMPACTAR_APOS and self.inicio * 2 >= len(itens):
+                del itens[:self.inicio]
+                self.inicio = 0
+            return
+
+        i = bisect.bisect_left(itens, item, lo=self.inicio)
+        if i < len(itens) and itens[i] == item:
+            del itens[i]
+
+    def faixa(self, menor, maior):
+        """Posições [i, j) dos itens com menor <= item <= maior"""
+        i = bisect.bisect_left(self.itens, menor, lo=self.inicio)
+        j = bisect.bisect_right(self.itens, maior, lo=i)
+        return i, j
+
+    def contar(self, item):
+        """Ocorrências de item (O(log n))"""
+        i, j = self.faixa(item, item)
+        return j - i
+
+
+class IndiceHistorico:
+    """
+    Índice das mensagens retidas em um HistoricoCircular
+
+    - tempos: (ts, seq, remetente) ordenados por horário, para busca por
+      intervalo com bisect
+    - remetentes: (seq, ts) de cada remetente (posting list), crescente
+      porque as sequências são atribuídas em ordem
+
+    O histórico avisa cada mensagem descartada, então o índice só
+    contém o que ainda pode ser lido. Não é thread-safe: escrita e
+    busca devem ser serializadas pelo chamador (lock da sala).
+    """
+
+    def __init__(self):
+        self.tempos = _ListaJanela()
+        self.remetentes = {}  # remetente -> _ListaJanela de (seq, ts)
+
+    def __len__(self):
+        return len(self.tempos)
+
+    def adicionar(self, msg):
+        """
+        Indexa mensagem recém-armazenada
+
+        Args:
+            msg: Objeto Mensagem com seq
+        """
+        ts = msg.ts
+        self.tempos.inserir((ts, msg.seq, msg.remetente))
+
+        lista = self.remetentes.get(msg.remetente)
+        if lista is None:
+            lista = self.remetentes[msg.remetente] = _ListaJanela()
+        lista.inserir((msg.seq, ts))
+
+    def remover(self, msg):
+        """
+        Retira mensagem descartada do histórico
+
+        Args:
+            msg: Objeto Mensagem que saiu do buffer
+        """
+        ts = msg.ts
+        self.tempos.remover((ts, msg.seq, msg.remetente))
+
+        lista = self.remetentes.get(msg.remetente)
+        if lista is not None:
+            lista.remover((msg.seq, ts))
+            if not lista:
+                del self.remetentes[msg.remetente]
+
+    def buscar(self, desde=None, ate=None, remetente=None):
+        """
+        Sequências das mensagens que atendem aos filtros
+
+        Com os dois filtros, percorre o menor dos dois conjuntos
+        candidatos (intervalo de horário ou posting list) e confere o
+        outro critério: O(log n + k).
+
+        Args:
+            desde: Horário mínimo (epoch, inclusive)
+            ate: Horário máximo (epoch, inclusive)
+            remetente: Nome do remetente (None = todos)
+
+        Returns:
+            list: Sequências em ordem crescente
+        """
+        desde = float("-inf") if desde is None else desde
+        ate = float("inf") if ate is None else ate
+
+        i, j = self.tempos.faixa((desde, float("-inf")), (ate, float("inf")))
+        if remetente is None:
+            return sorted(seq for _, seq, _ in self.tempos.itens[i:j])
+
+        lista = self.remetentes.get(remetente)
+        if lista is None:
+            return []
+
+        if len(lista) <= j - i:
+            return [seq for seq, ts in lista.itens[lista.inicio:] if desde <= ts <= ate]
+
+        return sorted(seq for _, seq, nome in self.tempos.itens[i:j] if nome == remetente)
+
+
+# Palavras: letras e dígitos, sem acento e em minúsculas
+_PALAVRA = re.compile(r"\w+")
+
+
+def tokenizar(texto, minimo=2):
+    """
+    Quebra texto em termos para o índice invertido
+
+    Args:
+        texto: Conteúdo da mensagem ou consulta
+        minimo: Tamanho mínimo do termo
+
+    Returns:
+        list: Termos normalizados (com repetições)
+    """
+    return [t for t in _PALAVRA.findall(normalizar(texto)) if len(t) >= minimo]
+
+
+class IndiceTexto:
+    """
+    Índice invertido das mensagens retidas em um HistoricoCircular
+
+    Cada termo tem uma posting list de sequências em array compacto
+    (4 bytes por ocorrência; um termo repetido na mensagem aparece
+    repetido, o que dá a frequência). As listas crescem no fim e perdem
+    o início quando o histórico descarta mensagens, como _ListaJanela.
+
+    O vocabulário fica ordenado para que consultas por prefixo achem os
+    termos com bisect. Relevância é BM25 sem normalização por tamanho
+    (mensagens de chat são curtas); empates favorecem as mais recentes.
+    As mensagens em que um termo se repete ficam também em repetidos;
+    para as demais a relevância do termo é constante, então consultas de
+    um termo só leem o fim das posting lists.
+
+    Não é thread-safe: escrita e busca devem ser serializadas pelo
+    chamador (lock da sala).
+    """
+
+    K1 = 1.2               # Saturação da frequência do termo (BM25)
+    PESO_PREFIXO = 0.5     # Peso de termos que só casam pelo prefixo
+
+    def __init__(self, expansoes=50):
+        """
+        Cria índice vazio
+
+        Args:
+            expansoes: Máximo de termos do vocabulário por prefixo
+        """
+        self.expansoes = expansoes
+        self.postings = {}     # termo -> _ListaJanela(array de seqs)
+        self.vocabulario = []  # termos ordenados
+        self.repetidos = {}    # termo -> {seq: tf} das mensagens com tf > 1
+        self.documentos = 0
+
+    def __len__(self):
+        return self.documentos
+
+    @staticmethod
+    def indexavel(msg):
+        """Só mensagens de usuários entram no índice"""
+        return msg.tipo == "normal"
+
+    def adicionar(self, msg):
+        """
+        Indexa mensagem recém-armazenada
+
+        Args:
+            msg: Objeto Mensagem com seq
+        """
+        if not self.indexavel(msg):
+            return
+
+        self.documentos += 1
+        postings = self.postings
+        termos = tokenizar(msg.conteudo)
+        for termo in termos:
+            lista = postings.get(termo)
+            if lista is None:
+                lista = postings[termo] = _ListaJanela(array.array("I"))
+                bisect.insort(self.vocabulario, termo)
+            lista.inserir(msg.seq)
+
+        for termo, tf in self._repeticoes(termos):
+            self.repetidos.setdefault(termo, {})[msg.seq] = tf
+
+    def remover(self, msg):
+        """
+        Retira mensagem descartada do histórico
+
+        Args:
+            msg: Objeto Mensagem que saiu do buffer
+        """
+        if not self.indexavel(msg):
+            return
+
+        self.documentos -= 1
+        postings = self.postings
+        termos = tokenizar(msg.conteudo)
+        for termo in termos:
+            lista = postings.get(termo)
+            if lista is None:
+                continue
+            lista.remover(msg.seq)
+            if not lista:
+                del postings[termo]
+                i = bisect.bisect_left(self.vocabulario, termo)
+                del self.vocabulario[i]
+
+        for termo, _ in self._repeticoes(termos):
+            repetidos = self.repetidos.get(termo)
+            if repetidos is not None:
+                repetidos.pop(msg.seq, None)
+                if not repetidos:
+                    del self.repetidos[termo]
+
+    @staticmethod
+    def _repeticoes(termos):
+        """Pares (termo, tf) dos termos que aparecem mais de uma vez"""
+        if len(set(termos)) == len(termos):
+            return ()
+        return [(t, n) for t, n in collections.Counter(termos).items() if n > 1]
+
+    def expandir(self, termo):
+        """
+        Termos do vocabulário que começam com termo
+
+        Args:
+            termo: Termo da consulta (normalizado)
+
+        Returns:
+            list: Pares (termo, peso); o próprio termo tem peso 1
+        """
+        vocabulario = self.vocabulario
+        i = bisect.bisect_left(vocabulario, termo)
+        termos = []
+
+        for candidato in vocabulario[i:i + self.expansoes]:
+            if not candidato.startswith(termo):
+                break
+            termos.append((candidato, 1.0 if candidato == termo else self.PESO_PREFIXO))
+
+        return termos
+
+    def pesquisar(self, consulta, limite=20):
+        """
+        Mensagens que contêm todos os termos da consulta, por relevância
+
+        Cada termo da consulta também casa por prefixo ("dist" acha
+        "distribuido"). Os grupos são processados do menor para o
+        maior: o primeiro define os candidatos e os seguintes só os
+        filtram, com bisect quando a posting list é bem maior.
+
+        Args:
+            consulta: Texto da consulta
+            limite: Máximo de resultados
+
+        Returns:
+            list: Pares (relevância, seq), da mais relevante para a menos
+        """
+        termos = list(dict.fromkeys(tokenizar(consulta)))
+        if not termos or not self.documentos:
+            return []
+
+        grupos = []
+        for termo in termos:
+            grupo = self.expandir(termo)
+            if not grupo:
+                return []
+            tamanho = sum(len(self.postings[t]) for t, _ in grupo)
+            grupos.append((tamanho, grupo))
+        grupos.sort(key=lambda g: g[0])
+
+        if len(grupos) == 1:
+            return self._mais_recentes(grupos[0][1], limite)
+
+        pontos = None
+        for tamanho, grupo in grupos:
+            if pontos is None or tamanho <= len(pontos) * 8:
+                parcial = self._pontuar_listas(grupo)
+                if pontos is None:
+                    pontos = parcial
+                else:
+                    pontos = {s: p + parcial[s] for s, p in pontos.items() if s in parcial}
+            else:
+                pontos = self._pontuar_candidatos(grupo, pontos)
+
+            if not pontos:
+                return []
+
+        return heapq.nlargest(limite, ((p, s) for s, p in pontos.items()))
+
+    def _peso(self, termo, fator):
+        """IDF (BM25) do termo multiplicado pelo fator do prefixo"""
+        df = len(self.postings[termo])
+        return fator * math.log(1 + (self.documentos - df + 0.5) / (df + 0.5))
+
+    def _relevancia(self, peso, tf):
+        """Contribuição de um termo com frequência tf"""
+        return peso * tf * (self.K1 + 1) / (tf + self.K1)
+
+    def _pontuar_listas(self, grupo):
+        """Percorre as posting lists do grupo: {seq: relevância}"""
+        pontos = {}
+
+        for termo, fator in grupo:
+            lista = self.postings[termo]
+            frequencias = collections.Counter(lista.itens[lista.inicio:])
+
+            # A relevância só depende de tf: calcula uma vez por valor
+            peso = self._peso(termo, fator)
+            valores = {tf: self._relevancia(peso, tf) for tf in set(frequencias.values())}
+
+            if not pontos:
+                pontos = {seq: valores[tf] for seq, tf in frequencias.items()}
+                continue
+            for seq, tf in frequencias.items():
+                valor = valores[tf]
+                if valor > pontos.get(seq, 0.0):
+                    pontos[seq] = valor
+
+        return pontos
+
+    def _mais_recentes(self, grupo, limite):
+        """
+        Melhores resultados de uma consulta de um termo: O(limite + r)
+
+        Fora das r mensagens em repetidos a relevância de cada termo é
+        fixa, então basta percorrer as posting lists do fim (mais
+        recentes) para o início, do maior nível de relevância para o
+        menor. Cada mensagem sai no primeiro nível em que aparece, que
+        é o da sua maior relevância no grupo.
+        """
+        niveis = {}  # relevância -> (posting lists, seqs com tf > 1)
+        for termo, fator in grupo:
+            peso = self._peso(termo, fator)
+            niveis.setdefault(self._relevancia(peso, 1), ([], []))[0].append(self.postings[termo])
+            for seq, tf in self.repetidos.get(termo, {}).items():
+                niveis.setdefault(self._relevancia(peso, tf), ([], []))[1].append(seq)
+
+        resultado = []
+        vistos = set()
+
+        for valor in sorted(niveis, reverse=True):
+            listas, avulsas = niveis[valor]
+            caudas = [self._do_fim(lista) for lista in listas]
+            caudas.append(sorted(avulsas, reverse=True))
+            for seq in heapq.merge(*caudas, reverse=True):
+                if seq in vistos:
+                    continue
+                vistos.add(seq)
+                resultado.append((valor, seq))
+                if len(resultado) >= limite:
+                    return resultado
+
+        return resultado
+
+    @staticmethod
+    def _do_fim(lista):
+        """Itera uma _ListaJanela da maior sequência para a menor"""
+        itens = lista.itens
+        for i in range(len(itens) - 1, lista.inicio - 1, -1):
+            yield itens[i]
+
+    def _pontuar_candidatos(self, grupo, candidatos):
+        """Confere cada candidato nas listas do grupo com bisect"""
+        pesos = [(self.postings[t], self._peso(t, f)) for t, f in grupo]
+        pontos = {}
+
+        for seq, atual in candidatos.items():
+            melhor = 0.0
+            for lista, peso in pesos:
+                tf = lista.contar(seq)
+                if tf:
+                    melhor = max(melhor, self._relevancia(peso, tf))
+            if melhor:
+                pontos[seq] = atual + melhor
+
+        return pontos
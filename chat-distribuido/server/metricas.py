@@ -0,0 +1,441 @@
+"""
+Métricas do servidor: latência por RPC, espera em locks e taxas de mensagens
+Expostas por obter_metricas e em texto no formato Prometheus via HTTP
+"""
+
+import functools
+import inspect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+
+from common.histograma import HistogramaLog
+
+PERCENTIS = (50, 95, 99)
+JANELAS = (1, 10, 60)  # segundos das taxas de ingresso/egresso
+_LOTE = 64  # chamadas anotadas por thread antes de irem para os histogramas
+
+
+class _PorThread(threading.local):
+    espera = 0.0      # segundos esperando LockMedido, acumulado pela thread
+    pendentes = None  # chamadas medidas ainda não registradas
+
+
+_local = _PorThread()
+_pendentes = []  # (Thread, lista de pendentes) de cada thread que mediu
+_lock_pendentes = threading.Lock()
+
+
+def _nova_lista_pendentes():
+    """Cria (e publica) a lista de chamadas pendentes da thread atual"""
+    lista = _local.pendentes = []
+    with _lock_pendentes:
+        _pendentes.append((threading.current_thread(), lista))
+    return lista
+
+
+def _descarregar(thread, lista):
+    """
+    Registra e esvazia uma lista de chamadas pendentes
+
+    Chamado pela thread dona a cada _LOTE chamadas (o histograma é
+    atualizado em sequência, com cache quente, em vez de a cada RPC) e
+    por por_metodo para as demais. As chamadas vão para os contadores
+    da thread dona, qualquer que seja a thread que descarrega; o lock
+    evita que a mesma chamada seja contada duas vezes.
+
+    Args:
+        thread: Thread dona da lista
+        lista: Chamadas pendentes dessa thread
+    """
+    with _lock_pendentes:
+        # A dona pode acrescentar ao final enquanto outra thread descarrega
+        quantidade = len(lista)
+        for i in range(quantidade):
+            metricas, nome, duracao, espera, erro, recusa = lista[i]
+            metricas.registrar(thread, nome, duracao, espera, erro, recusa)
+        del lista[:quantidade]
+
+
+class EstatisticaMetodo:
+    """Contadores e histograma de um método (por thread)"""
+
+    __slots__ = ("chamadas", "erros", "recusas", "espera_lock", "latencia")
+
+    def __init__(self):
+        self.chamadas = 0
+        self.erros = 0          # exceções
+        self.recusas = 0        # respostas (False, motivo)
+        self.espera_lock = 0.0  # segundos esperando locks do servidor
+        self.latencia = HistogramaLog()
+
+    def mesclar(self, outra):
+        """Soma outra estatística do mesmo método a esta"""
+        self.chamadas += outra.chamadas
+        self.erros += outra.erros
+        self.recusas += outra.recusas
+        self.espera_lock += outra.espera_lock
+        self.latencia.mesclar(outra.latencia)
+
+
+class JanelaTaxa:
+    """
+    Contador de eventos por segundo nas últimas JANELAS
+
+    Guarda um balde por segundo em um anel do tamanho da maior janela;
+    baldes de segundos antigos são zerados quando reaproveitados.
+    """
+
+    def __init__(self, segundos=max(JANELAS)):
+        self.segundos = segundos
+        self.baldes = [0] * segundos
+        self.marcas = [0] * segundos  # segundo a que cada balde se refere
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def registrar(self, quantidade=1, agora=None):
+        """
+        Conta eventos no segundo atual
+
+        Args:
+            quantidade: Número de eventos
+            agora: Horário (usa time.time() se None)
+        """
+        segundo = int(time.time() if agora is None else agora)
+        i = segundo % self.segundos
+        with self.lock:
+            if self.marcas[i] != segundo:
+                self.marcas[i] = segundo
+                self.baldes[i] = 0
+            self.baldes[i] += quantidade
+            self.total += quantidade
+
+    def taxa(self, janela, agora=None):
+        """
+        Eventos por segundo nos últimos `janela` segundos completos
+
+        Args:
+            janela: Tamanho da janela em segundos (até self.segundos)
+            agora: Horário (usa time.time() se None)
+
+        Returns:
+            float: Média de eventos por segundo
+        """
+        atual = int(time.time() if agora is None else agora)
+        soma = 0
+        for segundo in range(atual - janela, atual):
+            i = segundo % self.segundos
+            if self.marcas[i] == segundo:
+                soma += self.baldes[i]
+        return soma / janela
+
+
+class LockMedido:
+    """
+    threading.Lock que mede o tempo de espera quando há disputa
+
+    Sem disputa custa só uma tentativa não bloqueante a mais; com
+    disputa a espera é somada à thread atual e atribuída ao método RPC
+    em andamento.
+    """
+
+    __slots__ = ("_lock",)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def acquire(self, blocking=True, timeout=-1):
+        if self._lock.acquire(False):
+            return True
+        if not blocking:
+            return False
+        return self._esperar(timeout)
+
+    def _esperar(self, timeout=-1):
+        inicio = perf_counter()
+        obtido = self._lock.acquire(True, timeout)
+        _local.espera += perf_counter() - inicio
+        return obtido
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    def __enter__(self):
+        if not self._lock.acquire(False):
+            self._esperar()
+        return self
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+
+class MetricasRPC:
+    """
+    Métricas de todos os métodos remotos
+
+    Cada thread tem seus próprios contadores, atualizados em lotes de
+    _LOTE chamadas anotadas pelo decorador medido (sem lock compartilhado
+    a cada RPC); obter() descarrega os lotes incompletos, cada um nos
+    contadores da thread que fez as chamadas, e mescla as threads. As
+    de threads que terminaram são incorporadas a um acumulado e
+    descartadas.
+
+    Attributes:
+        ingresso (JanelaTaxa): Mensagens recebidas de clientes
+        egresso (JanelaTaxa): Mensagens entregues (polling e push)
+        threads (dict): Thread -> {metodo: EstatisticaMetodo}
+    """
+
+    def __init__(self):
+        self.inicio = time.time()
+        self.ingresso = JanelaTaxa()
+        self.egresso = JanelaTaxa()
+        self.threads = {}      # alterado só com _lock_pendentes
+        self.encerradas = {}   # metodo -> EstatisticaMetodo de threads mortas
+
+    def registrar(self, thread, nome, duracao, espera=0.0, erro=False, recusa=False):
+        """
+        Registra uma chamada (usado ao descarregar os lotes de medido,
+        com _lock_pendentes)
+
+        Args:
+            thread: Thread que fez a chamada
+            nome: Nome do método
+            duracao: Segundos da chamada
+            espera: Segundos esperando locks durante a chamada
+            erro: Se levantou exceção
+            recusa: Se respondeu (False, motivo)
+        """
+        try:
+            estatistica = self.threads[thread][nome]
+        except KeyError:
+            estatistica = self.threads.setdefault(thread, {})[nome] = EstatisticaMetodo()
+
+        estatistica.chamadas += 1
+        if espera:
+            estatistica.espera_lock += espera
+        if erro:
+            estatistica.erros += 1
+        elif recusa:
+            estatistica.recusas += 1
+
+        estatistica.latencia.registrar(duracao)
+
+    def por_metodo(self):
+        """
+        Mescla os contadores de todas as threads
+
+        Returns:
+            dict: metodo -> EstatisticaMetodo
+        """
+        with _lock_pendentes:
+            listas = [(thread, lista) for thread, lista in _pendentes if lista]
+            _pendentes[:] = [(t, lista) for t, lista in _pendentes if t.is_alive()]
+        for thread, lista in listas:
+            _descarregar(thread, lista)
+
+        with _lock_pendentes:
+            for thread in [t for t in self.threads if not t.is_alive()]:
+                self._acumular(self.encerradas, self.threads.pop(thread))
+
+            total = {}
+            self._acumular(total, self.encerradas)
+            for metodos in self.threads.values():
+                self._acumular(total, metodos)
+
+        return total
+
+    @staticmethod
+    def _acumular(destino, origem):
+        for nome, estatistica in origem.items():
+            if nome not in destino:
+                destino[nome] = EstatisticaMetodo()
+            destino[nome].mesclar(estatistica)
+
+    def obter(self):
+        """
+        Resumo das métricas (retorno de obter_metricas)
+
+        Returns:
+            dict: {"rpc": {metodo: {...}}, "ingresso": {...},
+            "egresso": {...}, "uptime_segundos"}; tempos em ms
+        """
+        rpc = {}
+        for nome, e in sorted(self.por_metodo().items()):
+            resumo = {
+                "chamadas": e.chamadas,
+                "erros": e.erros,
+                "recusas": e.recusas,
+                "media_ms": e.latencia.soma / e.chamadas * 1000 if e.chamadas else 0.0,
+                "espera_lock_ms": e.espera_lock * 1000,
+            }
+            for p in PERCENTIS:
+                resumo[f"p{p}_ms"] = e.latencia.percentil(p) * 1000
+            rpc[nome] = resumo
+
+        agora = time.time()
+        return {
+            "rpc": rpc,
+            "ingresso": self._taxas(self.ingresso, agora),
+            "egresso": self._taxas(self.egresso, agora),
+            "uptime_segundos": agora - self.inicio,
+        }
+
+    @staticmethod
+    def _taxas(janela, agora):
+        taxas = {f"{s}s": janela.taxa(s, agora) for s in JANELAS}
+        taxas["total"] = janela.total
+        return taxas
+
+    def prometheus(self, extras=None):
+        """
+        Métricas no formato de texto do Prometheus
+
+        Args:
+            extras: {nome: valor} de gauges adicionais (ex.: usuários online)
+
+        Returns:
+            str: Exposição em texto (versão 0.0.4)
+        """
+        linhas = []
+
+        def metrica(nome, tipo, ajuda, amostras):
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+            for rotulos, valor in amostras:
+                linhas.append(f"{nome}{rotulos} {valor}")
+
+        estatisticas = sorted(self.por_metodo().items())
+
+        def rotulo(nome):
+            return f'{{metodo="{nome}"}}'
+
+        metrica("chat_rpc_chamadas_total", "counter", "Chamadas por método remoto",
+                [(rotulo(n), e.chamadas) for n, e in estatisticas])
+        metrica("chat_rpc_erros_total", "counter", "Chamadas que levantaram exceção",
+                [(rotulo(n), e.erros) for n, e in estatisticas])
+        metrica("chat_rpc_recusas_total", "counter", "Chamadas recusadas (False, motivo)",
+                [(rotulo(n), e.recusas) for n, e in estatisticas])
+        metrica("chat_rpc_espera_lock_segundos_total", "counter",
+                "Tempo esperando locks do servidor",
+                [(rotulo(n), repr(e.espera_lock)) for n, e in estatisticas])
+
+        amostras = []
+        for nome, e in estatisticas:
+            for p in PERCENTIS:
+                amostras.append((f'{{metodo="{nome}",quantile="{p / 100}"}}',
+                                 repr(e.latencia.percentil(p))))
+        linhas.append("# HELP chat_rpc_duracao_segundos Latência por método remoto")
+        linhas.append("# TYPE chat_rpc_duracao_segundos summary")
+        for rotulos, valor in amostras:
+            linhas.append(f"chat_rpc_duracao_segundos{rotulos} {valor}")
+        for nome, e in estatisticas:
+            linhas.append(f"chat_rpc_duracao_segundos_sum{rotulo(nome)} {e.latencia.soma!r}")
+            linhas.append(f"chat_rpc_duracao_segundos_count{rotulo(nome)} {e.latencia.total}")
+
+        agora = time.time()
+        for direcao, janela in (("ingresso", self.ingresso), ("egresso", self.egresso)):
+            metrica(f"chat_mensagens_{direcao}_total", "counter", f"Mensagens ({direcao})",
+                    [("", janela.total)])
+            metrica(f"chat_mensagens_{direcao}_por_segundo", "gauge",
+                    f"Taxa de mensagens ({direcao}) na janela",
+                    [(f'{{janela="{s}s"}}', repr(janela.taxa(s, agora))) for s in JANELAS])
+
+        for nome, valor in (extras or {}).items():
+            metrica(nome, "gauge", nome.replace("_", " "), [("", valor)])
+
+        return "\n".join(linhas) + "\n"
+
+
+def medido(funcao):
+    """
+    Decora método de ChatServer para registrar suas métricas
+
+    Sem self.metricas (métricas desligadas) chama a função direto.
+    """
+    nome = funcao.__name__
+
+    @functools.wraps(funcao)
+    def medida(self, *args, **kwargs):
+        metricas = self.metricas
+        if metricas is None:
+            return funcao(self, *args, **kwargs)
+
+        local = _local
+        espera = local.espera
+        inicio = perf_counter()
+        try:
+            resultado = funcao(self, *args, **kwargs)
+        except BaseException:
+            erro, recusa = True, False
+            raise
+        else:
+            erro = False
+            recusa = type(resultado) is tuple and len(resultado) == 2 and resultado[0] is False
+            return resultado
+        finally:
+            # Só anota; o registro nos histogramas é feito em lote
+            pendentes = local.pendentes
+            if pendentes is None:
+                pendentes = _nova_lista_pendentes()
+            pendentes.append((metricas, nome, perf_counter() - inicio,
+                              local.espera - espera, erro, recusa))
+            if len(pendentes) >= _LOTE:
+                _descarregar(threading.current_thread(), pendentes)
+
+    return medida
+
+
+def instrumentar(cls):
+    """
+    Decorador de classe: mede todos os métodos públicos
+
+    Deve ficar abaixo de @Pyro4.expose (aplicado antes), para que o
+    Pyro4 exponha os métodos já medidos.
+    """
+    for nome, valor in list(vars(cls).items()):
+        if not nome.startswith("_") and inspect.isfunction(valor):
+            setattr(cls, nome, medido(valor))
+    return cls
+
+
+class _Exposicao(BaseHTTPRequestHandler):
+    """GET /metrics devolve o texto do Prometheus"""
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+
+        corpo = self.server.gerar().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass  # sem log por requisição
+
+
+def servir_http(gerar, host, porta):
+    """
+    Inicia o endpoint HTTP de métricas em uma thread daemon
+
+    Args:
+        gerar: Função sem argumentos que devolve o texto
+        host: Endereço (use localhost para não expor a rede)
+        porta: Porta TCP
+
+    Returns:
+        ThreadingHTTPServer: Servidor iniciado (shutdown() para parar)
+    """
+    servidor = ThreadingHTTPServer((host, porta), _Exposicao)
+    servidor.daemon_threads = True
+    servidor.gerar = gerar
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
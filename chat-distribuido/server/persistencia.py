@@ -0,0 +1,541 @@
+"""
+Log de mensagens em disco (append-only, segmentado)
+Permite reconstruir o histórico após reiniciar o servidor
+
+Cada segmento é um arquivo JSON lines numerado em ordem de criação
+(ex.: 00000000000000000001.log). Níveis de durabilidade:
+
+- "os":    cada registro vai para o sistema operacional (sobrevive à
+           queda do processo, não à da máquina)
+- "batch": registros ficam no buffer do processo; uma thread faz
+           flush + fsync a cada LOG_FSYNC_INTERVAL (pode perder o
+           último intervalo)
+- "sync":  o envio só é confirmado após fsync; escritores simultâneos
+           compartilham o mesmo fsync (group commit)
+
+Segmentos antigos são apagados ao girar, além de LOG_MAX_SEGMENTS ou
+de LOG_MAX_AGE segundos.
+
+Ao girar, o segmento fechado ganha um índice (mesmo número, extensão
+.idx) com a menor e a maior sequência de cada sala nele: leituras de
+uma sala pulam os segmentos que não a têm ou que ficaram para trás.
+"""
+
+import json
+import mmap
+import os
+import threading
+import time
+
+from config.settings import (
+    SALA_PADRAO,
+    LOG_DIR,
+    LOG_SEGMENT_SIZE,
+    LOG_DURABILITY,
+    LOG_FSYNC_INTERVAL,
+    LOG_MAX_SEGMENTS,
+    LOG_MAX_AGE,
+)
+
+from common.models import Mensagem
+
+DURABILIDADES = ("os", "batch", "sync")
+EXTENSAO = ".log"
+EXTENSAO_INDICE = ".idx"
+CHAVE_SALA = b',"sala":"'
+
+
+def _nome_segmento(numero):
+    return f"{numero:020d}{EXTENSAO}"
+
+
+def codificar_registro(msg):
+    """
+    Codifica mensagem como uma linha do log
+
+    Args:
+        msg: Objeto Mensagem (com seq)
+
+    Returns:
+        bytes: Linha terminada em \\n
+    """
+    registro = {
+        "seq": msg.seq,
+        "remetente": msg.remetente,
+        "conteudo": msg.conteudo,
+        "ts": msg.ts,
+        "tipo": msg.tipo,
+        "sala": msg.sala,
+    }
+    return json.dumps(registro, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+
+
+def sala_do_registro(linha):
+    """
+    Sala de uma linha do log sem decodificar o JSON
+
+    "sala" é a última chave (ver codificar_registro) e nomes de sala
+    não têm aspas; aspas do conteúdo chegam escapadas e não casam.
+
+    Args:
+        linha: bytes de um registro
+
+    Returns:
+        str: Nome da sala (SALA_PADRAO em registros anteriores às salas)
+    """
+    inicio = linha.rfind(CHAVE_SALA)
+    if inicio < 0:
+        return SALA_PADRAO
+    inicio += len(CHAVE_SALA)
+    return linha[inicio:linha.index(b'"', inicio)].decode()
+
+
+def seq_do_registro(linha):
+    """Sequência de uma linha do log ("seq" é a primeira chave)"""
+    if linha.startswith(b'{"seq":'):
+        return int(linha[7:linha.index(b",")])
+    return json.loads(linha)["seq"]
+
+
+def _caminho_indice(caminho):
+    return caminho[:-len(EXTENSAO)] + EXTENSAO_INDICE
+
+
+def indexar_segmento(caminho):
+    """
+    Menor e maior sequência de cada sala em um segmento (varre o arquivo)
+
+    Args:
+        caminho: Arquivo do segmento
+
+    Returns:
+        dict: sala -> [menor seq, maior seq]
+    """
+    indice = {}
+    with open(caminho, "rb") as f:
+        for linha in f:
+            if not linha.endswith(b"\n"):
+                break  # registro sendo escrito
+            _indexar(indice, sala_do_registro(linha), seq_do_registro(linha))
+    return indice
+
+
+def _indexar(indice, sala, seq):
+    faixa = indice.get(sala)
+    if faixa is None:
+        indice[sala] = [seq, seq]
+    elif seq < faixa[0]:
+        faixa[0] = seq
+    elif seq > faixa[1]:
+        faixa[1] = seq
+
+
+def decodificar_registro(linha):
+    """
+    Decodifica linha do log
+
+    Args:
+        linha: bytes sem o \\n final
+
+    Returns:
+        Mensagem: Mensagem com seq preenchido
+    """
+    d = json.loads(linha)
+    return Mensagem(
+        d["remetente"], d["conteudo"], d["ts"], d["tipo"], d["seq"],
+        d.get("sala", SALA_PADRAO)
+    )
+
+
+class LogMensagens:
+    """
+    Log append-only segmentado com fsync em lote
+
+    Attributes:
+        diretorio (str): Pasta dos segmentos
+        durabilidade (str): "os", "batch" ou "sync"
+        tamanho_segmento (int): Bytes a partir dos quais o segmento gira
+        max_segmentos (int): Segmentos mantidos, com o atual (0 = sem limite)
+        idade_maxima (float): Segundos desde a última escrita de um
+            segmento fechado até apagá-lo (0 = sem limite)
+    """
+
+    def __init__(
+        self,
+        diretorio=LOG_DIR,
+        durabilidade=LOG_DURABILITY,
+        tamanho_segmento=LOG_SEGMENT_SIZE,
+        intervalo_fsync=LOG_FSYNC_INTERVAL,
+        max_segmentos=LOG_MAX_SEGMENTS,
+        idade_maxima=LOG_MAX_AGE,
+    ):
+        """
+        Abre (ou cria) o log
+
+        Args:
+            diretorio: Pasta dos segmentos
+            durabilidade: "os", "batch" ou "sync"
+            tamanho_segmento: Tamanho máximo de cada segmento em bytes
+            intervalo_fsync: Intervalo do fsync em segundo plano ("batch")
+            max_segmentos: Segmentos mantidos (0 = sem limite)
+            idade_maxima: Idade máxima de segmento fechado (0 = sem limite)
+        """
+        if durabilidade not in DURABILIDADES:
+            raise ValueError(f"Durabilidade inválida: {durabilidade}")
+
+        self.diretorio = diretorio
+        self.durabilidade = durabilidade
+        self.tamanho_segmento = tamanho_segmento
+        self.intervalo_fsync = intervalo_fsync
+        self.max_segmentos = max_segmentos
+        self.idade_maxima = idade_maxima
+
+        os.makedirs(diretorio, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.arquivo = None
+        self.caminho = None  # segmento atual
+        self.tamanho = 0
+        self.numero_segmento = 0
+        self.indice_atual = {}  # sala -> [menor, maior seq] do segmento atual
+        self.indices = {}  # caminho -> índice dos segmentos fechados (cache)
+
+        # Group commit: registros escritos x registros já em fsync
+        self.escritos = 0
+        self.duraveis = 0
+        self.sincronizando = False
+        self.cond_fsync = threading.Condition(self.lock)
+
+        segmentos = self.segmentos()
+        if segmentos:
+            self._abrir(segmentos[-1])
+            self._aplicar_retencao()
+
+        if durabilidade == "batch":
+            threading.Thread(target=self._fsync_periodico, daemon=True).start()
+
+    def segmentos(self):
+        """
+        Lista segmentos em ordem
+
+        Returns:
+            list: Caminhos dos arquivos de segmento
+        """
+        nomes = sorted(n for n in os.listdir(self.diretorio) if n.endswith(EXTENSAO))
+        return [os.path.join(self.diretorio, n) for n in nomes]
+
+    def recuperar(self, limite):
+        """
+        Lê as últimas mensagens de cada sala (usado na inicialização)
+
+        Percorre os segmentos do fim para o começo via mmap, pulando
+        (pelo índice) os que só têm salas já completas. Uma sala quieta
+        pode estar só no primeiro segmento, e sem ela a sequência da
+        sala recomeçaria; só as linhas guardadas são decodificadas.
+
+        Args:
+            limite: Número máximo de mensagens por sala
+
+        Returns:
+            list: Objetos Mensagem agrupados por sala, em ordem de
+            sequência dentro de cada sala
+        """
+        por_sala = {}  # sala -> linhas, da mais recente para a mais antiga
+
+        for caminho in reversed(self.segmentos()):
+            indice = self._indice(caminho)
+            if indice is not None and all(len(por_sala.get(sala, ())) >= limite for sala in indice):
+                continue  # só salas que já têm o suficiente
+
+            try:
+                f = open(caminho, "rb")
+            except FileNotFoundError:
+                continue  # apagado pela retenção
+
+            with f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    continue
+
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    fim = m.rfind(b"\n")
+                    while fim > 0:
+                        inicio = m.rfind(b"\n", 0, fim) + 1
+                        linha = m[inicio:fim]
+                        linhas = por_sala.setdefault(sala_do_registro(linha), [])
+                        if len(linhas) < limite:
+                            linhas.append(linha)
+                        fim = inicio - 1
+
+        return [
+            decodificar_registro(l)
+            for linhas in por_sala.values()
+            for l in reversed(linhas)
+        ]
+
+    def ler(self, sala=None, desde_seq=0):
+        """
+        Percorre o log do início ao fim, um registro por vez
+
+        Lê os segmentos linha a linha (memória constante), então serve
+        para exportar históricos maiores que a memória. Com sala, os
+        segmentos sem mensagens dela posteriores a desde_seq são pulados
+        pelo índice, então continuar uma exportação não relê o log
+        desde o início. Registros ainda no buffer do processo
+        (durabilidade "batch") não aparecem.
+
+        Args:
+            sala: Só mensagens desta sala (None = todas)
+            desde_seq: Só mensagens com seq maior que este
+
+        Yields:
+            Mensagem: Mensagens na ordem em que foram gravadas
+        """
+        filtro = None
+        if sala is not None:
+            filtro = json.dumps({"sala": sala}, ensure_ascii=False, separators=(",", ":"))[1:-1].encode()
+
+        for caminho in self.segmentos():
+            indice = self._indice(caminho) if sala is not None else None
+            if indice is not None:
+                faixa = indice.get(sala)
+                if faixa is None or faixa[1] <= desde_seq:
+                    continue  # sem a sala ou só com sequências já lidas
+
+            try:
+                arquivo = open(caminho, "rb")
+            except FileNotFoundError:
+                continue  # removido durante a leitura
+
+            with arquivo:
+                for linha in arquivo:
+                    if not linha.endswith(b"\n"):
+                        break  # registro sendo escrito
+                    if filtro and filtro not in linha:
+                        continue
+
+                    msg = decodificar_registro(linha)
+                    if msg.seq > desde_seq and (sala is None or msg.sala == sala):
+                        yield msg
+
+    def anexar(self, msg):
+        """
+        Escreve mensagem no log (chamar na ordem das sequências da sala)
+
+        Args:
+            msg: Objeto Mensagem (com seq)
+
+        Returns:
+            int: Marca a ser passada para aguardar_duravel
+        """
+        dados = codificar_registro(msg)
+
+        with self.lock:
+            if self.arquivo is None or self.tamanho >= self.tamanho_segmento:
+                self._girar()
+
+            self.arquivo.write(dados)
+            if self.durabilidade != "batch":
+                self.arquivo.flush()
+            _indexar(self.indice_atual, msg.sala, msg.seq)
+            self.tamanho += len(dados)
+            self.escritos += 1
+            return self.escritos
+
+    def aguardar_duravel(self, marca):
+        """
+        Bloqueia até o registro estar em disco (só em "sync")
+
+        O primeiro escritor a chegar faz o fsync de todos os registros
+        escritos até então; os demais esperam por ele.
+
+        Args:
+            marca: Valor retornado por anexar
+        """
+        if self.durabilidade != "sync":
+            return
+
+        with self.lock:
+            while self.duraveis < marca:
+                if self.sincronizando:
+                    self.cond_fsync.wait()
+                    continue
+
+                self.sincronizando = True
+                alvo = self.escritos
+                self.arquivo.flush()
+                # Cópia do descritor: _girar pode fechar o original (e o
+                # número ser reutilizado) enquanto o fsync roda sem lock
+                fd = os.dup(self.arquivo.fileno())
+
+                self.lock.release()
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+                    self.lock.acquire()
+                    self.sincronizando = False
+                    self.cond_fsync.notify_all()
+
+                self.duraveis = max(self.duraveis, alvo)
+
+    def fechar(self):
+        """
+        Faz fsync e fecha o segmento atual, gravando o índice dele
+        (chamar ao encerrar o servidor)
+        """
+        with self.lock:
+            if self.arquivo:
+                self.arquivo.flush()
+                os.fsync(self.arquivo.fileno())
+                self.arquivo.close()
+                self.arquivo = None
+                self.duraveis = self.escritos
+                self.cond_fsync.notify_all()
+                self._gravar_indice(self.caminho, self.indice_atual)
+
+    def _abrir(self, caminho):
+        """Abre segmento existente para anexar, descartando linha incompleta"""
+        with open(caminho, "r+b") as f:
+            tamanho = os.fstat(f.fileno()).st_size
+            if tamanho:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    valido = m.rfind(b"\n") + 1
+                if valido != tamanho:
+                    f.truncate(valido)
+
+        self.arquivo = open(caminho, "ab")
+        self.caminho = caminho
+        self.tamanho = self.arquivo.tell()
+        self.numero_segmento = int(os.path.basename(caminho)[:-len(EXTENSAO)])
+        self.indice_atual = self._consumir_indice(caminho)
+
+    def _consumir_indice(self, caminho):
+        """
+        Índice do segmento reaberto: o gravado por fechar() ou, sem ele
+        (encerramento sem fechar), a varredura do segmento
+
+        O arquivo é apagado ao ser lido: o segmento volta a crescer, e
+        um .idx velho enganaria a próxima abertura se esta não fechar.
+        """
+        arquivo_indice = _caminho_indice(caminho)
+        try:
+            with open(arquivo_indice, encoding="utf-8") as f:
+                indice = json.load(f)
+        except (OSError, ValueError):
+            indice = None
+        try:
+            os.remove(arquivo_indice)
+        except OSError:
+            pass
+        self.indices.pop(caminho, None)
+        return indice if isinstance(indice, dict) else indexar_segmento(caminho)
+
+    def _girar(self):
+        """Fecha o segmento atual e abre um novo (chamar com self.lock)"""
+        if self.arquivo:
+            self.arquivo.flush()
+            os.fsync(self.arquivo.fileno())
+            self.arquivo.close()
+            self.duraveis = self.escritos
+            self._gravar_indice(self.caminho, self.indice_atual)
+
+        self.numero_segmento += 1
+        caminho = os.path.join(self.diretorio, _nome_segmento(self.numero_segmento))
+        self.arquivo = open(caminho, "ab")
+        self.caminho = caminho
+        self.tamanho = self.arquivo.tell()
+        self.indice_atual = {}
+        self._aplicar_retencao()
+
+    def _gravar_indice(self, caminho, indice):
+        """Grava o índice de um segmento fechado (temporário + rename)"""
+        self.indices[caminho] = indice
+        temporario = _caminho_indice(caminho) + ".tmp"
+        try:
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(indice, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(temporario, _caminho_indice(caminho))
+        except OSError:
+            pass  # sem o arquivo, o índice é refeito varrendo o segmento
+
+    def _indice(self, caminho):
+        """
+        Índice de um segmento: o atual vem da memória; os fechados do
+        cache, do arquivo .idx ou, na falta dele (log de uma versão
+        anterior), da varredura do segmento, que é gravada
+
+        Returns:
+            dict: sala -> [menor seq, maior seq], ou None se o segmento
+            sumiu (retenção)
+        """
+        with self.lock:
+            if caminho == self.caminho:
+                return {sala: list(faixa) for sala, faixa in self.indice_atual.items()}
+
+        indice = self.indices.get(caminho)
+        if indice is not None:
+            return indice
+
+        try:
+            with open(_caminho_indice(caminho), encoding="utf-8") as f:
+                indice = json.load(f)
+        except (OSError, ValueError):
+            try:
+                indice = indexar_segmento(caminho)
+            except FileNotFoundError:
+                return None
+            self._gravar_indice(caminho, indice)
+            return indice
+
+        self.indices[caminho] = indice
+        return indice
+
+    def _aplicar_retencao(self):
+        """
+        Apaga os segmentos fechados mais antigos além de max_segmentos
+        ou de idade_maxima (chamar com self.lock; o atual fica sempre)
+
+        Leitores com o arquivo já aberto (ler) continuam lendo; os que
+        ainda não abriram pulam o segmento.
+        """
+        fechados = self.segmentos()[:-1]
+        excesso = len(fechados) + 1 - self.max_segmentos if self.max_segmentos else 0
+        limite = time.time() - self.idade_maxima if self.idade_maxima else None
+
+        for i, caminho in enumerate(fechados):
+            try:
+                if i < excesso or (limite is not None and os.path.getmtime(caminho) < limite):
+                    os.remove(caminho)
+                else:
+                    break  # os seguintes são mais novos
+            except FileNotFoundError:
+                pass
+
+            self.indices.pop(caminho, None)
+            try:
+                os.remove(_caminho_indice(caminho))
+            except FileNotFoundError:
+                pass
+
+    def _fsync_periodico(self):
+        """Thread de fsync em lote (durabilidade "batch")"""
+        while True:
+            time.sleep(self.intervalo_fsync)
+
+            with self.lock:
+                if self.arquivo is None or self.duraveis == self.escritos:
+                    continue
+                alvo = self.escritos
+                self.arquivo.flush()
+                fd = os.dup(self.arquivo.fileno())  # ver aguardar_duravel
+
+            try:
+                os.fsync(fd)
+            except OSError as e:
+                print(f"⚠️  fsync do log falhou: {e}")
+                continue
+            finally:
+                os.close(fd)
+
+            with self.lock:
+                self.duraveis = max(self.duraveis, alvo)
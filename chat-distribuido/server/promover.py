@@ -0,0 +1,33 @@
+"""
+Promove manualmente a réplica de um servidor (ou shard) a primário
+
+Uso:
+    python -m server.promover             # réplica de chat.server
+    python -m server.promover --shard N   # réplica do shard N
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Pyro4
+
+from config.settings import CHAT_SERVER_NAME, SHARD_NAME_PREFIX, REPLICA_NAME_PREFIX
+
+
+def main():
+    nome = CHAT_SERVER_NAME
+    if "--shard" in sys.argv:
+        nome = f"{SHARD_NAME_PREFIX}{sys.argv[sys.argv.index('--shard') + 1]}"
+
+    uri = Pyro4.locateNS().lookup(REPLICA_NAME_PREFIX + nome)
+    with Pyro4.Proxy(uri) as replica:
+        sucesso, mensagem = replica.promover()
+
+    print(mensagem)
+    sys.exit(0 if sucesso else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Entrega de mensagens por push (callbacks Pyro4)
+Distribui novas mensagens aos assinantes a partir de um pool de threads
+"""
+
+import Pyro4
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from config.settings import (
+    PUSH_DISPATCHER_THREADS,
+    PUSH_CALL_TIMEOUT,
+    PUSH_MAX_FAILURES,
+    PUSH_MAX_QUEUE,
+    PUSH_RETRY_DELAY,
+)
+
+from common.rastreio import carimbar
+
+
+class Assinante:
+    """
+    Cliente inscrito para receber mensagens por push
+
+    Attributes:
+        nome (str): Nome do usuário
+        proxy (Pyro4.Proxy): Proxy para o objeto de callback do cliente
+        fila (deque): Lotes aguardando entrega
+        agendado (bool): Se já existe tarefa de entrega no pool
+        falhas (int): Falhas consecutivas de entrega
+        removido (bool): Saiu do despachante; o proxy é liberado por
+            quem estiver com ele (a tarefa de entrega, se agendada)
+    """
+
+    def __init__(self, nome, uri):
+        self.nome = nome
+        self.proxy = Pyro4.Proxy(uri)
+        self.proxy._pyroTimeout = PUSH_CALL_TIMEOUT
+        self.fila = deque()
+        self.agendado = False
+        self.falhas = 0
+        self.removido = False
+
+    def liberar(self):
+        """Fecha a conexão com o callback do cliente, ignorando erros"""
+        try:
+            self.proxy._pyroRelease()
+        except Exception:
+            pass
+
+
+class DespachantePush:
+    """
+    Distribui mensagens aos assinantes
+
+    Cada assinante tem sua própria fila; no máximo uma tarefa de entrega
+    por assinante roda no pool, o que preserva a ordem das mensagens.
+    Assinantes lentos (fila cheia) ou mortos (falhas consecutivas) são
+    removidos e voltam ao modo polling. Uma entrega que falhou é repetida
+    após PUSH_RETRY_DELAY, dobrando a cada falha, sem ocupar o pool.
+    """
+
+    def __init__(self, max_threads=PUSH_DISPATCHER_THREADS, ao_entregar=None, rastrear=False):
+        """
+        Cria despachante
+
+        Args:
+            max_threads: Tamanho do pool de entrega
+            ao_entregar: Chamada com o número de mensagens de cada lote
+                entregue (ex.: métricas de egresso)
+            rastrear: Carimba o despacho das mensagens rastreadas
+                (ver common.rastreio)
+        """
+        self.ao_entregar = ao_entregar
+        self.rastrear = rastrear
+        self.assinantes = {}  # nome -> Assinante
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(
+            max_workers=max_threads,
+            thread_name_prefix="push"
+        )
+
+    def inscrever(self, nome, uri, pendentes=None):
+        """
+        Inscreve usuário para receber push
+
+        Args:
+            nome: Nome do usuário
+            uri: URI do objeto de callback do cliente
+            pendentes: Mensagens que o cliente ainda não recebeu
+        """
+        assinante = Assinante(nome, uri)
+        if pendentes:
+            assinante.fila.append(pendentes)
+
+        with self.lock:
+            anterior = self.assinantes.get(nome)
+            self.assinantes[nome] = assinante
+            if pendentes:
+                assinante.agendado = True
+            liberar = anterior is not None and self._remover(anterior)
+
+        if liberar:
+            anterior.liberar()
+        if pendentes:
+            self.pool.submit(self._entregar, assinante)
+
+    def cancelar(self, nome):
+        """
+        Remove assinatura (usuário volta ao polling)
+
+        Args:
+            nome: Nome do usuário
+        """
+        with self.lock:
+            assinante = self.assinantes.pop(nome, None)
+            liberar = assinante is not None and self._remover(assinante)
+
+        if liberar:
+            assinante.liberar()
+
+    def inscrito(self, nome):
+        """
+        Verifica se usuário está em modo push
+
+        Args:
+            nome: Nome do usuário
+
+        Returns:
+            bool: True se inscrito
+        """
+        with self.lock:
+            return nome in self.assinantes
+
+    def publicar(self, mensagens, destinatarios=None):
+        """
+        Enfileira lote para os assinantes
+
+        Deve ser chamado na mesma ordem em que as mensagens são
+        armazenadas, para que cada assinante as receba em ordem.
+
+        Args:
+            mensagens: Lista de dicionários com mensagens
+            destinatarios: Nomes que devem receber (None = todos)
+        """
+        agendar = []
+        lentos = []
+
+        with self.lock:
+            if destinatarios is None:
+                alvos = list(self.assinantes.items())
+            elif len(destinatarios) < len(self.assinantes):
+                alvos = [
+                    (nome, self.assinantes[nome]) for nome in destinatarios
+                    if nome in self.assinantes
+                ]
+            else:
+                alvos = [
+                    (nome, assinante) for nome, assinante in self.assinantes.items()
+                    if nome in destinatarios
+                ]
+
+            for nome, assinante in alvos:
+                if len(assinante.fila) >= PUSH_MAX_QUEUE:
+                    # Assinante lento: volta ao polling
+                    del self.assinantes[nome]
+                    if self._remover(assinante):
+                        lentos.append(assinante)
+                    print(f"[PUSH] '{nome}' lento, voltando ao polling")
+                    continue
+
+                assinante.fila.append(mensagens)
+                if not assinante.agendado:
+                    assinante.agendado = True
+                    agendar.append(assinante)
+
+        for assinante in lentos:
+            assinante.liberar()
+        for assinante in agendar:
+            self.pool.submit(self._entregar, assinante)
+
+    def encerrar(self):
+        """Encerra pool de entrega"""
+        self.pool.shutdown(wait=False)
+
+    @staticmethod
+    def _remover(assinante):
+        """
+        Marca assinante já retirado de self.assinantes (com self.lock)
+
+        Returns:
+            bool: True se quem chamou deve liberar o proxy; com entrega
+            agendada, quem libera é a tarefa de entrega (liberar daqui
+            esperaria a chamada em andamento no proxy)
+        """
+        assinante.removido = True
+        return not assinante.agendado
+
+    def _agendar(self, assinante):
+        """Devolve o assinante ao pool (fim da espera após uma falha)"""
+        try:
+            self.pool.submit(self._entregar, assinante)
+        except RuntimeError:
+            assinante.liberar()  # despachante encerrado
+
+    def _entregar(self, assinante):
+        """Esvazia a fila de um assinante (roda no pool)"""
+        while True:
+            with self.lock:
+                if assinante.removido or not assinante.fila:
+                    assinante.agendado = False
+                    removido = assinante.removido
+                    break
+
+                lote = []
+                while assinante.fila:
+                    lote.extend(assinante.fila.popleft())
+
+            if self.rastrear:
+                lote = carimbar(lote, "push")
+
+            try:
+                assinante.proxy.receber(lote)
+                assinante.falhas = 0
+                if self.ao_entregar:
+                    self.ao_entregar(len(lote))
+
+            except Exception as e:
+                assinante.falhas += 1
+
+                with self.lock:
+                    if assinante.falhas >= PUSH_MAX_FAILURES:
+                        # Assinante morto: o cliente recupera pelo polling
+                        if self.assinantes.get(assinante.nome) is assinante:
+                            del self.assinantes[assinante.nome]
+                        assinante.removido = True
+                        assinante.agendado = False
+                        removido = True
+                        print(f"[PUSH] '{assinante.nome}' removido: {e}")
+                        break
+                    else:
+                        assinante.fila.appendleft(lote)
+                        # Continua agendado: publicar() só enfileira
+                        espera = PUSH_RETRY_DELAY * 2 ** (assinante.falhas - 1)
+                        temporizador = threading.Timer(espera, self._agendar, (assinante,))
+                        temporizador.daemon = True
+                        temporizador.start()
+                        return
+
+        if removido:
+            assinante.liberar()
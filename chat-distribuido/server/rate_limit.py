@@ -0,0 +1,267 @@
+"""
+Limitadores de taxa (rate limiting)
+Todos são O(1) por verificação e guardam estado de tamanho fixo por chave
+"""
+
+import threading
+import time
+
+from config.settings import (
+    RATE_LIMIT_ALGORITHM,
+    RATE_LIMIT_PERIOD,
+    MAX_MESSAGES_PER_MINUTE,
+    GLOBAL_MAX_MESSAGES_PER_MINUTE,
+)
+
+CHAVE_GLOBAL = "*"
+
+
+class LimitadorTaxa:
+    """
+    Interface comum dos limitadores
+
+    Attributes:
+        limite (int): Eventos permitidos por período
+        periodo (float): Duração do período em segundos
+    """
+
+    def __init__(self, limite, periodo):
+        """
+        Cria limitador
+
+        Args:
+            limite: Eventos permitidos por período
+            periodo: Duração do período em segundos
+        """
+        self.limite = limite
+        self.periodo = periodo
+        self.estado = {}  # chave -> estado de tamanho fixo
+        self.lock = threading.Lock()
+
+    def permitir(self, chave, agora=None):
+        """
+        Consome uma unidade se houver disponível
+
+        Args:
+            chave: Identificador (ex.: nome do usuário)
+            agora: Horário atual (usa time.time() se None)
+
+        Returns:
+            bool: True se o evento é permitido
+        """
+        raise NotImplementedError
+
+    def devolver(self, chave):
+        """
+        Devolve unidade consumida (evento acabou não acontecendo)
+
+        Args:
+            chave: Identificador
+        """
+        raise NotImplementedError
+
+    def remover(self, chave):
+        """
+        Descarta o estado de uma chave
+
+        Args:
+            chave: Identificador
+        """
+        with self.lock:
+            self.estado.pop(chave, None)
+
+
+class SemLimite(LimitadorTaxa):
+    """Limitador que permite tudo"""
+
+    def __init__(self):
+        super().__init__(float("inf"), RATE_LIMIT_PERIOD)
+
+    def permitir(self, chave, agora=None):
+        return True
+
+    def devolver(self, chave):
+        pass
+
+
+class BaldeTokens(LimitadorTaxa):
+    """
+    Token bucket: o balde enche a limite/periodo tokens por segundo,
+    até no máximo limite tokens (permite rajadas curtas)
+    """
+
+    def __init__(self, limite, periodo):
+        super().__init__(limite, periodo)
+        self.taxa = limite / periodo
+
+    def permitir(self, chave, agora=None):
+        agora = time.time() if agora is None else agora
+
+        with self.lock:
+            balde = self.estado.get(chave)
+            if balde is None:
+                balde = self.estado[chave] = [float(self.limite), agora]
+
+            tokens = min(self.limite, balde[0] + (agora - balde[1]) * self.taxa)
+            balde[1] = agora
+
+            if tokens < 1:
+                balde[0] = tokens
+                return False
+
+            balde[0] = tokens - 1
+            return True
+
+    def devolver(self, chave):
+        with self.lock:
+            balde = self.estado.get(chave)
+            if balde is not None:
+                balde[0] = min(self.limite, balde[0] + 1)
+
+
+class JanelaDeslizante(LimitadorTaxa):
+    """
+    Sliding window counter: aproxima a janela deslizante ponderando a
+    contagem da janela fixa anterior pela fração ainda sobreposta
+    """
+
+    def permitir(self, chave, agora=None):
+        agora = time.time() if agora is None else agora
+        janela = int(agora // self.periodo)
+
+        with self.lock:
+            contador = self.estado.get(chave)
+            if contador is None:
+                contador = self.estado[chave] = [janela, 0, 0]
+
+            # [janela atual, contagem atual, contagem anterior]
+            if janela != contador[0]:
+                anterior = contador[1] if janela == contador[0] + 1 else 0
+                contador[0], contador[1], contador[2] = janela, 0, anterior
+
+            decorrido = (agora % self.periodo) / self.periodo
+            estimativa = contador[2] * (1 - decorrido) + contador[1]
+
+            if estimativa >= self.limite:
+                return False
+
+            contador[1] += 1
+            return True
+
+    def devolver(self, chave):
+        with self.lock:
+            contador = self.estado.get(chave)
+            if contador is not None and contador[1] > 0:
+                contador[1] -= 1
+
+
+class LimitadorComposto:
+    """
+    Combina limite por usuário e limite global
+
+    O limite por usuário é verificado primeiro; se o global recusar,
+    a unidade do usuário é devolvida.
+    """
+
+    def __init__(self, por_usuario, global_=None):
+        """
+        Cria limitador composto
+
+        Args:
+            por_usuario: Limitador aplicado a cada usuário
+            global_: Limitador aplicado a todas as mensagens (opcional)
+        """
+        self.por_usuario = por_usuario
+        self.global_ = global_
+
+    def permitir(self, usuario, agora=None):
+        """
+        Verifica os dois limites
+
+        Args:
+            usuario: Nome do usuário
+            agora: Horário atual (usa time.time() se None)
+
+        Returns:
+            tuple: (bool, str) - (permitido, motivo da recusa)
+        """
+        agora = time.time() if agora is None else agora
+
+        if not self.por_usuario.permitir(usuario, agora):
+            return False, "usuario"
+
+        if self.global_ and not self.global_.permitir(CHAVE_GLOBAL, agora):
+            self.por_usuario.devolver(usuario)
+            return False, "global"
+
+        return True, ""
+
+    def remover(self, usuario):
+        """Descarta o estado de um usuário"""
+        self.por_usuario.remover(usuario)
+
+
+ALGORITMOS = {
+    "token_bucket": BaldeTokens,
+    "sliding_window": JanelaDeslizante,
+}
+
+
+def criar_limitador(limite, periodo=RATE_LIMIT_PERIOD, algoritmo=RATE_LIMIT_ALGORITHM):
+    """
+    Cria limitador a partir do nome do algoritmo
+
+    Args:
+        limite: Eventos por período (0 ou None = sem limite)
+        periodo: Duração do período em segundos
+        algoritmo: "token_bucket" ou "sliding_window"
+
+    Returns:
+        LimitadorTaxa: Nova instância
+    """
+    if not limite:
+        return SemLimite()
+
+    if algoritmo not in ALGORITMOS:
+        raise ValueError(f"Algoritmo de rate limit desconhecido: {algoritmo}")
+
+    return ALGORITMOS[algoritmo](limite, periodo)
+
+
+def limite_por_periodo(por_minuto, periodo=RATE_LIMIT_PERIOD):
+    """
+    Converte um limite por minuto em eventos por período
+
+    A taxa continua a mesma; o período só muda o tamanho da rajada
+    (balde) ou da janela.
+
+    Args:
+        por_minuto: Eventos permitidos por minuto (0 ou None = sem limite)
+        periodo: Duração do período em segundos
+
+    Returns:
+        float: Eventos por período (no mínimo 1), ou 0 sem limite
+    """
+    if not por_minuto:
+        return 0
+    return max(1.0, por_minuto * periodo / 60)
+
+
+def criar_limitador_mensagens():
+    """
+    Cria limitador de mensagens conforme config/settings.py
+
+    Os limites são por minuto e aplicados em janelas de
+    RATE_LIMIT_PERIOD segundos.
+
+    Returns:
+        LimitadorComposto: Limites por usuário e global
+    """
+    global_ = None
+    if GLOBAL_MAX_MESSAGES_PER_MINUTE:
+        global_ = criar_limitador(limite_por_periodo(GLOBAL_MAX_MESSAGES_PER_MINUTE))
+
+    return LimitadorComposto(
+        criar_limitador(limite_por_periodo(MAX_MESSAGES_PER_MINUTE)),
+        global_
+    )
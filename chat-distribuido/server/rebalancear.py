@@ -0,0 +1,110 @@
+"""
+Rebalanceamento de salas entre shards
+
+Depois de adicionar um shard (ou antes de desligar um), move para o
+novo dono cada sala cujo dono no anel de hash consistente mudou.
+
+Uso:
+    python -m server.rebalancear                 # após adicionar shard
+    python -m server.rebalancear --sair NOME     # esvazia shard a desligar
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Pyro4
+
+from client.roteador import listar_shards
+from common.hashring import AnelConsistente
+
+
+def mover(sala, origem, destino):
+    """
+    Move uma sala entre dois shards
+
+    A origem só retira a sala depois que o destino a importou; se a
+    importação falhar, a origem volta a aceitá-la e o erro é repassado.
+
+    Args:
+        sala: Nome da sala
+        origem: Proxy do shard que tem a sala
+        destino: Proxy do novo dono
+
+    Raises:
+        RuntimeError: Se o destino ou a origem recusou
+    """
+    dados = origem.exportar_sala(sala)
+    if not isinstance(dados, dict):
+        raise RuntimeError(dados[1])  # réplica ou primário deposto
+    try:
+        sucesso, mensagem = destino.importar_sala(sala, dados)
+        if not sucesso:
+            raise RuntimeError(mensagem)
+    except Exception:
+        origem.reabrir_sala(sala)
+        raise
+
+    sucesso, mensagem = origem.retirar_sala(sala)
+    if not sucesso:
+        raise RuntimeError(mensagem)
+
+
+def rebalancear(shards, saindo=()):
+    """
+    Move as salas que estão fora do shard dono
+
+    Args:
+        shards: Nome -> URI dos shards ativos
+        saindo: Shards a esvaziar (continuam ativos até o fim da migração)
+
+    Returns:
+        list: Tuplas (sala, origem, destino) das salas movidas
+    """
+    anel = AnelConsistente(s for s in shards if s not in saindo)
+    if not len(anel):
+        raise ValueError("Nenhum shard de destino")
+
+    proxies = {nome: Pyro4.Proxy(uri) for nome, uri in shards.items()}
+    movidas = []
+
+    try:
+        for origem, proxy in sorted(proxies.items()):
+            for sala in proxy.listar_salas():
+                destino = anel.no_para(sala["nome"])
+                if destino == origem or not sala["mensagens"]:
+                    continue
+                mover(sala["nome"], proxy, proxies[destino])
+                movidas.append((sala["nome"], origem, destino))
+    finally:
+        for proxy in proxies.values():
+            proxy._pyroRelease()
+
+    return movidas
+
+
+def main():
+    saindo = []
+    if "--sair" in sys.argv:
+        saindo.append(sys.argv[sys.argv.index("--sair") + 1])
+
+    shards = listar_shards()
+
+    # Tira do Name Server antes de migrar: os clientes passam a rotear
+    # para os novos donos enquanto as salas são movidas
+    ns = Pyro4.locateNS()
+    for nome in saindo:
+        ns.remove(nome)
+
+    print(f"🧩 {len(shards)} shards: {', '.join(sorted(shards))}")
+
+    movidas = rebalancear(shards, saindo)
+    for sala, origem, destino in movidas:
+        print(f"  #{sala}: {origem} → {destino}")
+
+    print(f"✅ {len(movidas)} salas movidas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Replicação assíncrona primário -> réplica
+A réplica acompanha o fluxo de mensagens do primário por long-poll
+
+Cada primário tem uma época, registrada como metadado do seu nome no
+Name Server ("epoca:N"). A réplica promovida registra a época seguinte;
+um primário antigo que volta de uma partição vê a época maior e deixa
+de aceitar escritas (fencing), então nunca há dois primários.
+"""
+
+import threading
+import time
+
+import Pyro4
+
+from config.settings import (
+    REPLICATION_POLL_TIMEOUT,
+    REPLICA_FAILOVER_TIMEOUT,
+    REPLICA_AUTO_PROMOTE,
+)
+
+PREFIXO_EPOCA = "epoca:"
+
+
+def epoca_registrada(ns, nome):
+    """
+    URI e época registradas para um nome no Name Server
+
+    Args:
+        ns: Proxy do Name Server (passa a usar serpent)
+        nome: Nome do primário
+
+    Returns:
+        tuple: (uri, época); (None, 0) se o nome não está registrado
+    """
+    # marshal não serializa a resposta (URI + metadados): serpent, que
+    # todo Name Server aceita, só neste proxy
+    ns._pyroSerializer = "serpent"
+    try:
+        uri, metadados = ns.lookup(nome, return_metadata=True)
+    except Pyro4.errors.NamingError:
+        return None, 0
+    epocas = [int(m[len(PREFIXO_EPOCA):]) for m in metadados if m.startswith(PREFIXO_EPOCA)]
+    return uri, max(epocas, default=0)
+
+
+def registrar_primario(ns, nome, uri, epoca):
+    """Registra o primário com sua época (substitui o registro anterior)"""
+    ns.register(nome, uri, metadata={f"{PREFIXO_EPOCA}{epoca}"})
+
+
+def primario_ativo(uri, timeout=REPLICA_FAILOVER_TIMEOUT):
+    """
+    Verifica se o primário registrado responde
+
+    Args:
+        uri: URI registrada
+        timeout: Espera máxima em segundos
+
+    Returns:
+        bool: True se respondeu ao ping
+    """
+    try:
+        with Pyro4.Proxy(uri) as primario:
+            primario._pyroTimeout = timeout
+            return primario.ping()
+    except Exception:
+        return False
+
+
+class SeguidorPrimario:
+    """
+    Thread que copia mensagens e presença do primário para a réplica
+
+    Guarda a última sequência aplicada de cada sala, então uma falha de
+    rede só atrasa a cópia: a próxima chamada continua de onde parou.
+    Se o primário ficar inacessível por REPLICA_FAILOVER_TIMEOUT, a
+    réplica é promovida (com REPLICA_AUTO_PROMOTE).
+
+    Attributes:
+        nome_primario (str): Nome do primário no Name Server
+        atraso (float): Segundos desde a última resposta do primário
+    """
+
+    def __init__(self, servidor, nome_primario):
+        """
+        Args:
+            servidor: ChatServer réplica
+            nome_primario: Nome do primário no Name Server
+        """
+        self.servidor = servidor
+        self.nome_primario = nome_primario
+        self.ativo = True
+        self.ultima_resposta = time.time()
+
+        self.thread = threading.Thread(target=self._seguir, daemon=True)
+        self.thread.start()
+
+    @property
+    def atraso(self):
+        return time.time() - self.ultima_resposta
+
+    def parar(self):
+        """Para de seguir o primário (promoção)"""
+        self.ativo = False
+
+    def _conectar(self):
+        """Resolve o primário pelo Name Server (pode ter reiniciado)"""
+        uri = Pyro4.locateNS().lookup(self.nome_primario)
+        primario = Pyro4.Proxy(uri)
+        primario._pyroTimeout = REPLICATION_POLL_TIMEOUT + 5
+        return primario
+
+    def _seguir(self):
+        primario = None
+        versao = -1  # força o envio da presença na primeira chamada
+
+        while self.ativo:
+            try:
+                if primario is None:
+                    primario = self._conectar()
+
+                inicio = time.monotonic()
+                lote = primario.obter_replicacao(
+                    self.servidor._posicoes_replicadas(),
+                    versao,
+                    REPLICATION_POLL_TIMEOUT
+                )
+            except Exception as e:
+                if primario is not None:
+                    print(f"[RÉPLICA] Primário inacessível: {e}")
+                    primario._pyroRelease()
+                    primario = None
+
+                if REPLICA_AUTO_PROMOTE and self.atraso > REPLICA_FAILOVER_TIMEOUT:
+                    print("[RÉPLICA] Primário falhou, assumindo")
+                    self.servidor.promover()
+                    break
+
+                time.sleep(1)
+                continue
+
+            self.ultima_resposta = time.time()
+            if self.ativo:
+                versao = lote["versao"]
+                self.servidor._aplicar_replicacao(lote)
+
+            # Primário sem long-poll (multiplex) responde vazio na hora
+            if not lote["mensagens"] and time.monotonic() - inicio < 1:
+                time.sleep(1)
+
+        if primario is not None:
+            primario._pyroRelease()
@@ -0,0 +1,106 @@
+"""
+Salas de chat
+Cada sala tem histórico, membros e lock próprios
+"""
+
+import threading
+
+from config.settings import MAX_HISTORY_SIZE, CACHE_ENCODED_MESSAGES, INDEX_HISTORY, FULLTEXT_INDEX
+
+from server.historico import HistoricoCircular
+
+
+class Sala:
+    """
+    Sala de chat com histórico próprio
+
+    Attributes:
+        nome (str): Nome da sala
+        mensagens (HistoricoCircular): Histórico da sala
+        membros (set): Usuários que participam da sala
+        ouvintes (set): Eventos de long-poll esperando mensagens da sala
+        lock (threading.Lock): Protege escrita no histórico, membros e ouvintes
+    """
+
+    def __init__(self, nome, capacidade=MAX_HISTORY_SIZE, lock=None):
+        """
+        Cria sala vazia
+
+        Args:
+            nome: Nome da sala
+            capacidade: Tamanho do histórico
+            lock: Lock da sala (ex.: LockMedido); threading.Lock se None
+        """
+        self.nome = nome
+        self.mensagens = HistoricoCircular(
+            capacidade, congelar=CACHE_ENCODED_MESSAGES, indexar=INDEX_HISTORY,
+            indexar_texto=FULLTEXT_INDEX
+        )
+        self.membros = set()
+        self.ouvintes = set()
+        self.lock = threading.Lock() if lock is None else lock
+
+    def ouvir(self, evento):
+        """
+        Registra evento a ser sinalizado na próxima mensagem
+
+        Args:
+            evento: threading.Event
+        """
+        with self.lock:
+            self.ouvintes.add(evento)
+
+    def deixar_de_ouvir(self, evento):
+        """
+        Remove evento registrado com ouvir
+
+        Args:
+            evento: threading.Event
+        """
+        with self.lock:
+            self.ouvintes.discard(evento)
+
+    def acordar(self):
+        """Sinaliza os ouvintes (chamar com self.lock adquirido)"""
+        for evento in self.ouvintes:
+            evento.set()
+
+    def importar(self, mensagens):
+        """
+        Substitui o histórico por mensagens vindas de outro shard
+        (chamar com self.lock adquirido)
+
+        As mensagens importadas mantêm a sequência; as que já estavam
+        aqui (ex.: entradas de quem chegou antes da migração) vão para o
+        fim com sequência nova.
+
+        Args:
+            mensagens: Objetos Mensagem em ordem de sequência
+        """
+        atual = self.mensagens
+        locais = atual.ultimas(atual.capacidade)
+
+        historico = HistoricoCircular(
+            atual.capacidade, congelar=atual.congelar, indexar=atual.indexar,
+            indexar_texto=atual.indexar_texto
+        )
+        historico.restaurar(mensagens)
+        for msg in locais:
+            historico.adicionar(msg)
+
+        self.mensagens = historico
+        self.acordar()
+
+    def recomecar(self):
+        """
+        Descarta o histórico e recomeça as sequências do início
+        (chamar com self.lock adquirido)
+
+        Usado pela réplica quando o primário reinicia sem persistência.
+        """
+        atual = self.mensagens
+        self.mensagens = HistoricoCircular(
+            atual.capacidade, congelar=atual.congelar, indexar=atual.indexar,
+            indexar_texto=atual.indexar_texto
+        )
+        self.acordar()
@@ -1,23 +1,27 @@
-"""
-Script de inicialização do servidor
-"""
-
-import sys
-import os
-
-# Adiciona pasta raiz ao path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from server.chat_server import main
-
-if __name__ == "__main__":
-    try:
-        main()
-    except KeyboardInterrupt:
-        print("\n\n⚠️  Servidor encerrado")
-        sys.exit(0)
-    except Exception as e:
-        print(f"\n❌ Erro fatal: {e}")
-        import traceback
-        traceback.print_exc()
-        sys.exit(1)
+"""
+Script de inicialização do servidor
+"""
+
+import sys
+import os
+
+# Adiciona pasta raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.chat_server import main
+
+if __name__ == "__main__":
+    shard = None
+    if "--shard" in sys.argv:
+        shard = int(sys.argv[sys.argv.index("--shard") + 1])
+
+    try:
+        main(shard, replica="--replica" in sys.argv)
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Servidor encerrado")
+        sys.exit(0)
+    except Exception as e:
+        print(f"\n❌ Erro fatal: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
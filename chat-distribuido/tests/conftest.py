@@ -0,0 +1,10 @@
+"""
+Configuração dos testes
+Os módulos são importados como no servidor e no cliente (a partir da
+pasta chat-distribuido), qualquer que seja a pasta onde o pytest roda
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,20 @@
+"""
+Testes da conexão do cliente (client.conexao)
+"""
+
+import os
+
+from client.conexao import GerenciadorConexao
+from common.utils import DIRETORIO_BASE
+
+
+def test_cache_relativo_a_pasta_do_pacote(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conexao = GerenciadorConexao(arquivo_cache="data/cliente/servidor.json")
+    assert conexao.arquivo_cache == os.path.join(DIRETORIO_BASE, "data", "cliente", "servidor.json")
+
+
+def test_cache_absoluto_ou_desligado(tmp_path):
+    caminho = str(tmp_path / "cache.json")
+    assert GerenciadorConexao(arquivo_cache=caminho).arquivo_cache == caminho
+    assert GerenciadorConexao(arquivo_cache=None).arquivo_cache is None
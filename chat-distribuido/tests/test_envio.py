@@ -0,0 +1,89 @@
+"""
+Testes da fila de envio do cliente (client.envio)
+"""
+
+import pytest
+import Pyro4
+
+import client.envio
+from client.envio import FilaEnvio
+
+
+class ProxyFalso:
+    """Imita um Pyro4.Proxy: conecta em _pyroBind, envia em enviar_mensagem"""
+
+    def __init__(self, falhas_conexao=0, erro_envio=None):
+        self._pyroConnection = None
+        self.falhas_conexao = falhas_conexao
+        self.erro_envio = erro_envio
+        self.enviadas = []
+
+    def _pyroBind(self):
+        if self.falhas_conexao:
+            self.falhas_conexao -= 1
+            raise Pyro4.errors.CommunicationError("cannot connect")
+        self._pyroConnection = object()
+
+    def enviar_mensagem(self, *argumentos):
+        self.enviadas.append(argumentos)
+        if self.erro_envio:
+            raise self.erro_envio
+        return True, "ok"
+
+
+class ConexaoFalsa:
+    def __init__(self, proxy):
+        self.servidor = proxy
+
+    def proxy(self):
+        return self.servidor
+
+    def liberar(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def sem_espera(monkeypatch):
+    monkeypatch.setattr(client.envio, "espera_reconexao", lambda tentativa: 0)
+
+
+def enviar(proxy, *argumentos):
+    fila = FilaEnvio(ConexaoFalsa(proxy))
+    fila.start()
+    futuro = fila.enviar(*argumentos)
+    fila.encerrar()
+    return futuro
+
+
+def test_tenta_de_novo_se_nao_conectou():
+    proxy = ProxyFalso(falhas_conexao=1)
+    futuro = enviar(proxy, "ana", "oi")
+    assert futuro.result(1) == (True, "ok")
+    assert proxy.enviadas == [("ana", "oi")]
+
+
+def test_desiste_depois_de_duas_falhas_de_conexao():
+    proxy = ProxyFalso(falhas_conexao=2)
+    futuro = enviar(proxy, "ana", "oi")
+    with pytest.raises(Pyro4.errors.CommunicationError):
+        futuro.result(1)
+    assert proxy.enviadas == []
+
+
+@pytest.mark.parametrize("erro", [
+    Pyro4.errors.TimeoutError("receiving: timeout"),
+    Pyro4.errors.ConnectionClosedError("receiving: not enough data"),
+    ConnectionResetError(),
+])
+def test_falha_depois_de_enviar_nao_repete(erro):
+    proxy = ProxyFalso(erro_envio=erro)
+    futuro = enviar(proxy, "ana", "oi")
+    with pytest.raises(type(erro)):
+        futuro.result(1)
+    assert len(proxy.enviadas) == 1
+
+
+def test_sem_conexao():
+    futuro = enviar(None, "ana", "oi")
+    with pytest.raises(ConnectionError):
+        futuro.result(1)
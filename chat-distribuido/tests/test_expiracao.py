@@ -0,0 +1,71 @@
+"""
+Testes da expiração de sessões (server.expiracao)
+"""
+
+from server.expiracao import FilaExpiracao
+
+
+class Sessao:
+    def __init__(self, ultima_atividade):
+        self.ultima_atividade = ultima_atividade
+
+
+def test_expira_sessao_inativa():
+    fila = FilaExpiracao(10)
+    ana = Sessao(100.0)
+    fila.agendar("ana", ana)
+
+    assert fila.proximo_prazo() == 110.0
+    assert fila.vencidos(109.9, {"ana": ana}) == []
+    assert fila.vencidos(110.0, {"ana": ana}) == ["ana"]
+    assert len(fila) == 0
+
+
+def test_atividade_reagenda_sem_mexer_no_heap():
+    fila = FilaExpiracao(10)
+    ana = Sessao(100.0)
+    fila.agendar("ana", ana)
+
+    ana.ultima_atividade = 105.0  # marcar atividade só atualiza a sessão
+    assert len(fila) == 1
+
+    assert fila.vencidos(110.0, {"ana": ana}) == []
+    assert fila.proximo_prazo() == 115.0
+    assert len(fila) == 1
+    assert fila.vencidos(115.0, {"ana": ana}) == ["ana"]
+
+
+def test_sessao_desconectada_e_descartada():
+    fila = FilaExpiracao(10)
+    fila.agendar("ana", Sessao(100.0))
+
+    assert fila.vencidos(200.0, {}) == []
+    assert len(fila) == 0
+
+
+def test_sessao_substituida_ignora_entrada_antiga():
+    fila = FilaExpiracao(10)
+    antiga, nova = Sessao(100.0), Sessao(150.0)
+    fila.agendar("ana", antiga)
+    fila.agendar("ana", nova)  # reconectou
+
+    assert fila.vencidos(120.0, {"ana": nova}) == []
+    assert len(fila) == 1
+    assert fila.vencidos(160.0, {"ana": nova}) == ["ana"]
+
+
+def test_vencidos_so_retira_os_prazos_vencidos():
+    fila = FilaExpiracao(10)
+    sessoes = {nome: Sessao(inicio) for nome, inicio in (("ana", 100.0), ("bia", 103.0), ("caio", 107.0))}
+    for nome, sessao in sessoes.items():
+        fila.agendar(nome, sessao)
+
+    assert fila.vencidos(113.0, sessoes) == ["ana", "bia"]
+    assert fila.proximo_prazo() == 117.0
+    assert len(fila) == 1
+
+
+def test_fila_vazia():
+    fila = FilaExpiracao(10)
+    assert fila.proximo_prazo() is None
+    assert fila.vencidos(1e12, {}) == []
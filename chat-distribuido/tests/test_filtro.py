@@ -0,0 +1,109 @@
+"""
+Testes do filtro de conteúdo (common.filtro)
+"""
+
+import os
+
+from common.filtro import AhoCorasick, ListaBloqueio, preparar
+
+
+def ocorrencias(automato, texto, palavra_inteira=False):
+    return sorted(automato.procurar(preparar(texto), palavra_inteira))
+
+
+def test_termos_sobrepostos():
+    automato = AhoCorasick(["he", "she", "his", "hers"])
+
+    assert ocorrencias(automato, "ushers") == [(1, "she"), (2, "he"), (2, "hers")]
+
+
+def test_termo_dentro_de_outro():
+    automato = AhoCorasick(["senha", "senha do servidor", "servidor"])
+
+    assert ocorrencias(automato, "a senha do servidor") == [
+        (2, "senha"), (2, "senha do servidor"), (11, "servidor")
+    ]
+
+
+def test_falha_volta_para_o_prefixo_certo():
+    automato = AhoCorasick(["abcd", "bcx"])
+
+    assert ocorrencias(automato, "abcx") == [(1, "bcx")]
+
+
+def test_normaliza_termos_e_texto():
+    automato = AhoCorasick(["Informação   Confidencial", "", "   "])
+
+    assert automato.termos == ["informacao confidencial"]
+    assert automato.primeiro("segue INFORMACAO  confidencial anexa") == "informacao confidencial"
+
+
+def test_palavra_inteira():
+    automato = AhoCorasick(["ana", "chave privada"])
+
+    assert automato.primeiro("a banana caiu", palavra_inteira=True) is None
+    assert automato.primeiro("a banana caiu") == "ana"
+    assert automato.primeiro("oi ana!", palavra_inteira=True) == "ana"
+    assert automato.primeiro("ana", palavra_inteira=True) == "ana"
+    assert automato.primeiro("minha chave privadas", palavra_inteira=True) is None
+    assert automato.primeiro("(chave privada)", palavra_inteira=True) == "chave privada"
+
+
+def test_palavra_inteira_com_pontuacao_no_termo():
+    automato = AhoCorasick(["c++"])
+
+    # Termo termina em pontuação: não exige fronteira depois dele
+    assert automato.primeiro("gosto de c++x", palavra_inteira=True) == "c++"
+    assert automato.primeiro("abc++", palavra_inteira=True) is None
+
+
+def test_sem_termos():
+    automato = AhoCorasick([])
+
+    assert len(automato) == 0
+    assert automato.primeiro("qualquer coisa") is None
+
+
+def test_lista_ignora_comentarios_e_recarrega(tmp_path):
+    arquivo = tmp_path / "lista.txt"
+    arquivo.write_text("# comentário\nproibido\n\n", encoding="utf-8")
+    lista = ListaBloqueio(str(arquivo), intervalo=0)
+
+    assert len(lista) == 1
+    assert lista.encontrar("isso é proibido") == "proibido"
+    assert lista.encontrar("comentário") is None
+
+    arquivo.write_text("outro termo\n", encoding="utf-8")
+    os.utime(arquivo, ns=(0, os.stat(arquivo).st_mtime_ns + 10**9))
+    assert lista.recarregar()
+    assert lista.encontrar("isso é proibido") is None
+    assert lista.encontrar("um OUTRO termo") == "outro termo"
+
+
+def test_lista_ausente_mantem_a_anterior_e_avisa(tmp_path, capsys):
+    arquivo = tmp_path / "lista.txt"
+    arquivo.write_text("proibido\n", encoding="utf-8")
+    lista = ListaBloqueio(str(arquivo), intervalo=0)
+    arquivo.unlink()
+
+    assert not lista.recarregar()
+    assert not lista.recarregar()
+    assert lista.encontrar("proibido") == "proibido"
+    assert capsys.readouterr().out.count("não encontrada") == 1
+
+
+def test_lista_vazia_avisa(tmp_path, capsys):
+    arquivo = tmp_path / "lista.txt"
+    arquivo.write_text("# só comentários\n", encoding="utf-8")
+    ListaBloqueio(str(arquivo), intervalo=0)
+
+    assert "sem termos" in capsys.readouterr().out
+
+
+def test_caminho_relativo_parte_da_pasta_do_pacote(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    lista = ListaBloqueio("config/blocklist.txt", intervalo=0)
+
+    assert os.path.isabs(lista.caminho)
+    assert len(lista) > 0  # a lista distribuída tem termos
+    assert lista.encontrar("a senha do servidor é x") == "senha do servidor"
@@ -0,0 +1,75 @@
+"""
+Testes do anel de hash consistente (common.hashring)
+"""
+
+from common.hashring import AnelConsistente
+
+SALAS = [f"sala-{i}" for i in range(2000)]
+
+
+def distribuir(anel):
+    return {sala: anel.no_para(sala) for sala in SALAS}
+
+
+def test_anel_vazio():
+    assert AnelConsistente().no_para("geral") is None
+
+
+def test_mesmo_no_em_qualquer_processo():
+    # Hash estável: a ordem de inserção não muda o dono
+    assert distribuir(AnelConsistente(["a", "b", "c"])) == distribuir(AnelConsistente(["c", "a", "b"]))
+
+
+def test_adicionar_no_so_move_chaves_para_ele():
+    anel = AnelConsistente(["a", "b", "c"])
+    antes = distribuir(anel)
+
+    anel.adicionar("d")
+    depois = distribuir(anel)
+
+    movidas = [sala for sala in SALAS if antes[sala] != depois[sala]]
+    assert movidas
+    assert all(depois[sala] == "d" for sala in movidas)
+    # Cerca de 1/4 das chaves (com folga para a variância dos nós virtuais)
+    assert 0.15 < len(movidas) / len(SALAS) < 0.35
+
+
+def test_remover_no_devolve_as_chaves_dele():
+    anel = AnelConsistente(["a", "b", "c"])
+    antes = distribuir(anel)
+
+    anel.adicionar("d")
+    anel.remover("d")
+
+    assert distribuir(anel) == antes
+    assert len(anel.pontos) == 3 * anel.replicas
+
+
+def test_remover_so_move_chaves_do_no_removido():
+    anel = AnelConsistente(["a", "b", "c", "d"])
+    antes = distribuir(anel)
+
+    anel.remover("b")
+    depois = distribuir(anel)
+
+    assert all(depois[sala] == antes[sala] for sala in SALAS if antes[sala] != "b")
+    assert "b" not in depois.values()
+
+
+def test_distribuicao_equilibrada():
+    anel = AnelConsistente(["a", "b", "c", "d"])
+    contagem = {}
+    for no in distribuir(anel).values():
+        contagem[no] = contagem.get(no, 0) + 1
+
+    assert set(contagem) == {"a", "b", "c", "d"}
+    assert all(300 < n < 700 for n in contagem.values())
+
+
+def test_adicionar_repetido_nao_duplica_pontos():
+    anel = AnelConsistente(["a"], replicas=10)
+    anel.adicionar("a")
+
+    assert len(anel) == 1
+    assert len(anel.pontos) == 10
+    assert anel == AnelConsistente(["a"])
@@ -0,0 +1,134 @@
+"""
+Testes do histórico circular (server.historico)
+"""
+
+from common.models import Mensagem
+from server.chat_server import ChatServer
+from server.historico import HistoricoCircular
+
+
+def preencher(historico, quantidade):
+    """Adiciona mensagens "m1", "m2", ... e as retorna"""
+    return [historico.adicionar(Mensagem("ana", f"m{i}", float(i))) for i in range(1, quantidade + 1)]
+
+
+def seqs(mensagens):
+    return [m.seq for m in mensagens]
+
+
+def test_sequencia_comeca_em_um_e_cresce():
+    historico = HistoricoCircular(5)
+    mensagens = preencher(historico, 3)
+
+    assert seqs(mensagens) == [1, 2, 3]
+    assert historico.primeiro_seq == 1
+    assert historico.ultimo_seq == 3
+    assert len(historico) == 3
+
+
+def test_sequencia_inicial_configuravel():
+    historico = HistoricoCircular(5, proximo_seq=41)
+    assert seqs(preencher(historico, 2)) == [41, 42]
+
+
+def test_descarta_as_mais_antigas_quando_cheio():
+    historico = HistoricoCircular(4)
+    preencher(historico, 10)
+
+    assert len(historico) == 4
+    assert historico.primeiro_seq == 7
+    assert seqs(historico.ultimas(100)) == [7, 8, 9, 10]
+    assert [m.conteudo for m in historico.ultimas(2)] == ["m9", "m10"]
+
+
+def test_descarte_remove_dos_indices():
+    historico = HistoricoCircular(3)
+    preencher(historico, 5)
+
+    assert seqs(historico.buscar(remetente="ana")) == [3, 4, 5]
+    assert seqs(historico.pesquisar("m1")) == []
+    assert seqs(historico.pesquisar("m5")) == [5]
+
+
+def test_desde_sem_perdas():
+    historico = HistoricoCircular(10)
+    preencher(historico, 5)
+
+    perdidas, mensagens = historico.desde(2)
+    assert perdidas == 0
+    assert seqs(mensagens) == [3, 4, 5]
+
+    assert historico.desde(5) == (0, [])
+
+
+def test_desde_conta_as_perdidas_fora_do_buffer():
+    historico = HistoricoCircular(4)
+    preencher(historico, 10)
+
+    perdidas, mensagens = historico.desde(2)
+    assert perdidas == 4  # 3 a 6 já saíram do buffer
+    assert seqs(mensagens) == [7, 8, 9, 10]
+
+
+def test_desde_recomeca_se_cliente_esta_a_frente():
+    historico = HistoricoCircular(10)
+    preencher(historico, 3)
+
+    perdidas, mensagens = historico.desde(50)  # servidor reiniciado
+    assert perdidas == 0
+    assert seqs(mensagens) == [1, 2, 3]
+
+
+def test_entre_limita_ao_retido():
+    historico = HistoricoCircular(4)
+    preencher(historico, 10)
+
+    assert seqs(historico.entre(1, 9)) == [7, 8]
+    assert seqs(historico.entre(8, 100)) == [8, 9, 10]
+
+
+def test_restaurar_mantem_sequencias():
+    historico = HistoricoCircular(10)
+    historico.restaurar([Mensagem("ana", f"m{s}", float(s), seq=s) for s in (20, 21, 22)])
+
+    assert historico.primeiro_seq == 20
+    assert historico.proximo_seq == 23
+    assert historico.adicionar(Mensagem("ana", "nova")).seq == 23
+
+    perdidas, mensagens = historico.desde(0)
+    assert perdidas == 19  # anteriores ao que foi restaurado
+    assert seqs(mensagens) == [20, 21, 22, 23]
+
+
+def test_servidor_marca_lacuna_para_cliente_atrasado():
+    servidor = ChatServer()
+    sala = servidor.salas["geral"]
+    capacidade = sala.mensagens.capacidade
+    preencher(sala.mensagens, capacidade + 5)
+
+    resposta = servidor._mensagens_desde(sala, 0)
+
+    assert resposta[0]["tipo"] == "lacuna"
+    assert "5 mensagens perdidas" in resposta[0]["conteudo"]
+    assert resposta[0]["seq"] == 5
+    assert [m["seq"] for m in resposta[1:]] == list(range(6, capacidade + 6))
+
+
+def test_servidor_marca_lacuna_quando_sequencia_recomeca():
+    servidor = ChatServer()
+    sala = servidor.salas["geral"]
+    preencher(sala.mensagens, 2)
+
+    resposta = servidor._mensagens_desde(sala, 50)
+
+    assert resposta[0]["tipo"] == "lacuna"
+    assert "reiniciado" in resposta[0]["conteudo"]
+    assert [m["seq"] for m in resposta[1:]] == [1, 2]
+
+
+def test_sem_lacuna_quando_em_dia():
+    servidor = ChatServer()
+    sala = servidor.salas["geral"]
+    preencher(sala.mensagens, 3)
+
+    assert [m["tipo"] for m in servidor._mensagens_desde(sala, 1)] == ["normal", "normal"]
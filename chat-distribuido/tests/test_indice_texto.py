@@ -0,0 +1,103 @@
+"""
+Testes do índice invertido (server.indices.IndiceTexto)
+"""
+
+from common.models import Mensagem
+from server.indices import IndiceTexto, tokenizar
+
+
+def indexar(indice, *conteudos, inicio=1):
+    mensagens = [Mensagem("ana", c, seq=inicio + i) for i, c in enumerate(conteudos)]
+    for msg in mensagens:
+        indice.adicionar(msg)
+    return mensagens
+
+
+def seqs(resultados):
+    return sorted(s for _, s in resultados)
+
+
+def test_tokenizar_normaliza():
+    assert tokenizar("Olá, MUNDO distribuído! a") == ["ola", "mundo", "distribuido"]
+
+
+def test_adicionar_e_pesquisar():
+    indice = IndiceTexto()
+    indexar(indice, "servidor caiu", "cliente conectou", "servidor voltou")
+
+    assert len(indice) == 3
+    assert seqs(indice.pesquisar("servidor")) == [1, 3]
+    assert seqs(indice.pesquisar("servidor voltou")) == [3]  # todos os termos
+    assert indice.pesquisar("inexistente") == []
+
+
+def test_prefixo_e_acentos():
+    indice = IndiceTexto()
+    indexar(indice, "sistema distribuído", "distância grande", "outra coisa")
+
+    assert seqs(indice.pesquisar("dist")) == [1, 2]
+    assert seqs(indice.pesquisar("DISTRIBUIDO")) == [1]
+
+
+def test_termo_exato_vale_mais_que_prefixo():
+    indice = IndiceTexto()
+    indexar(indice, "chat", "chateado")
+
+    assert [s for _, s in indice.pesquisar("chat")] == [1, 2]
+
+
+def test_repeticao_aumenta_relevancia():
+    indice = IndiceTexto()
+    indexar(indice, "erro no deploy", "erro erro erro de novo", "tudo certo")
+
+    assert [s for _, s in indice.pesquisar("erro")][0] == 2
+
+
+def test_empate_favorece_mais_recente():
+    indice = IndiceTexto()
+    indexar(indice, "bom dia", "bom dia", "bom dia")
+
+    assert [s for _, s in indice.pesquisar("bom", limite=2)] == [3, 2]
+
+
+def test_remover_tira_do_indice_e_do_vocabulario():
+    indice = IndiceTexto()
+    primeira, segunda = indexar(indice, "palavra rara repetida repetida", "palavra comum")
+
+    indice.remover(primeira)
+
+    assert len(indice) == 1
+    assert indice.pesquisar("rara") == []
+    assert indice.pesquisar("repetida") == []
+    assert seqs(indice.pesquisar("palavra")) == [2]
+    assert "rara" not in indice.vocabulario
+    assert "repetida" not in indice.repetidos
+    assert indice.expandir("rar") == []
+
+
+def test_descarte_em_janela_como_o_historico():
+    indice = IndiceTexto()
+    mensagens = indexar(indice, *[f"mensagem numero{i}" for i in range(1, 11)])
+
+    for msg in mensagens[:7]:  # o histórico descarta as mais antigas
+        indice.remover(msg)
+
+    assert seqs(indice.pesquisar("mensagem", limite=50)) == [8, 9, 10]
+    assert seqs(indice.pesquisar("numero")) == [8, 9, 10]
+
+
+def test_so_mensagens_de_usuarios():
+    indice = IndiceTexto()
+    sistema = Mensagem("Sistema", "ana entrou no chat", tipo="sistema", seq=1)
+    indice.adicionar(sistema)
+    indice.remover(sistema)
+
+    assert len(indice) == 0
+    assert indice.pesquisar("entrou") == []
+
+
+def test_limite_de_expansoes():
+    indice = IndiceTexto(expansoes=2)
+    indexar(indice, "abacate", "abacaxi", "abadia")
+
+    assert [t for t, _ in indice.expandir("aba")] == ["abacate", "abacaxi"]
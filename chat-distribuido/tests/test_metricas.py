@@ -0,0 +1,81 @@
+"""
+Testes das métricas por método remoto (server.metricas)
+"""
+
+import threading
+
+from server.metricas import MetricasRPC, JanelaTaxa, _LOTE, medido
+
+
+class Servico:
+    def __init__(self, metricas):
+        self.metricas = metricas
+
+    @medido
+    def ping(self):
+        return "pong"
+
+    @medido
+    def recusar(self):
+        return False, "não"
+
+
+def test_chamadas_ficam_com_a_thread_que_as_fez():
+    metricas = MetricasRPC()
+    servico = Servico(metricas)
+    chamou, fim = threading.Event(), threading.Event()
+
+    def trabalhar():
+        for _ in range(3):  # menos que um lote: fica pendente
+            servico.ping()
+        chamou.set()
+        fim.wait(5)
+
+    thread = threading.Thread(target=trabalhar)
+    thread.start()
+    chamou.wait(5)
+    try:
+        servico.recusar()
+        total = metricas.por_metodo()  # esta thread descarrega as pendentes da outra
+        assert total["ping"].chamadas == 3
+        assert total["recusar"].recusas == 1
+        assert metricas.threads[thread]["ping"].chamadas == 3
+        assert "ping" not in metricas.threads[threading.current_thread()]
+    finally:
+        fim.set()
+        thread.join()
+
+    # Thread encerrada: vai para o acumulado sem perder chamadas
+    assert metricas.por_metodo()["ping"].chamadas == 3
+    assert thread not in metricas.threads
+
+
+def test_lote_completo_e_descarregado_pela_dona():
+    metricas = MetricasRPC()
+    servico = Servico(metricas)
+    for _ in range(_LOTE):
+        servico.ping()
+    assert metricas.threads[threading.current_thread()]["ping"].chamadas == _LOTE
+    assert metricas.por_metodo()["ping"].latencia.total == _LOTE
+
+
+def test_janela_taxa():
+    janela = JanelaTaxa(10)
+    janela.registrar(5, agora=100.2)
+    janela.registrar(3, agora=101.7)
+    assert janela.taxa(1, agora=102.0) == 3
+    assert janela.taxa(2, agora=102.0) == 4
+    # Balde reaproveitado depois de uma volta no anel
+    janela.registrar(1, agora=110.5)
+    assert janela.taxa(1, agora=111.0) == 1
+    assert janela.total == 9
+
+
+def test_duracao_nula_ou_negativa_vai_para_a_primeira_faixa():
+    metricas = MetricasRPC()
+    thread = threading.current_thread()
+    metricas.registrar(thread, "ping", 0.0)
+    metricas.registrar(thread, "ping", -0.002)  # relógio voltou
+    latencia = metricas.threads[thread]["ping"].latencia
+    assert latencia.contagens[0] == 2
+    assert latencia.soma == 0
@@ -0,0 +1,201 @@
+"""
+Testes do log de mensagens (server.persistencia)
+"""
+
+import os
+import time
+
+from common.models import Mensagem
+from server.persistencia import LogMensagens, codificar_registro, sala_do_registro
+
+
+def gravar(log, sala, seqs, remetente="ana"):
+    for s in seqs:
+        log.anexar(Mensagem(remetente, f"{sala} {s}", 1000.0 + s, seq=s, sala=sala))
+
+
+def resumo(mensagens):
+    return [(m.sala, m.seq) for m in mensagens]
+
+
+def test_recupera_o_fim_depois_de_girar(tmp_path):
+    log = LogMensagens(str(tmp_path), "os", tamanho_segmento=200)
+    gravar(log, "geral", range(1, 31))
+    log.fechar()
+    assert len(os.listdir(tmp_path)) > 3
+
+    recuperadas = LogMensagens(str(tmp_path), "os").recuperar(10)
+
+    assert resumo(recuperadas) == [("geral", s) for s in range(21, 31)]
+    assert recuperadas[-1].conteudo == "geral 30"
+    assert recuperadas[-1].ts == 1030.0
+
+
+def test_recupera_cada_sala_mesmo_quieta(tmp_path):
+    log = LogMensagens(str(tmp_path), "os", tamanho_segmento=300)
+    gravar(log, "quieta", [1, 2])
+    gravar(log, "geral", range(1, 101))
+    log.fechar()
+
+    recuperadas = LogMensagens(str(tmp_path), "os").recuperar(5)
+    por_sala = {}
+    for m in recuperadas:
+        por_sala.setdefault(m.sala, []).append(m.seq)
+
+    assert por_sala == {"geral": [96, 97, 98, 99, 100], "quieta": [1, 2]}
+
+
+def test_descarta_linha_incompleta_no_fim(tmp_path):
+    log = LogMensagens(str(tmp_path), "os")
+    gravar(log, "geral", [1, 2, 3])
+    log.fechar()
+
+    caminho = log.segmentos()[-1]
+    with open(caminho, "ab") as f:
+        f.write(codificar_registro(Mensagem("ana", "cortada", seq=4))[:-10])  # queda no meio da escrita
+
+    assert resumo(LogMensagens(str(tmp_path), "os").recuperar(10)) == [("geral", 1), ("geral", 2), ("geral", 3)]
+
+    # Ao reabrir para escrita a linha cortada é truncada
+    log = LogMensagens(str(tmp_path), "os")
+    gravar(log, "geral", [4])
+    log.fechar()
+
+    assert resumo(log.ler()) == [("geral", s) for s in (1, 2, 3, 4)]
+    with open(caminho, "rb") as f:
+        assert all(linha.endswith(b"\n") for linha in f)
+
+
+def test_ler_filtra_por_sala_e_sequencia(tmp_path):
+    log = LogMensagens(str(tmp_path), "os", tamanho_segmento=200)
+    for s in range(1, 11):
+        gravar(log, "geral", [s])
+        gravar(log, "outra", [s])
+    log.fechar()
+
+    assert [m.seq for m in log.ler("outra", desde_seq=7)] == [8, 9, 10]
+    assert len(list(log.ler())) == 20
+
+
+def test_retencao_por_quantidade(tmp_path):
+    log = LogMensagens(str(tmp_path), "os", tamanho_segmento=100, max_segmentos=3)
+    gravar(log, "geral", range(1, 51))
+
+    segmentos = log.segmentos()
+    assert len(segmentos) == 3
+    assert segmentos[-1].endswith(f"{log.numero_segmento:020d}.log")
+    assert [m.seq for m in log.ler()][-1] == 50
+    log.fechar()
+
+
+def test_retencao_por_idade(tmp_path):
+    log = LogMensagens(str(tmp_path), "os", tamanho_segmento=100, max_segmentos=0, idade_maxima=60)
+    gravar(log, "geral", range(1, 11))
+    antigos = log.segmentos()[:-1]
+    assert antigos
+
+    velho = time.time() - 120
+    os.utime(antigos[0], (velho, velho))
+    gravar(log, "geral", range(11, 21))  # gira de novo
+
+    assert antigos[0] not in log.segmentos()
+    assert antigos[1] in log.segmentos()
+    log.fechar()
+
+
+def test_sync_confirma_depois_do_fsync(tmp_path):
+    log = LogMensagens(str(tmp_path), "sync", tamanho_segmento=100)
+    for s in range(1, 6):
+        marca = log.anexar(Mensagem("ana", "x", seq=s))
+        log.aguardar_duravel(marca)
+        assert log.duraveis >= marca
+    log.fechar()
+
+
+def test_sala_do_registro():
+    linha = codificar_registro(Mensagem("ana", 'tem ,"sala":"falsa" no texto', seq=1, sala="geral"))
+    assert sala_do_registro(linha) == "geral"
+    assert sala_do_registro(b'{"seq":1,"remetente":"ana"}') == "geral"  # antes das salas
+
+
+def test_indice_dos_segmentos_fechados(tmp_path):
+    log = LogMensagens(str(tmp_path), "os", tamanho_segmento=200)
+    gravar(log, "geral", range(1, 11))
+    gravar(log, "outra", range(1, 4))
+    log.fechar()
+
+    fechados = log.segmentos()[:-1]
+    indices = [log._indice(c) for c in fechados]
+    assert all(os.path.exists(c[:-4] + ".idx") for c in fechados)
+    assert indices[0]["geral"][0] == 1
+    assert max(i["geral"][1] for i in indices if "geral" in i) == 10
+
+
+def test_ler_pula_segmentos_ja_lidos(tmp_path, monkeypatch):
+    log = LogMensagens(str(tmp_path), "os", tamanho_segmento=200)
+    gravar(log, "geral", range(1, 41))
+    gravar(log, "outra", [1, 2])
+    log.fechar()
+
+    abertos = []
+    original = open
+
+    def registrar(caminho, *args, **kwargs):
+        if str(caminho).endswith(".log"):
+            abertos.append(caminho)
+        return original(caminho, *args, **kwargs)
+
+    monkeypatch.setattr("builtins.open", registrar)
+    assert [m.seq for m in log.ler("geral", desde_seq=35)] == [36, 37, 38, 39, 40]
+    # Só os segmentos com 36-40 (dois registros por segmento), não o log todo
+    assert 0 < len(abertos) <= 3 < len(log.segmentos())
+
+    abertos.clear()
+    assert [m.seq for m in log.ler("outra")] == [1, 2]
+    assert len(abertos) == 1
+
+
+def test_indice_refeito_sem_arquivo(tmp_path):
+    log = LogMensagens(str(tmp_path), "os", tamanho_segmento=200)
+    gravar(log, "geral", range(1, 21))
+    log.fechar()
+    for nome in os.listdir(tmp_path):
+        if nome.endswith(".idx"):
+            os.remove(tmp_path / nome)  # log de uma versão sem índice
+
+    reaberto = LogMensagens(str(tmp_path), "os")
+    assert [m.seq for m in reaberto.ler("geral", desde_seq=18)] == [19, 20]
+    assert any(nome.endswith(".idx") for nome in os.listdir(tmp_path))
+    assert resumo(reaberto.recuperar(3)) == [("geral", 18), ("geral", 19), ("geral", 20)]
+
+
+def test_retencao_apaga_o_indice(tmp_path):
+    log = LogMensagens(str(tmp_path), "os", tamanho_segmento=100, max_segmentos=2)
+    gravar(log, "geral", range(1, 31))
+    log.fechar()
+
+    indices = sorted(n for n in os.listdir(tmp_path) if n.endswith(".idx"))
+    segmentos = sorted(n for n in os.listdir(tmp_path) if n.endswith(".log"))
+    assert len(segmentos) == 2
+    # fechar() grava também o índice do segmento atual
+    assert indices == [n[:-4] + ".idx" for n in segmentos]
+
+
+def test_fechar_grava_indice_do_segmento_atual(tmp_path, monkeypatch):
+    log = LogMensagens(str(tmp_path), "batch")
+    gravar(log, "geral", range(1, 6))
+    log.fechar()
+    atual = log.segmentos()[-1]
+    assert os.path.exists(atual[:-4] + ".idx")
+
+    # Reabrir usa o índice gravado, sem varrer o segmento, e o apaga
+    monkeypatch.setattr("server.persistencia.indexar_segmento", None)
+    reaberto = LogMensagens(str(tmp_path), "os")
+    assert reaberto.indice_atual == {"geral": [1, 5]}
+    assert not os.path.exists(atual[:-4] + ".idx")
+
+    # Encerrado sem fechar: o segmento cresceu e é varrido de novo
+    monkeypatch.undo()
+    gravar(reaberto, "geral", [6, 7])
+    reaberto.arquivo.flush()
+    assert LogMensagens(str(tmp_path), "os").indice_atual == {"geral": [1, 7]}
@@ -0,0 +1,135 @@
+"""
+Testes dos limitadores de taxa (server.rate_limit)
+"""
+
+import pytest
+
+from server.rate_limit import (
+    BaldeTokens,
+    JanelaDeslizante,
+    LimitadorComposto,
+    SemLimite,
+    criar_limitador,
+    limite_por_periodo,
+)
+
+
+def permitidos(limitador, chave, vezes, agora):
+    return sum(limitador.permitir(chave, agora) for _ in range(vezes))
+
+
+def test_balde_permite_rajada_ate_o_limite():
+    balde = BaldeTokens(5, 60)
+
+    assert permitidos(balde, "ana", 8, 1000.0) == 5
+    assert not balde.permitir("ana", 1000.0)
+
+
+def test_balde_reabastece_na_taxa():
+    balde = BaldeTokens(6, 60)  # um token a cada 10 s
+    permitidos(balde, "ana", 6, 1000.0)
+
+    assert not balde.permitir("ana", 1009.0)
+    assert balde.permitir("ana", 1010.0)
+    assert not balde.permitir("ana", 1010.0)
+    assert permitidos(balde, "ana", 10, 2000.0) == 6  # nunca passa do limite
+
+
+def test_balde_chaves_independentes():
+    balde = BaldeTokens(2, 60)
+    permitidos(balde, "ana", 2, 1000.0)
+
+    assert not balde.permitir("ana", 1000.0)
+    assert balde.permitir("bia", 1000.0)
+
+
+def test_balde_devolver_nao_passa_do_limite():
+    balde = BaldeTokens(2, 60)
+    permitidos(balde, "ana", 2, 1000.0)
+
+    balde.devolver("ana")
+    assert balde.permitir("ana", 1000.0)
+    assert not balde.permitir("ana", 1000.0)
+
+    balde.devolver("bia")  # sem estado: ignora
+    balde.devolver("ana")
+    balde.devolver("ana")
+    balde.devolver("ana")
+    assert permitidos(balde, "ana", 5, 1000.0) == 2
+
+
+def test_janela_limita_dentro_da_janela():
+    janela = JanelaDeslizante(3, 60)
+
+    assert permitidos(janela, "ana", 5, 600.0) == 3
+    assert not janela.permitir("ana", 659.0)
+
+
+def test_janela_pondera_a_janela_anterior():
+    janela = JanelaDeslizante(4, 60)
+    permitidos(janela, "ana", 4, 600.0)
+
+    # Metade da janela anterior ainda conta: 4 * 0.5 = 2 ocupados
+    assert permitidos(janela, "ana", 5, 690.0) == 2
+    # Duas janelas depois a anterior não conta mais
+    assert permitidos(janela, "ana", 5, 780.0) == 4
+
+
+def test_janela_devolver():
+    janela = JanelaDeslizante(2, 60)
+    permitidos(janela, "ana", 2, 600.0)
+
+    janela.devolver("ana")
+    assert janela.permitir("ana", 600.0)
+    assert not janela.permitir("ana", 600.0)
+
+
+def test_remover_descarta_estado():
+    for limitador in (BaldeTokens(1, 60), JanelaDeslizante(1, 60)):
+        assert limitador.permitir("ana", 600.0)
+        assert not limitador.permitir("ana", 600.0)
+        limitador.remover("ana")
+        assert limitador.permitir("ana", 600.0)
+
+
+def test_composto_devolve_ao_usuario_quando_global_recusa():
+    por_usuario = BaldeTokens(2, 60)
+    composto = LimitadorComposto(por_usuario, BaldeTokens(1, 60))
+
+    assert composto.permitir("ana", 1000.0) == (True, "")
+    assert composto.permitir("bia", 1000.0) == (False, "global")
+    # O token de bia foi devolvido: ela ainda tem os dois
+    assert permitidos(por_usuario, "bia", 3, 1000.0) == 2
+
+
+def test_composto_recusa_usuario_antes_do_global():
+    global_ = BaldeTokens(10, 60)
+    composto = LimitadorComposto(BaldeTokens(1, 60), global_)
+
+    composto.permitir("ana", 1000.0)
+    assert composto.permitir("ana", 1000.0) == (False, "usuario")
+    assert permitidos(global_, "*", 20, 1000.0) == 9
+
+
+def test_criar_limitador():
+    assert isinstance(criar_limitador(0), SemLimite)
+    assert isinstance(criar_limitador(5, 60, "token_bucket"), BaldeTokens)
+    assert isinstance(criar_limitador(5, 60, "sliding_window"), JanelaDeslizante)
+    with pytest.raises(ValueError):
+        criar_limitador(5, 60, "desconhecido")
+
+
+def test_limite_por_periodo_mantem_a_taxa_por_minuto():
+    assert limite_por_periodo(30, 60) == 30
+    assert limite_por_periodo(30, 10) == 5
+    assert limite_por_periodo(30, 120) == 60
+    assert limite_por_periodo(30, 0.5) == 1  # nunca abaixo de um evento
+    assert limite_por_periodo(0, 10) == 0
+
+
+def test_balde_com_periodo_curto_mantem_a_taxa():
+    balde = BaldeTokens(limite_por_periodo(30, 10), 10)  # 30/min em janelas de 10 s
+
+    assert permitidos(balde, "ana", 10, 1000.0) == 5
+    # Em um minuto cabem as 30 por minuto (reabastece 1 a cada 2 s)
+    assert sum(balde.permitir("ana", 1000.0 + t) for t in range(2, 61, 2)) == 30
@@ -0,0 +1,67 @@
+"""
+Testes da migração de salas entre shards (server.rebalancear)
+"""
+
+import pytest
+
+from server.chat_server import ChatServer
+from server.rebalancear import mover
+
+
+class DestinoFora:
+    """Shard de destino inacessível"""
+
+    def importar_sala(self, sala, dados):
+        raise ConnectionRefusedError("destino fora do ar")
+
+
+def servidor_com_sala():
+    servidor = ChatServer()
+    servidor.registrar_usuario("ana")
+    servidor.entrar_sala("ana", "dev")
+    servidor.enviar_mensagem("ana", "oi", "dev")
+    return servidor
+
+
+def test_move_sala():
+    origem, destino = servidor_com_sala(), ChatServer()
+    mover("dev", origem, destino)
+
+    assert "dev" not in origem.salas
+    assert origem.enviar_mensagem("ana", "de novo", "dev")[1].startswith("↪️")
+    assert "ana" in destino.salas["dev"].membros
+    assert [m.conteudo for m in destino.salas["dev"].mensagens.ultimas(10)][-1] == "oi"
+
+
+def test_importacao_falha_mantem_sala_na_origem():
+    origem = servidor_com_sala()
+    with pytest.raises(ConnectionRefusedError):
+        mover("dev", origem, DestinoFora())
+
+    assert "dev" not in origem.salas_movidas
+    assert "ana" in origem.salas["dev"].membros
+    assert origem.enviar_mensagem("ana", "ainda aqui", "dev")[0]
+    assert [m.conteudo for m in origem.salas["dev"].mensagens.ultimas(10)][-2:] == ["oi", "ainda aqui"]
+
+
+def test_sala_congelada_recusa_envio_ate_retirar():
+    origem = servidor_com_sala()
+    origem.exportar_sala("dev")
+    assert origem.enviar_mensagem("ana", "durante", "dev")[1].startswith("↪️")
+    assert origem.retirar_sala("dev")[0]
+    assert "dev" not in origem.salas_usuario["ana"]
+
+
+@pytest.mark.parametrize("papel", ["replica", "deposto"])
+def test_replica_e_deposto_recusam_migracao(papel):
+    servidor = servidor_com_sala()
+    servidor.papel = papel
+    dados = servidor.exportar_sala("dev")
+    assert dados[0] is False and "dev" not in servidor.salas_movidas
+    assert servidor.importar_sala("nova", {"mensagens": [], "membros": ["ana"]})[0] is False
+    assert "nova" not in servidor.salas
+    assert servidor.retirar_sala("dev")[0] is False
+    assert servidor.reabrir_sala("dev")[0] is False
+    with pytest.raises(RuntimeError):
+        mover("dev", servidor, ChatServer())
+    assert "dev" in servidor.salas